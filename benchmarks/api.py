@@ -0,0 +1,398 @@
+"""
+Microbenchmark every JSON view and the TaskSchema/UserSchema dumps.
+
+    python benchmarks/api.py --output results.json
+    python benchmarks/api.py --baseline results.json
+    python benchmarks/api.py --database-url postgresql://localhost/roomies_bench --case "GET /api/tasks"
+    python benchmarks/api.py --users 100000 --tasks 1000000 --households 10000 --output households.json
+
+Seeds the database with datagen.py, then times each request through the
+test client, so the numbers cover routing, the view and serialization but
+no network. Response bodies are never cached, every request reaches its
+view. Each case also records the SQL statements its request ran, from the
+Server-Timing header. The streaming endpoint is left out, as it never
+finishes.
+
+With --households the data is split between that many households and the
+requests are made as the default household, household 1, so comparing
+runs with the same --users/--tasks shows whether per-household requests
+stay flat as the number of households grows.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import datagen  # noqa: E402
+import results  # noqa: E402
+from roomies_todo_list import db, response_cache  # noqa: E402
+from roomies_todo_list.cache import MemoryBackend  # noqa: E402
+from roomies_todo_list.models import Recurrence, SyncChange, Task, TaskSchema, User, UserSchema  # noqa: E402
+from roomies_todo_list.queries import loader_options  # noqa: E402
+from roomies_todo_list.serializers import dump_task_rows, get_schema, task_rows_query  # noqa: E402
+from roomies_todo_list.sync import encode_token  # noqa: E402
+
+STATEMENTS_RE = re.compile(r'db;[^,]*desc="(\d+) statements"')
+BATCH_SIZE = 100
+WEEK = (datagen.NOW.isoformat(), (datagen.NOW + timedelta(days=7)).isoformat())
+
+
+class UncachedBodies(MemoryBackend):
+    """Keeps cache versions, which the search index relies on, but never stores a response."""
+
+    def set(self, key, value):
+        if not key.startswith("response:"):
+            super().set(key, value)
+
+
+REQUESTS = {}
+DUMPS = {}
+
+
+def request_case(name, prepare=None, repeat=None):
+    """Register `fn(args, i, prepared)`, which returns (method, url, client keyword arguments)."""
+
+    def register(fn):
+        REQUESTS[name] = (fn, prepare, repeat)
+        return fn
+
+    return register
+
+
+def dump_case(name):
+    def register(fn):
+        DUMPS[name] = fn
+        return fn
+
+    return register
+
+
+def new_tasks(count):
+    creator = User.query.get(1)
+    tasks = [Task(name=f"bench task {i}", created_by=creator) for i in range(count)]
+    db.session.add_all(tasks)
+    db.session.commit()
+    return [task.id for task in tasks]
+
+
+def new_user(i):
+    user = User(email=f"bench{i}-{time.time_ns()}@example.com", username=f"bench{i}-{time.time_ns()}")
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def task_id(args, i):
+    # The default household's tasks and users are the first of each
+    return i % (datagen.first_of(2, args.tasks, args.households) - 1) + 1
+
+
+def user_id(args, i):
+    return i % (datagen.first_of(2, args.users, args.households) - 1) + 1
+
+
+# USERS
+@request_case("GET /api/users")
+def get_users(args, i, prepared):
+    return "GET", "/api/users", {}
+
+
+@request_case("GET /api/users/<id>")
+def get_user(args, i, prepared):
+    return "GET", f"/api/users/{user_id(args, i)}", {}
+
+
+@request_case("POST /api/users")
+def post_user(args, i, prepared):
+    unique = time.time_ns()
+    user = {"email": f"new{unique}@example.com", "username": f"new{unique}", "first_name": "New"}
+    return "POST", "/api/users", {"json": {"user": user}}
+
+
+@request_case("PATCH /api/users/<id>")
+def patch_user(args, i, prepared):
+    return "PATCH", f"/api/users/{user_id(args, i)}", {"json": {"user": {"first_name": f"First{i}"}}}
+
+
+@request_case("DELETE /api/users/<id>", prepare=new_user)
+def delete_user(args, i, prepared):
+    return "DELETE", f"/api/users/{prepared}", {}
+
+
+@request_case("POST /login")
+def login(args, i, prepared):
+    return "POST", "/login", {"data": {"username": "user1", "password": "password"}}
+
+
+# TASKS
+@request_case("POST /api/tasks")
+def post_task(args, i, prepared):
+    task = {"name": f"new task {i}", "created_by": {"id": user_id(args, i)}}
+    return "POST", "/api/tasks", {"json": {"task": task}}
+
+
+@request_case("POST /api/tasks?assign=2")
+def post_assigned_task(args, i, prepared):
+    task = {"name": f"new task {i}", "created_by": {"id": user_id(args, i)}}
+    return "POST", "/api/tasks?assign=2", {"json": {"task": task}}
+
+
+@request_case("GET /api/tasks")
+def get_tasks(args, i, prepared):
+    return "GET", "/api/tasks", {}
+
+
+@request_case("GET /api/tasks?assignee_id&is_completed")
+def get_filtered_tasks(args, i, prepared):
+    return "GET", "/api/tasks", {"query_string": {"assignee_id": user_id(args, i), "is_completed": "false"}}
+
+
+@request_case("GET /api/tasks/search")
+def search_tasks(args, i, prepared):
+    query = ["kitchen floor", "trash", "water plants balcony"][i % 3]
+    return "GET", "/api/tasks/search", {"query_string": {"q": query}}
+
+
+@request_case("GET /api/tasks/<id>")
+def get_task(args, i, prepared):
+    return "GET", f"/api/tasks/{task_id(args, i)}", {}
+
+
+@request_case("PATCH /api/tasks/<id>")
+def patch_task(args, i, prepared):
+    task = {"name": f"renamed {i}", "is_completed": bool(i % 2)}
+    return "PATCH", f"/api/tasks/{task_id(args, i)}", {"json": {"task": task}}
+
+
+@request_case("DELETE /api/tasks/<id>", prepare=lambda i: new_tasks(1)[0])
+def delete_task(args, i, prepared):
+    return "DELETE", f"/api/tasks/{prepared}", {}
+
+
+@request_case("POST /api/tasks/<id>/assign")
+def assign_task(args, i, prepared):
+    return "POST", f"/api/tasks/{task_id(args, i)}/assign", {"json": {"count": 2}}
+
+
+# BATCHES
+@request_case("POST /api/tasks:batch")
+def post_tasks(args, i, prepared):
+    tasks = [{"name": f"batch {i}.{j}", "created_by": {"id": user_id(args, j)}} for j in range(BATCH_SIZE)]
+    return "POST", "/api/tasks:batch", {"json": {"tasks": tasks}}
+
+
+@request_case("PATCH /api/tasks:batch")
+def patch_tasks(args, i, prepared):
+    tasks = [
+        {"id": task_id(args, i * BATCH_SIZE + j), "name": f"batch {i}.{j}"} for j in range(BATCH_SIZE)
+    ]
+    return "PATCH", "/api/tasks:batch", {"json": {"tasks": tasks}}
+
+
+@request_case("DELETE /api/tasks:batch", prepare=lambda i: new_tasks(BATCH_SIZE))
+def delete_tasks(args, i, prepared):
+    return "DELETE", "/api/tasks:batch", {"json": {"ids": prepared}}
+
+
+# RECURRENCES
+def recurring_task_ids():
+    return [task_id for (task_id,) in db.session.query(Recurrence.task_id).order_by(Recurrence.task_id)]
+
+
+@request_case("GET /api/tasks/<id>/recurrence", prepare=lambda i: recurring_task_ids())
+def get_recurrence(args, i, prepared):
+    return "GET", f"/api/tasks/{prepared[i % len(prepared)]}/recurrence", {}
+
+
+@request_case("PUT /api/tasks/<id>/recurrence", prepare=lambda i: new_tasks(1)[0])
+def put_recurrence(args, i, prepared):
+    recurrence = {"rule": "FREQ=WEEKLY;BYDAY=MO,TH", "dtstart": WEEK[0]}
+    return "PUT", f"/api/tasks/{prepared}/recurrence", {"json": {"recurrence": recurrence}}
+
+
+def new_recurring_task(i):
+    (task_id,) = new_tasks(1)
+    db.session.add(Recurrence(task_id=task_id, rule="FREQ=DAILY", dtstart=datagen.NOW))
+    db.session.commit()
+    return task_id
+
+
+@request_case("DELETE /api/tasks/<id>/recurrence", prepare=new_recurring_task)
+def delete_recurrence(args, i, prepared):
+    return "DELETE", f"/api/tasks/{prepared}/recurrence", {}
+
+
+@request_case("GET /api/occurrences")
+def get_occurrences(args, i, prepared):
+    return "GET", "/api/occurrences", {"query_string": {"start": WEEK[0], "end": WEEK[1]}}
+
+
+@request_case("PATCH /api/occurrences", prepare=new_recurring_task)
+def patch_occurrences(args, i, prepared):
+    occurrences = [
+        {
+            "template_id": prepared,
+            "occurrence_at": (datagen.NOW + timedelta(days=day)).isoformat(),
+            "task": {"is_completed": True},
+        }
+        for day in range(10)
+    ]
+    return "PATCH", "/api/occurrences", {"json": {"occurrences": occurrences}}
+
+
+# STATS AND TRANSFER
+@request_case("GET /api/stats/open")
+def get_open_stats(args, i, prepared):
+    return "GET", "/api/stats/open", {}
+
+
+@request_case("GET /api/stats/completions")
+def get_completion_stats(args, i, prepared):
+    return "GET", "/api/stats/completions", {"query_string": {"until": datagen.NOW.date().isoformat()}}
+
+
+@request_case("GET /api/export/tasks", repeat=5)
+def export_tasks(args, i, prepared):
+    return "GET", "/api/export/tasks", {}
+
+
+@request_case("POST /api/import/users")
+def import_users(args, i, prepared):
+    first = 1000000 + i * BATCH_SIZE
+    lines = "".join(
+        f'{{"id": {n}, "email": "import{n}@example.com", "username": "import{n}"}}\n'
+        for n in range(first, first + BATCH_SIZE)
+    )
+    return "POST", "/api/import/users", {"data": lines, "content_type": "application/x-ndjson"}
+
+
+# SYNC
+def recent_changes_token(i, count=50):
+    """A sync token `count` changes behind the latest, wherever the other cases left the log."""
+    (change_id,) = db.session.query(SyncChange.id).order_by(SyncChange.id.desc()).offset(count).first()
+    return encode_token(change_id)
+
+
+@request_case("GET /api/sync, 50 changes", prepare=recent_changes_token)
+def get_sync(args, i, prepared):
+    return "GET", "/api/sync", {"query_string": {"since": prepared}}
+
+
+# SCHEMA DUMPS
+@dump_case("TaskSchema dump, 100 tasks")
+def dump_tasks():
+    schema = get_schema(TaskSchema, many=True)
+    tasks = Task.query.options(*loader_options(Task, schema)).order_by(Task.id).limit(100).all()
+    return lambda: schema.dump(tasks)
+
+
+@dump_case("UserSchema dump, 100 users")
+def dump_users():
+    schema = get_schema(UserSchema, many=True)
+    users = User.query.options(*loader_options(User, schema)).order_by(User.id).limit(100).all()
+    return lambda: schema.dump(users)
+
+
+@dump_case("dump_task_rows, 100 tasks")
+def dump_rows():
+    rows = task_rows_query().order_by(Task.id).limit(100).all()
+    return lambda: dump_task_rows(rows)
+
+
+def run_request(app, client, args, name, first):
+    """Time one round of a request case, returning its latencies and statement counts."""
+    fn, prepare, repeat = REQUESTS[name]
+    repeat = min(repeat or args.repeat, args.repeat)
+    latencies, statements = [], []
+    for i in range(first, first + args.warmup + repeat):
+        prepared = None
+        if prepare is not None:
+            with app.app_context():
+                prepared = prepare(i)
+        method, url, kwargs = fn(args, i, prepared)
+        started = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        response.get_data()
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name} returned {response.status}: {response.get_data(as_text=True)[:200]}")
+        if i >= first + args.warmup:
+            latencies.append(elapsed)
+            match = STATEMENTS_RE.search(response.headers.get("Server-Timing", ""))
+            if match:
+                statements.append(int(match.group(1)))
+    return latencies, statements
+
+
+def run_dump(app, client, args, name, first):
+    with app.app_context():
+        dump = DUMPS[name]()
+        latencies = []
+        for i in range(args.warmup + args.repeat):
+            started = time.perf_counter()
+            dump()
+            if i >= args.warmup:
+                latencies.append(time.perf_counter() - started)
+        db.session.remove()
+    return latencies, []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    datagen.add_arguments(parser)
+    datagen.add_household_argument(parser)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over every case, interleaved.")
+    parser.add_argument("--case", action="append", help="Only run these cases (repeatable).")
+    results.add_arguments(parser)
+    args = parser.parse_args()
+
+    app = datagen.build_app(args.database_url, METRICS_SERVER_TIMING=True)
+    response_cache.backend = UncachedBodies.from_config(app.config)
+    with app.app_context():
+        datagen.seed(
+            args.users, args.tasks, args.assignees_per_task, seed=args.seed, num_households=args.households
+        )
+        user = User.query.get(1)
+        user.set_password("password")
+        db.session.commit()
+
+    # Without cookies every login really checks the password
+    client = app.test_client(use_cookies=False)
+    names = [name for name in list(REQUESTS) + list(DUMPS) if not args.case or name in args.case]
+    samples = {name: [] for name in names}
+    statements = {name: [] for name in names}
+    for round_number in range(args.rounds):
+        first = round_number * (args.warmup + args.repeat)
+        for name in names:
+            run = run_request if name in REQUESTS else run_dump
+            latencies, counts = run(app, client, args, name, first)
+            samples[name].append(latencies)
+            statements[name].extend(counts)
+
+    cases = {}
+    for name in names:
+        cases[name] = results.summarize(sum(samples[name], []), rounds=samples[name])
+        if statements[name]:
+            cases[name]["statements"] = sorted(statements[name])[len(statements[name]) // 2]
+
+    results.print_cases(cases)
+    settings = {
+        "database": app.config["SQLALCHEMY_DATABASE_URI"].split(":")[0],
+        "users": args.users,
+        "tasks": args.tasks,
+        "households": args.households,
+        "assignees_per_task": args.assignees_per_task,
+        "repeat": args.repeat,
+        "rounds": args.rounds,
+    }
+    sys.exit(results.finish(results.report("api", settings, cases), args))
+
+
+if __name__ == "__main__":
+    main()
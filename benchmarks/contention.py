@@ -0,0 +1,130 @@
+"""
+Compare write throughput under contention with version checks and row locks.
+
+    python benchmarks/contention.py --database-url postgresql://localhost/roomies_bench
+    python benchmarks/contention.py --clients 16 --hot-tasks 1 --work-ms 2 --output contention.json
+
+Every client repeatedly completes or reopens one of --hot-tasks tasks: it
+reads the task, spends --work-ms on it as a request would, and writes it
+back. "optimistic" reads without locking and retries when the version
+check refuses the write, which is what PATCH /api/tasks/<id> does with
+If-Match. "locking" reads with SELECT ... FOR UPDATE, so writers to the
+same task wait for each other. Latency covers every attempt of a write.
+
+Only Postgres takes the row locks. SQLite ignores FOR UPDATE, so there
+"locking" retries just like "optimistic", and as it lets a single writer
+in at a time both mostly measure its database lock.
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import datagen  # noqa: E402
+import results  # noqa: E402
+from roomies_todo_list import db  # noqa: E402
+from roomies_todo_list.models import Task  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm.exc import StaleDataError  # noqa: E402
+
+MODES = ("optimistic", "locking")
+
+
+def complete(task_id, user_id, lock, work):
+    query = Task.query.filter(Task.id == task_id)
+    task = (query.with_for_update() if lock else query).one()
+    time.sleep(work)
+    task.is_completed = not task.is_completed
+    task.completed_by_id = user_id if task.is_completed else None
+    task.completed_at = datetime.now() if task.is_completed else None
+    task.updated_at = datetime.now()
+    db.session.commit()
+
+
+def client(app, mode, args, deadline, seed, latencies, counts):
+    rng = random.Random(seed)
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            task_id, user_id = rng.randint(1, args.hot_tasks), rng.randint(1, args.users)
+            started = time.perf_counter()
+            while True:
+                try:
+                    complete(task_id, user_id, mode == "locking", args.work_ms / 1000)
+                    break
+                except StaleDataError:
+                    db.session.rollback()
+                    counts["retries"] += 1
+                except OperationalError:
+                    # SQLite's database lock timed out
+                    db.session.rollback()
+                    counts["errors"] += 1
+            latencies.append(time.perf_counter() - started)
+        db.session.remove()
+
+
+def run(app, mode, args):
+    latencies, counts = [], defaultdict(int)
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    clients = [
+        threading.Thread(target=client, args=(app, mode, args, deadline, seed, latencies, counts))
+        for seed in range(args.clients)
+    ]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+
+    case = results.summarize(latencies, time.perf_counter() - started)
+    case["retries"] = counts["retries"]
+    case["errors"] = counts["errors"]
+    return case
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    datagen.add_arguments(parser, tasks=1000)
+    parser.add_argument("--mode", choices=MODES, action="append", help="Run only this mode; repeatable.")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--hot-tasks", type=int, default=4, help="How many tasks the clients fight over.")
+    parser.add_argument("--work-ms", type=float, default=1, help="Time spent between reading and writing.")
+    parser.add_argument("--seconds", type=float, default=10, help="Per mode.")
+    results.add_arguments(parser)
+    args = parser.parse_args()
+    logging.getLogger("sqlalchemy.orm").setLevel(logging.ERROR)
+
+    app = datagen.build_app(args.database_url)
+    if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        # One connection per client, so nobody waits on the pool instead of the row
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"pool_size": args.clients, "max_overflow": 0}
+    cases = {}
+    for mode in args.mode or MODES:
+        with app.app_context():
+            datagen.seed(args.users, args.tasks, args.assignees_per_task, seed=args.seed)
+        cases[mode] = run(app, mode, args)
+
+    print(f"{args.clients} clients on {args.hot_tasks} tasks, {args.work_ms}ms between read and write")
+    results.print_cases(cases)
+    for mode, case in cases.items():
+        print(f"{mode}: {case['retries']} retries, {case['errors']} lock timeouts")
+    settings = {
+        "database": app.config["SQLALCHEMY_DATABASE_URI"].split(":")[0],
+        "users": args.users,
+        "tasks": args.tasks,
+        "clients": args.clients,
+        "hot_tasks": args.hot_tasks,
+        "work_ms": args.work_ms,
+        "seconds": args.seconds,
+    }
+    sys.exit(results.finish(results.report("contention", settings, cases), args))
+
+
+if __name__ == "__main__":
+    main()
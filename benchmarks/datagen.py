@@ -0,0 +1,209 @@
+"""
+Fill a database with reproducible households of users, tasks and assignees.
+
+    python benchmarks/datagen.py --database-url sqlite:////tmp/roomies_bench.db --tasks 100000
+    python benchmarks/datagen.py --database-url postgresql://localhost/roomies_bench
+    python benchmarks/datagen.py --users 100000 --tasks 1000000 --households 10000
+
+Every existing row is deleted first, so never point this at real data.
+SQLite tables are recreated from the models. Postgres keeps its schema, so
+run `flask db upgrade` against it beforehand to get the search column too. The same
+arguments always produce the same rows.
+
+With --households the users and tasks are split evenly into contiguous id
+ranges, household 1 getting the first of each, and tasks only reference
+users of their own household.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from roomies_todo_list import create_app, db  # noqa: E402
+from roomies_todo_list.models import Household, Recurrence, Task, TaskAssignee, User  # noqa: E402
+from roomies_todo_list.stats import rebuild_completion_stats  # noqa: E402
+from roomies_todo_list.sync import rebuild_sync_changes  # noqa: E402
+
+CHUNK_SIZE = 10000
+NOW = datetime(2026, 1, 1)
+
+VERBS = ["clean", "wash", "take out", "buy", "fix", "water", "vacuum", "sweep", "organize", "refill"]
+OBJECTS = [
+    "trash", "dishes", "kitchen", "bathroom", "plants", "floor", "fridge", "laundry",
+    "recycling", "windows", "oven", "towels", "groceries", "shelves", "mirror", "porch",
+]
+PLACES = ["upstairs", "downstairs", "garage", "hallway", "living room", "balcony", "basement"]
+RULES = ["FREQ=DAILY", "FREQ=WEEKLY", "FREQ=WEEKLY;BYDAY=MO,TH", "FREQ=DAILY;INTERVAL=3", "FREQ=MONTHLY"]
+
+
+@event.listens_for(Engine, "connect")
+def _skip_sqlite_fsync(dbapi_connection, connection_record):
+    # Benchmarks measure the code; waiting on the disk after every commit
+    # only adds noise.
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute("PRAGMA synchronous = OFF")
+
+
+def household_of(row_id, count, num_households):
+    """The household the `row_id`th of `count` users or tasks belongs to."""
+    return (row_id - 1) * num_households // count + 1
+
+
+def first_of(household_id, count, num_households):
+    """The first of `count` ids that belongs to `household_id`."""
+    return -(-(household_id - 1) * count // num_households) + 1
+
+
+def households(count):
+    for i in range(1, count + 1):
+        yield {"id": i, "name": "Default" if i == 1 else f"Household {i}", "created_at": NOW}
+
+
+def users(count, num_households=1):
+    for i in range(1, count + 1):
+        yield {
+            "id": i,
+            "household_id": household_of(i, count, num_households),
+            "email": f"user{i}@example.com",
+            "username": f"user{i}",
+            "first_name": f"First{i}",
+            "last_name": f"Last{i}",
+            "created_at": NOW,
+        }
+
+
+def tasks(count, num_users, assignees_per_task, recurring=0.01, seed=42, num_households=1):
+    """
+    Yield (tasks, assignees, recurrences) row chunks of CHUNK_SIZE tasks.
+
+    About 60% of tasks are completed, due dates spread over the year
+    around NOW, and `recurring` of them are templates of a recurring chore.
+    """
+    rng = random.Random(seed)
+    for start in range(1, count + 1, CHUNK_SIZE):
+        task_rows, assignee_rows, recurrence_rows = [], [], []
+        for task_id in range(start, min(start + CHUNK_SIZE, count + 1)):
+            household_id = household_of(task_id, count, num_households)
+            first_user = first_of(household_id, num_users, num_households)
+            last_user = first_of(household_id + 1, num_users, num_households) - 1
+            completed = rng.random() < 0.6
+            task_rows.append(
+                {
+                    "id": task_id,
+                    "household_id": household_id,
+                    "name": f"{rng.choice(VERBS)} {rng.choice(OBJECTS)}",
+                    "description": f"{rng.choice(VERBS)} the {rng.choice(OBJECTS)} in the {rng.choice(PLACES)}",
+                    "created_by_id": rng.randint(first_user, last_user),
+                    "completed_by_id": rng.randint(first_user, last_user) if completed else None,
+                    "completed_at": NOW - timedelta(days=rng.randint(0, 90)) if completed else None,
+                    "due_date": NOW + timedelta(days=rng.randint(-180, 180)),
+                    "created_at": NOW - timedelta(seconds=count - task_id),
+                    "is_completed": completed,
+                }
+            )
+            roommates = range(first_user, last_user + 1)
+            for user_id in rng.sample(roommates, min(assignees_per_task, len(roommates))):
+                assignee_rows.append(
+                    {"household_id": household_id, "task_id": task_id, "user_id": user_id, "created_at": NOW}
+                )
+            if rng.random() < recurring:
+                recurrence_rows.append(
+                    {
+                        "task_id": task_id,
+                        "rule": rng.choice(RULES),
+                        "dtstart": NOW - timedelta(days=rng.randint(0, 365)),
+                        "created_at": NOW,
+                    }
+                )
+        yield task_rows, assignee_rows, recurrence_rows
+
+
+def build_app(database_url=None, **config):
+    """A testing app bound to `database_url`, by default a throwaway SQLite file."""
+    app = create_app("testing")
+    app.config.update(SQLALCHEMY_DATABASE_URI=database_url or "sqlite:////tmp/roomies_bench.db", **config)
+    return app
+
+
+def reset(engine):
+    if engine.dialect.name != "postgresql":
+        db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for table in reversed(db.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+def seed(num_users, num_tasks, assignees_per_task=2, recurring=0.01, seed=42, num_households=1):
+    """Replace everything in the app's database with generated rows."""
+    if num_households > num_users:
+        raise ValueError("Every household needs at least one user.")
+    engine = db.engine
+    reset(engine)
+    with engine.begin() as conn:
+        conn.execute(Household.__table__.insert(), list(households(num_households)))
+        conn.execute(User.__table__.insert(), list(users(num_users, num_households)))
+    for task_rows, assignee_rows, recurrence_rows in tasks(
+        num_tasks, num_users, assignees_per_task, recurring, seed, num_households
+    ):
+        with engine.begin() as conn:
+            conn.execute(Task.__table__.insert(), task_rows)
+            if assignee_rows:
+                conn.execute(TaskAssignee.__table__.insert(), assignee_rows)
+            if recurrence_rows:
+                conn.execute(Recurrence.__table__.insert(), recurrence_rows)
+
+    rebuild_completion_stats()
+    rebuild_sync_changes()
+    db.session.commit()
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for table in ("households", "users", "tasks", "recurrences"):
+                conn.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+                )
+    # Without statistics SQLite takes an equality on household_id, the
+    # leading column of most indexes, to be selective even when every row
+    # is in one household, and prefers it to primary key lookups.
+    with engine.begin() as conn:
+        conn.execute("ANALYZE")
+
+
+def add_arguments(parser, users=100, tasks=10000):
+    parser.add_argument("--database-url", default=None, help="Defaults to a throwaway SQLite file.")
+    parser.add_argument("--users", type=int, default=users)
+    parser.add_argument("--tasks", type=int, default=tasks)
+    parser.add_argument("--assignees-per-task", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def add_household_argument(parser):
+    parser.add_argument("--households", type=int, default=1, help="Split users and tasks between this many.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_arguments(parser)
+    add_household_argument(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with build_app(args.database_url).app_context():
+        seed(args.users, args.tasks, args.assignees_per_task, seed=args.seed, num_households=args.households)
+    print(
+        f"Seeded {args.users} users and {args.tasks} tasks in {args.households} households "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare JSON encoders and response compression on a 10k-task response.
+
+    python benchmarks/encoding.py --tasks 10000
+
+Encodes the task list body with each available encoder (orjson only when
+installed), then reports the bytes on the wire and compression time for
+every Content-Encoding at a few levels ("br" only when brotli is
+installed), and for the streamed NDJSON export through the app.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import datagen  # noqa: E402
+from flask import json  # noqa: E402
+
+from roomies_todo_list import compression  # noqa: E402
+from roomies_todo_list.encoding import JSONEncoder, OrjsonEncoder, brotli, orjson  # noqa: E402
+from roomies_todo_list.models import Task  # noqa: E402
+from roomies_todo_list.serializers import dump_task_rows, task_rows_query  # noqa: E402
+
+
+def median_ms(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    datagen.add_arguments(parser, tasks=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    app = datagen.build_app(args.database_url)
+    with app.app_context():
+        datagen.seed(args.users, args.tasks, args.assignees_per_task, seed=args.seed)
+        body = {"tasks": dump_task_rows(task_rows_query().order_by(Task.id).all())}
+
+        encoders = [JSONEncoder] + ([OrjsonEncoder] if orjson is not None else [])
+        for encoder in encoders:
+            app.json_encoder = encoder
+            encoded = json.dumps(body, separators=(",", ":")).encode()
+            elapsed = median_ms(lambda: json.dumps(body, separators=(",", ":")), args.repeat)
+            print(f"{encoder.__name__:>14}: {len(body['tasks'])} tasks, {len(encoded)} bytes in {elapsed:.1f} ms")
+
+        print(f"{'identity':>14}: {len(encoded)} bytes")
+        settings = [("gzip", "level", level) for level in (1, 6, 9)]
+        if brotli is not None:
+            settings += [("br", "br_quality", quality) for quality in (1, 4, 6)]
+        for encoding, attr, value in settings:
+            setattr(compression, attr, value)
+            compressed = compression.compress(encoded, encoding)
+            elapsed = median_ms(lambda: compression.compress(encoded, encoding), args.repeat)
+            print(
+                f"{encoding + ' ' + str(value):>14}: {len(compressed)} bytes "
+                f"({len(compressed) / len(encoded):.1%}) in {elapsed:.1f} ms"
+            )
+        compression.init_app(app)
+
+    client = app.test_client()
+    print("streamed export:")
+    for accept in ("identity", "gzip", "br"):
+        started = time.perf_counter()
+        response = client.get("/api/export/tasks", headers={"Accept-Encoding": accept})
+        size = len(response.get_data())
+        elapsed = (time.perf_counter() - started) * 1000
+        encoding = response.headers.get("Content-Encoding", "identity")
+        print(f"{encoding:>14}: {size} bytes in {elapsed:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
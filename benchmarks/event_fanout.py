@@ -0,0 +1,76 @@
+"""
+Fan task events out to many idle subscribers and report delivery latency.
+
+    python benchmarks/event_fanout.py --subscribers 1000 --events 200
+    python benchmarks/event_fanout.py --subscribers 5000 --gevent
+
+With --gevent the subscribers are greenlets, as they are on a
+`gunicorn -k gevent` worker; otherwise each one is an OS thread.
+"""
+import argparse
+import sys
+
+if "--gevent" in sys.argv:
+    from gevent import monkey
+
+    monkey.patch_all()
+
+import json  # noqa: E402
+import os  # noqa: E402
+import statistics  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from roomies_todo_list.events import EventLog  # noqa: E402
+
+
+def subscribe(log, expected, latencies):
+    cursor = log.last_id
+    received = 0
+    while received < expected:
+        for event_id, _, data, _ in log.wait(cursor, timeout=5) or ():
+            latencies.append(time.perf_counter() - json.loads(data)["sent"])
+            cursor = event_id
+            received += 1
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.01)
+    parser.add_argument("--gevent", action="store_true")
+    args = parser.parse_args()
+
+    log = EventLog(maxlen=args.events)
+    latencies = []
+    subscribers = [
+        threading.Thread(target=subscribe, args=(log, args.events, latencies))
+        for _ in range(args.subscribers)
+    ]
+    for subscriber in subscribers:
+        subscriber.start()
+    time.sleep(1)
+
+    start = time.perf_counter()
+    for i in range(args.events):
+        log.publish("updated", {"id": i, "sent": time.perf_counter()})
+        time.sleep(args.interval)
+    for subscriber in subscribers:
+        subscriber.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} deliveries to {args.subscribers} subscribers in {elapsed:.2f}s")
+    for pct in (50, 95, 99):
+        print(f"  p{pct}: {percentile(latencies, pct) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Seed a large tasks table and compare query plans and latencies for the hot
+task queries with and without the secondary indexes on tasks and
+tasks_assignees.
+
+    python benchmarks/indexes.py --database-url postgresql://localhost/roomies_bench
+
+The target database is dropped and recreated, so never point this at real data.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from roomies_todo_list import db  # noqa: E402
+from roomies_todo_list.models import Household, Task, TaskAssignee, User  # noqa: E402
+
+CHUNK_SIZE = 10000
+NOW = datetime(2026, 1, 1)
+HOUSEHOLD_ID = 1
+
+QUERIES = {
+    "my open tasks": """
+        SELECT tasks.id FROM tasks
+        JOIN tasks_assignees ON tasks_assignees.task_id = tasks.id
+        WHERE tasks.household_id = :household_id
+        AND tasks_assignees.user_id = :user_id AND NOT tasks.is_completed
+        ORDER BY tasks.due_date LIMIT 50
+    """,
+    "overdue tasks": """
+        SELECT id FROM tasks
+        WHERE household_id = :household_id AND NOT is_completed AND due_date < :now
+        ORDER BY due_date LIMIT 100
+    """,
+    "created by user": """
+        SELECT id FROM tasks WHERE created_by_id = :user_id LIMIT 100
+    """,
+    "completed by user": """
+        SELECT count(*) FROM tasks
+        WHERE completed_by_id = :user_id AND completed_at >= :since
+    """,
+    "due this week": """
+        SELECT id FROM tasks
+        WHERE household_id = :household_id AND due_date >= :now AND due_date < :week LIMIT 100
+    """,
+}
+
+# Everything except primary keys and the constraints needed for correctness.
+INDEXES = [
+    index
+    for table in (Task.__table__, TaskAssignee.__table__)
+    for index in table.indexes
+    if index.name != "ix_tasks_household_id_created_at_id"
+]
+
+
+def seed(engine, num_users, num_tasks, assignees_per_task):
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    rng = random.Random(42)
+
+    with engine.begin() as conn:
+        conn.execute(Household.__table__.insert(), {"id": HOUSEHOLD_ID, "name": "Default", "created_at": NOW})
+        conn.execute(
+            User.__table__.insert(),
+            [
+                {
+                    "household_id": HOUSEHOLD_ID,
+                    "email": f"user{i}@example.com",
+                    "username": f"user{i}",
+                    "created_at": NOW,
+                }
+                for i in range(1, num_users + 1)
+            ],
+        )
+
+    for start in range(1, num_tasks + 1, CHUNK_SIZE):
+        ids = range(start, min(start + CHUNK_SIZE, num_tasks + 1))
+        tasks, assignees = [], []
+        for task_id in ids:
+            completed = rng.random() < 0.8
+            tasks.append(
+                {
+                    "id": task_id,
+                    "household_id": HOUSEHOLD_ID,
+                    "name": f"task {task_id}",
+                    "created_by_id": rng.randint(1, num_users),
+                    "completed_by_id": rng.randint(1, num_users) if completed else None,
+                    "completed_at": NOW - timedelta(days=rng.randint(0, 365)) if completed else None,
+                    "due_date": NOW + timedelta(days=rng.randint(-365, 365)),
+                    "created_at": NOW,
+                    "is_completed": completed,
+                }
+            )
+            for user_id in rng.sample(range(1, num_users + 1), assignees_per_task):
+                assignees.append(
+                    {"household_id": HOUSEHOLD_ID, "task_id": task_id, "user_id": user_id, "created_at": NOW}
+                )
+        with engine.begin() as conn:
+            conn.execute(Task.__table__.insert(), tasks)
+            conn.execute(TaskAssignee.__table__.insert(), assignees)
+
+
+def explain(conn, sql, params):
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    rows = conn.execute(text(prefix + sql), params).fetchall()
+    return "\n".join("    " + " ".join(str(col) for col in row) for row in rows)
+
+
+def measure(engine, num_users, repeat):
+    results = {}
+    rng = random.Random(7)
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE"))
+        for label, sql in QUERIES.items():
+            timings = []
+            for _ in range(repeat):
+                params = {
+                    "household_id": HOUSEHOLD_ID,
+                    "user_id": rng.randint(1, num_users),
+                    "now": NOW,
+                    "week": NOW + timedelta(days=7),
+                    "since": NOW - timedelta(days=7),
+                }
+                start = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[label] = (statistics.median(timings), explain(conn, sql, params))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:////tmp/roomies_bench.db")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--tasks", type=int, default=1000000)
+    parser.add_argument("--assignees-per-task", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    print(f"Seeding {args.tasks} tasks across {args.users} users...")
+    seed(engine, args.users, args.tasks, args.assignees_per_task)
+
+    for index in INDEXES:
+        index.drop(engine)
+    before = measure(engine, args.users, args.repeat)
+    for index in INDEXES:
+        index.create(engine)
+    after = measure(engine, args.users, args.repeat)
+
+    for label in QUERIES:
+        (before_ms, before_plan), (after_ms, after_plan) = before[label], after[label]
+        print(f"\n{label}: {before_ms:.2f} ms -> {after_ms:.2f} ms (median of {args.repeat})")
+        print(f"  without indexes:\n{before_plan}")
+        print(f"  with indexes:\n{after_plan}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Drive the API with concurrent clients and report latency and throughput.
+
+    python benchmarks/load.py --clients 16 --seconds 30 --output load.json
+    python benchmarks/load.py --database-url postgresql://localhost/roomies_bench --baseline load.json
+    python benchmarks/load.py --url http://127.0.0.1:8000 --users 100 --tasks 10000
+
+Seeds the database with datagen.py and serves the app from a threaded
+server in this process, unless --url points at one already running (seed
+it with datagen.py and pass the same --users/--tasks). Each client sends a
+weighted mix of reads and writes for --seconds, and the p50/p95/p99
+latency and throughput of every kind of request are reported.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from urllib import error, request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import datagen  # noqa: E402
+import results  # noqa: E402
+from werkzeug.serving import make_server  # noqa: E402
+
+# (weight, name, method, path, body); paths and bodies are filled in from
+# a random user id and task id
+MIX = [
+    (35, "GET /api/tasks", "GET", "/api/tasks?limit=50", None),
+    (15, "GET /api/tasks/<id>", "GET", "/api/tasks/{task_id}", None),
+    (10, "GET /api/tasks?assignee_id", "GET", "/api/tasks?assignee_id={user_id}&is_completed=false", None),
+    (5, "GET /api/tasks/search", "GET", "/api/tasks/search?q=kitchen+floor", None),
+    (5, "GET /api/users/<id>", "GET", "/api/users/{user_id}", None),
+    (5, "GET /api/stats/open", "GET", "/api/stats/open", None),
+    (12, "PATCH /api/tasks/<id>", "PATCH", "/api/tasks/{task_id}", {"task": {"is_completed": True}}),
+    (
+        8,
+        "POST /api/tasks",
+        "POST",
+        "/api/tasks",
+        {"task": {"name": "load task", "created_by": {"id": "{user_id}"}}},
+    ),
+    (5, "POST /api/tasks/<id>/assign", "POST", "/api/tasks/{task_id}/assign", {"count": 2}),
+]
+
+
+def fill(value, ids):
+    if isinstance(value, str):
+        return int(ids[value[1:-1]]) if value in ("{user_id}", "{task_id}") else value.format(**ids)
+    if isinstance(value, dict):
+        return {key: fill(item, ids) for key, item in value.items()}
+    return value
+
+
+def client(base, args, deadline, seed, samples, failures):
+    rng = random.Random(seed)
+    weights = [weight for weight, *_ in MIX]
+    while time.perf_counter() < deadline:
+        _, name, method, path, body = rng.choices(MIX, weights)[0]
+        ids = {"user_id": rng.randint(1, args.users), "task_id": rng.randint(1, args.tasks)}
+        data = json.dumps(fill(body, ids)).encode() if body is not None else None
+        req = request.Request(
+            base + fill(path, ids), data=data, method=method, headers={"Content-Type": "application/json"}
+        )
+        started = time.perf_counter()
+        try:
+            with request.urlopen(req) as response:
+                response.read()
+        except (error.URLError, ConnectionError) as exc:
+            failures[name] += 1
+            if not isinstance(exc, error.HTTPError):
+                time.sleep(0.01)
+            continue
+        samples[name].append(time.perf_counter() - started)
+
+
+def serve(args):
+    app = datagen.build_app(args.database_url, RESPONSE_CACHE_MAX_ENTRIES=args.response_cache_entries)
+    with app.app_context():
+        datagen.seed(args.users, args.tasks, args.assignees_per_task, seed=args.seed)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}", app.config["SQLALCHEMY_DATABASE_URI"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    datagen.add_arguments(parser)
+    parser.add_argument("--url", help="Load an already running server instead of starting one.")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--response-cache-entries", type=int, default=1024, help="0 disables response caching.")
+    results.add_arguments(parser)
+    args = parser.parse_args()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    server = None
+    if args.url:
+        base, database = args.url.rstrip("/"), "external"
+    else:
+        server, base, database = serve(args)
+
+    samples, failures = defaultdict(list), defaultdict(int)
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    clients = [
+        threading.Thread(target=client, args=(base, args, deadline, seed, samples, failures))
+        for seed in range(args.clients)
+    ]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if server is not None:
+        server.shutdown()
+
+    cases = {name: results.summarize(samples[name], elapsed) for _, name, *_ in MIX if samples[name]}
+    cases["all"] = results.summarize(sum(samples.values(), []), elapsed)
+
+    print(f"{args.clients} clients for {args.seconds:.0f}s against {base}")
+    results.print_cases(cases)
+    if failures:
+        print(f"failures: {dict(failures)}")
+    settings = {
+        "database": database.split(":")[0],
+        "users": args.users,
+        "tasks": args.tasks,
+        "assignees_per_task": args.assignees_per_task,
+        "clients": args.clients,
+        "seconds": args.seconds,
+        "response_cache_entries": args.response_cache_entries,
+    }
+    report = results.report("load", settings, cases)
+    report["failures"] = dict(failures)
+    sys.exit(results.finish(report, args))
+
+
+if __name__ == "__main__":
+    main()
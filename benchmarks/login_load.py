@@ -0,0 +1,110 @@
+"""
+Measure API latency while a burst of concurrent logins is being hashed.
+
+    python benchmarks/login_load.py --workers 0       # hash inline
+    python benchmarks/login_load.py --workers 4       # hash in a process pool
+
+Serves the app from a threaded server against a throwaway SQLite database,
+keeps --logins login requests in flight, and reports GET /api/users/<id>
+latency percentiles alongside how many logins succeeded or were shed.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from urllib import error, parse, request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from roomies_todo_list import create_app, db  # noqa: E402
+from roomies_todo_list.models import User  # noqa: E402
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def build_app(args, path):
+    app = create_app("testing")
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}",
+        RESPONSE_CACHE_MAX_ENTRIES=0,
+        PASSWORD_HASH_ITERATIONS=args.iterations,
+        PASSWORD_HASH_WORKERS=args.workers,
+        PASSWORD_HASH_MAX_PENDING=args.max_pending,
+    )
+    from roomies_todo_list import password_hasher
+
+    password_hasher.init_app(app)
+    with app.app_context():
+        db.create_all()
+        user = User(email="bench@example.com", username="bench")
+        user.set_password("password")
+        db.session.add(user)
+        db.session.commit()
+    return app
+
+
+def log_in(base, deadline, outcomes):
+    data = parse.urlencode({"username": "bench", "password": "password"}).encode()
+    while time.perf_counter() < deadline:
+        try:
+            with request.urlopen(f"{base}/login", data=data) as response:
+                outcomes.append(response.status)
+        except error.HTTPError as exc:
+            outcomes.append(exc.code)
+            if exc.code == 503:
+                time.sleep(float(exc.headers.get("Retry-After", 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--max-pending", type=int, default=32)
+    parser.add_argument("--iterations", type=int, default=150000)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(args, os.path.join(tmp, "bench.db"))
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+
+        deadline = time.perf_counter() + args.seconds
+        outcomes = []
+        logins = [
+            threading.Thread(target=log_in, args=(base, deadline, outcomes))
+            for _ in range(args.logins)
+        ]
+        for login in logins:
+            login.start()
+
+        latencies = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            with request.urlopen(f"{base}/api/users/1") as response:
+                response.read()
+            latencies.append(time.perf_counter() - start)
+        for login in logins:
+            login.join()
+        server.shutdown()
+
+    latencies.sort()
+    mode = f"{args.workers} hashing workers" if args.workers else "inline hashing"
+    print(f"{args.logins} concurrent logins, {mode}, {args.iterations} iterations")
+    print(f"  logins: {outcomes.count(200) + outcomes.count(302)} ok, {outcomes.count(503)} shed")
+    print(f"  GET /api/users/1 ({len(latencies)} requests):")
+    for pct in (50, 95, 99):
+        print(f"    p{pct}: {percentile(latencies, pct) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
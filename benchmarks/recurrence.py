@@ -0,0 +1,75 @@
+"""
+Expand a building's worth of recurring chores over a window.
+
+    python benchmarks/recurrence.py --rules 1000 --days 365
+
+Times the arithmetic expansion used for plain DAILY/WEEKLY rules against
+dateutil's rrule iterator for the same rules.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from dateutil.rrule import rrulestr  # noqa: E402
+
+from roomies_todo_list.recurrence import compile_rule  # noqa: E402
+
+RULES = [
+    "FREQ=DAILY",
+    "FREQ=DAILY;INTERVAL=2",
+    "FREQ=WEEKLY",
+    "FREQ=WEEKLY;BYDAY=TU",
+    "FREQ=WEEKLY;BYDAY=MO,WE,FR",
+    "FREQ=WEEKLY;BYDAY=SA;INTERVAL=2",
+]
+
+
+def timed(expand, rules, start, end):
+    began = time.perf_counter()
+    count = sum(len(expand(rule, dtstart, start, end)) for rule, dtstart in rules)
+    return time.perf_counter() - began, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rules", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--daily-only", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start = datetime(2026, 1, 1)
+    end = start + timedelta(days=args.days)
+    rules = [
+        (
+            "FREQ=DAILY" if args.daily_only else rng.choice(RULES),
+            start + timedelta(hours=rng.randrange(24 * 30)),
+        )
+        for _ in range(args.rules)
+    ]
+
+    fast, count = timed(lambda *rule: compile_rule(*rule[:2]).between(*rule[2:]), rules, start, end)
+    slow, slow_count = timed(
+        lambda rule, dtstart, start, end: [
+            occurrence
+            for occurrence in rrulestr(rule, dtstart=dtstart).between(start, end, inc=True)
+            if occurrence < end
+        ],
+        rules,
+        start,
+        end,
+    )
+    assert count == slow_count
+
+    print(f"{args.rules} rules over {args.days} days, {count} occurrences")
+    print(f"  arithmetic: {fast * 1000:.1f} ms")
+    print(f"  dateutil:   {slow * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
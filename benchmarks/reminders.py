@@ -0,0 +1,128 @@
+"""
+Schedule a million reminders and report memory, firing accuracy and load times.
+
+    python benchmarks/reminders.py --pending 1000000
+    python benchmarks/reminders.py --tasks 1000000 --database-url postgresql://localhost/roomies_bench
+
+First times the timing wheel on its own: `--pending` reminders, `--due` of
+them coming due over the next `--seconds` and the rest over the next day,
+fired in real time the way `flask reminders run` does, reporting how late
+each one went out. Then seeds a database with datagen and times loading
+the reminder window and picking up `--updates` rescheduled tasks from the
+changelog.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import datagen  # noqa: E402
+
+from roomies_todo_list import db  # noqa: E402
+from roomies_todo_list.models import Task  # noqa: E402
+from roomies_todo_list.reminders import ReminderSink, TimingWheel, scheduler  # noqa: E402
+
+
+class CountingSink(ReminderSink):
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, reminders):
+        self.sent += len(reminders)
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def deadlines(pending, due, seconds, now, seed):
+    rng = random.Random(seed)
+    return [now + (rng.uniform(0, seconds) if key < due else rng.uniform(seconds, 86400)) for key in range(pending)]
+
+
+def fill(wheel, when):
+    for key, deadline in enumerate(when):
+        wheel.add(key, deadline)
+
+
+def bench_wheel(args):
+    tracemalloc.start()
+    when = deadlines(args.pending, args.due, args.seconds, time.time(), args.seed)
+    before = tracemalloc.get_traced_memory()[0]
+    wheel = TimingWheel(time.time())
+    fill(wheel, when)
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del wheel
+
+    # Start the clock once the wheel is full, so none of them are overdue
+    # before it starts turning.
+    started = time.perf_counter()
+    fill(TimingWheel(time.time()), when)
+    elapsed = time.perf_counter() - started
+    when = deadlines(args.pending, args.due, args.seconds, time.time() + elapsed + 1, args.seed)
+    wheel = TimingWheel(time.time())
+    fill(wheel, when)
+    print(f"timing wheel: {args.pending} reminders added in {elapsed:.2f}s, {memory / 2 ** 20:.0f} MiB")
+
+    lateness = []
+    while len(lateness) < args.due:
+        now = time.time()
+        for key in wheel.advance(now):
+            lateness.append(time.time() - when[key])
+        time.sleep(wheel.resolution - time.time() % wheel.resolution)
+    lateness.sort()
+    print(
+        f"  fired {len(lateness)} over {args.seconds}s, late by p50 {percentile(lateness, 50) * 1000:.0f} ms, "
+        f"p99 {percentile(lateness, 99) * 1000:.0f} ms, max {lateness[-1] * 1000:.0f} ms, "
+        f"{len(wheel)} still pending"
+    )
+
+
+def bench_scheduler(args):
+    with datagen.build_app(args.database_url).app_context():
+        datagen.seed(args.users, args.tasks, seed=args.seed)
+        scheduler.sink = CountingSink()
+        scheduler.window_seconds = 7 * 86400
+        now = datagen.NOW.timestamp()
+
+        started = time.perf_counter()
+        scheduler.start(now)
+        print(
+            f"scheduler: loaded {len(scheduler.wheel)} open tasks due within 7 days of {args.tasks} "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+
+        rng = random.Random(args.seed)
+        for task in Task.query.filter(Task.id.in_(rng.sample(range(1, args.tasks + 1), args.updates))):
+            task.due_date = datagen.NOW + timedelta(hours=rng.uniform(1, 48))
+        db.session.commit()
+        started = time.perf_counter()
+        scheduler.poll_changes(now)
+        print(f"  picked up {args.updates} rescheduled tasks in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        started = time.perf_counter()
+        sent = scheduler.step(now + 2 * 86400)
+        print(f"  sent {sent} reminders due over two days in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    datagen.add_arguments(parser, tasks=100000)
+    parser.add_argument("--pending", type=int, default=1000000)
+    parser.add_argument("--due", type=int, default=50000)
+    parser.add_argument("--seconds", type=int, default=5)
+    parser.add_argument("--updates", type=int, default=1000)
+    args = parser.parse_args()
+
+    bench_wheel(args)
+    bench_scheduler(args)
+
+
+if __name__ == "__main__":
+    main()
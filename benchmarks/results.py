@@ -0,0 +1,139 @@
+"""
+Save benchmark results as JSON and compare them against a stored baseline.
+
+    python benchmarks/results.py new.json baseline.json --threshold 0.25
+
+Exits with status 1 when any case got slower than the baseline by more
+than the threshold, or now runs more SQL statements. api.py and load.py
+take the same --output, --baseline and --threshold options.
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def summarize(latencies, seconds=None, rounds=None):
+    """
+    Latency percentiles in milliseconds, plus throughput when `seconds` is
+    the wall time. With the latencies split into `rounds`, also the lowest
+    per-round median, which is what comparisons use: a burst of load on the
+    machine during one round does not move it.
+    """
+    latencies = sorted(latencies)
+    summary = {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+    summary["ops_per_sec"] = round(len(latencies) / (seconds or sum(latencies)), 1)
+    if rounds:
+        summary["best_p50_ms"] = round(min(percentile(sorted(r), 50) for r in rounds) * 1000, 3)
+    return summary
+
+
+def report(benchmark, settings, cases):
+    return {
+        "benchmark": benchmark,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": settings,
+        "cases": cases,
+    }
+
+
+def print_cases(cases):
+    width = max(len(name) for name in cases)
+    print(f"{'case':<{width}}  {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>9} {'stmts':>6}")
+    for name, case in cases.items():
+        statements = case.get("statements", "")
+        print(
+            f"{name:<{width}}  {case['p50_ms']:>9.3f} {case['p95_ms']:>9.3f} "
+            f"{case['p99_ms']:>9.3f} {case['ops_per_sec']:>9.1f} {statements:>6}"
+        )
+
+
+def save(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, threshold=0.25):
+    """
+    Print how each case moved against `baseline` and return the names of
+    the cases that regressed.
+
+    Latency is compared at the best round's p50 when there were rounds and
+    at p50 otherwise, those being the most stable figures over short runs.
+    Statement counts are deterministic, so any increase counts.
+    """
+    if results["benchmark"] != baseline["benchmark"]:
+        raise ValueError(f"Cannot compare {results['benchmark']} results with a {baseline['benchmark']} baseline.")
+    if results["settings"] != baseline["settings"]:
+        print(f"warning: settings differ from the baseline's {baseline['settings']}", file=sys.stderr)
+
+    regressions = []
+    for name, case in results["cases"].items():
+        before = baseline["cases"].get(name)
+        if before is None:
+            print(f"  new        {name}")
+            continue
+        key = "best_p50_ms" if "best_p50_ms" in case and "best_p50_ms" in before else "p50_ms"
+        change = case[key] / before[key] - 1 if before[key] else 0
+        more_statements = case.get("statements", 0) > before.get("statements", 0)
+        slower = change > threshold
+        if slower or more_statements:
+            regressions.append(name)
+        status = "REGRESSED" if slower or more_statements else "ok"
+        detail = f"{key[:-3]} {before[key]:.3f} -> {case[key]:.3f} ms ({change:+.1%})"
+        if "statements" in case:
+            detail += f", statements {before.get('statements')} -> {case['statements']}"
+        print(f"  {status:<10} {name}: {detail}")
+    return regressions
+
+
+def add_arguments(parser):
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare against results saved earlier with --output.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed p50 slowdown (default 25%%).")
+
+
+def finish(results, args):
+    """Handle the --output and --baseline options; returns the process exit status."""
+    if args.output:
+        save(results, args.output)
+    if not args.baseline:
+        return 0
+    print(f"\nAgainst {args.baseline}:")
+    regressions = compare(results, load(args.baseline), args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("results")
+    parser.add_argument("baseline")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    regressions = compare(load(args.results), load(args.baseline), args.threshold)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
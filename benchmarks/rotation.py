@@ -0,0 +1,79 @@
+"""
+Assign a backlog of unassigned chores across many roommates.
+
+    python benchmarks/rotation.py --users 10000 --tasks 100000
+
+Seeds a throwaway SQLite database, then times the in-memory load index on
+its own and `flask rotation assign` end to end, and reports how evenly
+the tasks were spread.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from roomies_todo_list import create_app, db  # noqa: E402
+from roomies_todo_list.models import Task, TaskAssignee, User  # noqa: E402
+from roomies_todo_list.rotation import LoadIndex, assign_unassigned, scheduler  # noqa: E402
+
+
+def seed(users, tasks, chunk=10000):
+    now = datetime.now()
+    for start in range(0, users, chunk):
+        db.session.execute(
+            User.__table__.insert(),
+            [
+                {"email": f"user{i}@example.com", "username": f"user{i}", "created_at": now}
+                for i in range(start, min(start + chunk, users))
+            ],
+        )
+    for start in range(0, tasks, chunk):
+        db.session.execute(
+            Task.__table__.insert(),
+            [
+                {"name": f"chore {i}", "created_by_id": i % users + 1, "is_completed": False, "created_at": now}
+                for i in range(start, min(start + chunk, tasks))
+            ],
+        )
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = LoadIndex(dict.fromkeys(range(args.users), 0))
+    for _ in range(args.tasks):
+        index.pick(1)
+    print(f"load index: {args.tasks} picks over {args.users} users in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app("testing")
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        with app.app_context():
+            db.create_all()
+            seed(args.users, args.tasks)
+            scheduler.reset()
+
+            started = time.perf_counter()
+            assigned = assign_unassigned(batch_size=args.batch_size)
+            elapsed = time.perf_counter() - started
+
+            loads = [
+                count
+                for (count,) in db.session.query(db.func.count(TaskAssignee.id)).group_by(TaskAssignee.user_id)
+            ]
+    print(f"assign_unassigned: {assigned} tasks in {elapsed:.2f}s")
+    print(f"  tasks per user: min {min(loads)}, max {max(loads)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Measure task search latency on a large corpus.
+
+    python benchmarks/search.py --tasks 1000000
+    DATABASE_URL=postgresql://... python benchmarks/search.py --tasks 1000000
+
+Without DATABASE_URL the corpus goes into a throwaway SQLite database and
+is searched with the in-process inverted index; with a Postgres URL (run
+`flask db upgrade` on it first) the tsvector/GIN path is used. Reports
+p50/p95/p99 latency of a search plus serializing the page, which is what
+GET /api/tasks/search does on a response cache miss.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from werkzeug.datastructures import MultiDict  # noqa: E402
+
+from roomies_todo_list import create_app, db, response_cache  # noqa: E402
+from roomies_todo_list.models import Household, Task, User  # noqa: E402
+from roomies_todo_list.search import fallback_index, search_tasks  # noqa: E402
+from roomies_todo_list.serializers import dump_task_rows  # noqa: E402
+
+VERBS = ["clean", "wash", "take out", "buy", "fix", "water", "vacuum", "sweep", "organize", "refill"]
+OBJECTS = [
+    "trash", "dishes", "kitchen", "bathroom", "plants", "floor", "fridge", "laundry",
+    "recycling", "windows", "oven", "towels", "groceries", "shelves", "mirror", "porch",
+]
+PLACES = ["upstairs", "downstairs", "garage", "hallway", "living room", "balcony", "basement"]
+QUERIES = ["trash", "kitchen floor", "vacuum hallway", "water plants balcony", "fridge", "oven garage"]
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def seed(tasks, chunk=20000):
+    rng = random.Random(0)
+    now = datetime.now()
+    db.session.execute(Household.__table__.insert(), {"id": 1, "name": "Default", "created_at": now})
+    db.session.execute(
+        User.__table__.insert(),
+        [{"email": f"user{i}@example.com", "username": f"user{i}", "created_at": now} for i in range(100)],
+    )
+    for start in range(0, tasks, chunk):
+        db.session.execute(
+            Task.__table__.insert(),
+            [
+                {
+                    "name": f"{rng.choice(VERBS)} {rng.choice(OBJECTS)}",
+                    "description": f"{rng.choice(VERBS)} the {rng.choice(OBJECTS)} in the {rng.choice(PLACES)}",
+                    "created_by_id": rng.randrange(1, 101),
+                    "is_completed": rng.random() < 0.5,
+                    "created_at": now,
+                }
+                for _ in range(start, min(start + chunk, tasks))
+            ],
+        )
+        db.session.commit()
+    response_cache.invalidate("tasks")
+
+
+def run(args):
+    if db.engine.dialect.name != "postgresql":
+        started = time.perf_counter()
+        fallback_index().refresh()
+        print(f"inverted index built in {time.perf_counter() - started:.2f}s")
+
+    latencies = []
+    for i in range(args.requests):
+        params = MultiDict({"q": QUERIES[i % len(QUERIES)], "limit": str(args.limit)})
+        if i % 2:
+            params["is_completed"] = "false"
+        started = time.perf_counter()
+        rows, _ = search_tasks(params)
+        dump_task_rows(rows)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+
+    print(f"{args.requests} searches, {db.engine.dialect.name}, {args.tasks} tasks")
+    for pct in (50, 95, 99):
+        print(f"  p{pct}: {percentile(latencies, pct) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app("testing")
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv(
+            "DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        )
+        with app.app_context():
+            db.create_all()
+            seed(args.tasks)
+            run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare serializing the task list through ORM objects and TaskSchema with
+the column-projection fast path, on an in-memory SQLite database.
+
+    python benchmarks/serialization.py --tasks 10000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from roomies_todo_list import create_app, db  # noqa: E402
+from roomies_todo_list.models import Task, TaskAssignee, TaskSchema, User  # noqa: E402
+from roomies_todo_list.queries import loader_options  # noqa: E402
+from roomies_todo_list.serializers import dump_task_rows, get_schema, task_rows_query  # noqa: E402
+
+NOW = datetime(2026, 1, 1)
+
+
+def seed(num_users, num_tasks):
+    rng = random.Random(42)
+    db.session.execute(
+        User.__table__.insert(),
+        [
+            {"id": i, "email": f"user{i}@example.com", "username": f"user{i}", "created_at": NOW}
+            for i in range(1, num_users + 1)
+        ],
+    )
+    db.session.execute(
+        Task.__table__.insert(),
+        [
+            {
+                "id": i,
+                "name": f"task {i}",
+                "description": "Wipe down the counters",
+                "created_by_id": rng.randint(1, num_users),
+                "completed_by_id": rng.randint(1, num_users) if i % 2 else None,
+                "completed_at": NOW if i % 2 else None,
+                "due_date": NOW + timedelta(days=i % 30),
+                "created_at": NOW,
+                "is_completed": bool(i % 2),
+            }
+            for i in range(1, num_tasks + 1)
+        ],
+    )
+    db.session.execute(
+        TaskAssignee.__table__.insert(),
+        [
+            {"task_id": i, "user_id": user_id, "created_at": NOW}
+            for i in range(1, num_tasks + 1)
+            for user_id in rng.sample(range(1, num_users + 1), 2)
+        ],
+    )
+    db.session.commit()
+
+
+def orm_fresh_schema():
+    schema = TaskSchema(many=True)
+    tasks = Task.query.options(*loader_options(Task, schema)).order_by(Task.created_at, Task.id)
+    return schema.dump(tasks.all())
+
+
+def orm_cached_schema():
+    schema = get_schema(TaskSchema, many=True)
+    tasks = Task.query.options(*loader_options(Task, schema)).order_by(Task.created_at, Task.id)
+    return schema.dump(tasks.all())
+
+
+def rows():
+    return dump_task_rows(task_rows_query().order_by(Task.created_at, Task.id).all())
+
+
+def timed(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        db.session.remove()
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app("testing")
+    with app.app_context():
+        db.create_all()
+        seed(args.users, args.tasks)
+        assert rows() == orm_cached_schema(), "fast path output differs from TaskSchema"
+
+        for label, fn in [
+            ("ORM + new TaskSchema", orm_fresh_schema),
+            ("ORM + cached TaskSchema", orm_cached_schema),
+            ("column rows", rows),
+        ]:
+            print(f"{label:>24}: {timed(fn, args.repeat):8.1f} ms for {args.tasks} tasks")
+
+
+if __name__ == "__main__":
+    main()
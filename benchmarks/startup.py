@@ -0,0 +1,54 @@
+"""
+Measure cold start: package import, create_app(), and the first API request,
+each in a fresh interpreter as a newly spawned worker would see them.
+
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+from roomies_todo_list import create_app, db
+imported = time.perf_counter()
+app = create_app("testing")
+created = time.perf_counter()
+with app.app_context():
+    db.create_all()
+    ready = time.perf_counter()
+    app.test_client().get("/api/tasks")
+    served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "first_request_ms": (served - ready) * 1000,
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    samples = []
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        samples.append(json.loads(out.splitlines()[-1]))
+
+    for key in ("import_ms", "create_app_ms", "first_request_ms"):
+        values = [sample[key] for sample in samples]
+        print(f"{key:>18}: median {statistics.median(values):8.1f}  max {max(values):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import os
+
+
 class Config(object):
     """
     Common configurations
@@ -5,6 +8,85 @@ class Config(object):
 
     # Put any configurations here that are common across all environments
 
+    # Serialized GET responses. Swap the backend for a shared store when
+    # running more than one worker so invalidations reach every process.
+    RESPONSE_CACHE_BACKEND = 'roomies_todo_list.cache.MemoryBackend'
+    RESPONSE_CACHE_MAX_ENTRIES = 1024
+    RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+    # Serialize the list endpoints straight from column projections instead
+    # of hydrating ORM objects and dumping them through marshmallow.
+    SERIALIZE_FROM_ROWS = True
+
+    # JSON encoder for API responses, a dotted path; by default orjson when
+    # it is installed and the stdlib otherwise.
+    JSON_ENCODER = None
+
+    # Response compression, for clients that send Accept-Encoding. "br"
+    # needs the brotli package. Set COMPRESS_ENCODINGS to () when a proxy
+    # in front compresses instead.
+    COMPRESS_ENCODINGS = ('br', 'gzip')
+    COMPRESS_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/html')
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6
+    COMPRESS_BR_QUALITY = 4
+
+    # Password hashing. Stored hashes made with a different algorithm or
+    # iteration count are upgraded the next time their owner logs in.
+    PASSWORD_HASH_ALGORITHM = 'sha256'
+    PASSWORD_HASH_ITERATIONS = 150000
+    PASSWORD_HASH_WORKERS = 0
+    PASSWORD_HASH_MAX_PENDING = 32
+    PASSWORD_HASH_RETRY_AFTER = 1
+
+    # POSTs with an Idempotency-Key replay their first response to retries
+    # for IDEMPOTENCY_TTL seconds. Retries of a request still in progress
+    # wait up to IDEMPOTENCY_WAIT_SECONDS for it.
+    IDEMPOTENCY_TTL = 86400
+    IDEMPOTENCY_MAX_ENTRIES = 10000
+    IDEMPOTENCY_WAIT_SECONDS = 10
+
+    # Signed-in users are cached per process for this many seconds
+    PRINCIPAL_CACHE_TTL = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES = 4096
+
+    # Rotation: a completion in the last ROTATION_HISTORY_DAYS counts as
+    # this fraction of an open task when balancing chores
+    ROTATION_COMPLETION_WEIGHT = 0.5
+    ROTATION_HISTORY_DAYS = 28
+    ROTATION_REFRESH_SECONDS = 60
+
+    # Reminders, sent by `flask reminders run` this long before a task is
+    # due. Up to REMINDER_MAX_PENDING tasks due in the next
+    # REMINDER_WINDOW_SECONDS are held in memory. WebhookSink POSTs each
+    # batch to REMINDER_WEBHOOK_URL instead of logging it.
+    REMINDER_SINK = 'roomies_todo_list.reminders.LogSink'
+    REMINDER_WEBHOOK_URL = None
+    REMINDER_LEAD_SECONDS = 900
+    REMINDER_WINDOW_SECONDS = 86400
+    REMINDER_MAX_PENDING = 1000000
+    REMINDER_BATCH_SIZE = 500
+    REMINDER_POLL_SECONDS = 1
+
+    # Requests without a signed-in user or X-Household-Id are scoped to
+    # DEFAULT_HOUSEHOLD_ID. Only callers that send HOUSEHOLD_SERVICE_TOKEN as
+    # a bearer token may pick a household with the header; unset, none can.
+    DEFAULT_HOUSEHOLD_ID = 1
+    HOUSEHOLD_SERVICE_TOKEN = None
+
+    # Instrumentation. Per-route metrics are served on /metrics; set
+    # PROFILE_ENDPOINT to an endpoint name (e.g. 'main.get_all_tasks') to
+    # write stack samples of PROFILE_SAMPLE_RATE of its requests to
+    # PROFILE_DIR, the instance folder's profiles/ by default.
+    METRICS_ENABLED = True
+    METRICS_SERVER_TIMING = False
+    PROFILE_ENDPOINT = None
+    PROFILE_SAMPLE_RATE = 0.01
+    PROFILE_INTERVAL = 0.005
+    PROFILE_DIR = None
+    LOG_LEVEL = 'WARNING'
+    LOG_JSON = False
+
 
 class DevelopmentConfig(Config):
     """
@@ -14,6 +96,8 @@ class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_ECHO = True
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    METRICS_SERVER_TIMING = True
+    LOG_LEVEL = 'DEBUG'
 
 
 class ProductionConfig(Config):
@@ -22,8 +106,50 @@ class ProductionConfig(Config):
     """
 
     DEBUG = False
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Database engine, overridable from the environment
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 5000))
+    DB_SLOW_CHECKOUT_MS = int(os.getenv('DB_SLOW_CHECKOUT_MS', 100))
+
+    # Hash passwords in worker processes so logins don't hold the GIL
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 32))
+
+    # Structured logs for the log shipper; profile one endpoint on demand
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_JSON = os.getenv('LOG_JSON', 'true').lower() == 'true'
+    PROFILE_ENDPOINT = os.getenv('PROFILE_ENDPOINT')
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0.01))
+
+    HOUSEHOLD_SERVICE_TOKEN = os.getenv('HOUSEHOLD_SERVICE_TOKEN')
+
+    # Read-only endpoints are served from this bind when it is set
+    SQLALCHEMY_BINDS = (
+        {'replica': os.environ['DATABASE_REPLICA_URL']}
+        if os.getenv('DATABASE_REPLICA_URL') else {}
+    )
+
+class TestingConfig(Config):
+    """
+    Testing configurations
+    """
+
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SECRET_KEY = 'testing'
+    WTF_CSRF_ENABLED = False
+    PASSWORD_HASH_ITERATIONS = 1000
+
 
 app_config = {
     'development': DevelopmentConfig,
-    'production': ProductionConfig
+    'production': ProductionConfig,
+    'testing': TestingConfig
 }
\ No newline at end of file
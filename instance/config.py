@@ -0,0 +1,3 @@
+SQLALCHEMY_DATABASE_URI = 'sqlite:////tmp/roomies.db'
+SECRET_KEY = 'dev'
+WTF_CSRF_ENABLED = False
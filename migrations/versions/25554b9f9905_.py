@@ -24,5 +24,8 @@ def upgrade():
 
 def downgrade():
     # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_column('tasks', 'is_completed')
+    # Batch mode, as later batch migrations leave a CHECK constraint on the
+    # column that a plain DROP COLUMN refuses to remove on SQLite.
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('is_completed')
     # ### end Alembic commands ###
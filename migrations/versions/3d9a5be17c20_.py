@@ -0,0 +1,38 @@
+"""add indexes for task filters and assignee joins
+
+Revision ID: 3d9a5be17c20
+Revises: b84e02c6f5a7
+Create Date: 2026-10-17 11:58:40.126734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d9a5be17c20'
+down_revision = 'b84e02c6f5a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_tasks_created_by_id', 'tasks', ['created_by_id'], unique=False)
+    op.create_index('ix_tasks_completed_by_id', 'tasks', ['completed_by_id', 'completed_at'], unique=False)
+    op.create_index('ix_tasks_due_date', 'tasks', ['due_date'], unique=False)
+    op.create_index('ix_tasks_is_completed_due_date', 'tasks', ['is_completed', 'due_date'], unique=False)
+    op.create_index(
+        'ix_tasks_open_due_date', 'tasks', ['due_date'], unique=False,
+        postgresql_where=sa.text('NOT is_completed'),
+        sqlite_where=sa.text('NOT is_completed'),
+    )
+    op.create_index('ix_tasks_assignees_user_id_task_id', 'tasks_assignees', ['user_id', 'task_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_tasks_assignees_user_id_task_id', table_name='tasks_assignees')
+    op.drop_index('ix_tasks_open_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_is_completed_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_completed_by_id', table_name='tasks')
+    op.drop_index('ix_tasks_created_by_id', table_name='tasks')
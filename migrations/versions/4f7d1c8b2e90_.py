@@ -0,0 +1,42 @@
+"""add sync changelog
+
+Revision ID: 4f7d1c8b2e90
+Revises: e2a6b9d04f18
+Create Date: 2026-10-17 19:14:22.608145
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f7d1c8b2e90'
+down_revision = 'e2a6b9d04f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sync_changes',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('table_name', sa.String(length=20), nullable=False),
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('deleted', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('table_name', 'row_id', name='_sync_change_row_uc'),
+    sqlite_autoincrement=True
+    )
+    # Existing rows count as changed, so the first sync of every client
+    # picks them up.
+    op.execute(
+        "INSERT INTO sync_changes (table_name, row_id, deleted) "
+        "SELECT 'users', id, false FROM users ORDER BY id"
+    )
+    op.execute(
+        "INSERT INTO sync_changes (table_name, row_id, deleted) "
+        "SELECT 'tasks', id, false FROM tasks ORDER BY id"
+    )
+
+
+def downgrade():
+    op.drop_table('sync_changes')
@@ -0,0 +1,40 @@
+"""add task_completion_stats summary table
+
+Revision ID: 5e8c2d71a4b9
+Revises: 3d9a5be17c20
+Create Date: 2026-10-17 14:02:11.503918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8c2d71a4b9'
+down_revision = '3d9a5be17c20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('task_completion_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('completions', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    op.create_index('ix_task_completion_stats_day', 'task_completion_stats', ['day'], unique=False)
+
+    # Backfill from existing history
+    op.execute(
+        'INSERT INTO task_completion_stats (user_id, day, completions) '
+        'SELECT completed_by_id, date(completed_at), count(id) FROM tasks '
+        'WHERE is_completed AND completed_by_id IS NOT NULL AND completed_at IS NOT NULL '
+        'GROUP BY completed_by_id, date(completed_at)'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_task_completion_stats_day', table_name='task_completion_stats')
+    op.drop_table('task_completion_stats')
@@ -0,0 +1,24 @@
+"""add keyset pagination index on tasks
+
+Revision ID: 7c3f1a9d2e41
+Revises: 25554b9f9905
+Create Date: 2026-10-17 09:12:03.418220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3f1a9d2e41'
+down_revision = '25554b9f9905'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_tasks_created_at_id', 'tasks', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_tasks_created_at_id', table_name='tasks')
@@ -0,0 +1,61 @@
+"""add recurrences and occurrence columns on tasks
+
+Revision ID: 9b1f4e6c3a27
+Revises: 5e8c2d71a4b9
+Create Date: 2026-10-17 15:26:48.114502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1f4e6c3a27'
+down_revision = '5e8c2d71a4b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('recurrences',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('rule', sa.String(length=255), nullable=False),
+    sa.Column('dtstart', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('task_id')
+    )
+    # Batch mode rebuilds the table on SQLite, which would copy the partial
+    # index without its WHERE clause.
+    op.drop_index('ix_tasks_open_due_date', table_name='tasks')
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.add_column(sa.Column('template_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('occurrence_at', sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key(
+            'tasks_template_id_fkey', 'tasks', ['template_id'], ['id'], ondelete='SET NULL'
+        )
+        batch_op.create_unique_constraint('_template_occurrence_uc', ['template_id', 'occurrence_at'])
+    _create_open_due_date_index()
+    op.create_index('ix_tasks_occurrence_at', 'tasks', ['occurrence_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_tasks_occurrence_at', table_name='tasks')
+    op.drop_index('ix_tasks_open_due_date', table_name='tasks')
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_constraint('_template_occurrence_uc', type_='unique')
+        batch_op.drop_constraint('tasks_template_id_fkey', type_='foreignkey')
+        batch_op.drop_column('occurrence_at')
+        batch_op.drop_column('template_id')
+    _create_open_due_date_index()
+    op.drop_table('recurrences')
+
+
+def _create_open_due_date_index():
+    op.create_index(
+        'ix_tasks_open_due_date', 'tasks', ['due_date'], unique=False,
+        postgresql_where=sa.text('NOT is_completed'),
+        sqlite_where=sa.text('NOT is_completed'),
+    )
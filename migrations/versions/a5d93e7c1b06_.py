@@ -0,0 +1,83 @@
+"""partition users and tasks by household
+
+Revision ID: a5d93e7c1b06
+Revises: 4f7d1c8b2e90
+Create Date: 2026-10-17 21:36:08.274519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5d93e7c1b06'
+down_revision = '4f7d1c8b2e90'
+branch_labels = None
+depends_on = None
+
+TABLES = ('users', 'tasks', 'tasks_assignees', 'sync_changes')
+
+
+def upgrade():
+    op.create_table('households',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(length=60), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Everything that exists so far belongs to the default household
+    op.execute("INSERT INTO households (id, name, created_at) VALUES (1, 'Default', CURRENT_TIMESTAMP)")
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("SELECT setval(pg_get_serial_sequence('households', 'id'), 1)")
+
+    # Batch mode, as SQLite cannot ALTER columns or constraints. The column
+    # is added first so that the second batch copies its default into
+    # existing rows.
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('household_id', sa.Integer(), server_default='1', nullable=False))
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('household_id', server_default=None)
+            batch_op.create_foreign_key(f'{table}_household_id_fkey', 'households', ['household_id'], ['id'])
+
+    op.create_index('ix_users_household_id_id', 'users', ['household_id', 'id'], unique=False)
+    op.drop_index('ix_tasks_created_at_id', table_name='tasks')
+    op.create_index(
+        'ix_tasks_household_id_created_at_id', 'tasks', ['household_id', 'created_at', 'id'], unique=False
+    )
+    op.drop_index('ix_tasks_is_completed_due_date', table_name='tasks')
+    op.create_index(
+        'ix_tasks_household_id_is_completed_due_date', 'tasks',
+        ['household_id', 'is_completed', 'due_date'], unique=False,
+    )
+    op.drop_index('ix_tasks_open_due_date', table_name='tasks')
+    op.create_index(
+        'ix_tasks_household_id_open_due_date', 'tasks', ['household_id', 'due_date'], unique=False,
+        postgresql_where=sa.text('NOT is_completed'),
+        sqlite_where=sa.text('NOT is_completed'),
+    )
+    op.create_index('ix_sync_changes_household_id_id', 'sync_changes', ['household_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sync_changes_household_id_id', table_name='sync_changes')
+    op.drop_index('ix_tasks_household_id_open_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_household_id_is_completed_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_household_id_created_at_id', table_name='tasks')
+    op.drop_index('ix_users_household_id_id', table_name='users')
+
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_constraint(f'{table}_household_id_fkey', type_='foreignkey')
+            batch_op.drop_column('household_id')
+
+    # Recreated after the batch, whose table rebuild on SQLite would copy
+    # the partial index without its WHERE clause.
+    op.create_index(
+        'ix_tasks_open_due_date', 'tasks', ['due_date'], unique=False,
+        postgresql_where=sa.text('NOT is_completed'),
+        sqlite_where=sa.text('NOT is_completed'),
+    )
+    op.create_index('ix_tasks_is_completed_due_date', 'tasks', ['is_completed', 'due_date'], unique=False)
+    op.create_index('ix_tasks_created_at_id', 'tasks', ['created_at', 'id'], unique=False)
+    op.drop_table('households')
@@ -0,0 +1,32 @@
+"""add unique constraint on tasks_assignees (task_id, user_id)
+
+Revision ID: b84e02c6f5a7
+Revises: 7c3f1a9d2e41
+Create Date: 2026-10-17 10:41:27.905113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b84e02c6f5a7'
+down_revision = '7c3f1a9d2e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Drop duplicate assignments left behind by earlier concurrent updates,
+    # keeping the oldest row of each pair.
+    op.execute(
+        'DELETE FROM tasks_assignees WHERE id NOT IN '
+        '(SELECT MIN(id) FROM tasks_assignees GROUP BY task_id, user_id)'
+    )
+    with op.batch_alter_table('tasks_assignees') as batch_op:
+        batch_op.create_unique_constraint('_task_user_uc', ['task_id', 'user_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('tasks_assignees') as batch_op:
+        batch_op.drop_constraint('_task_user_uc', type_='unique')
@@ -0,0 +1,38 @@
+"""add full-text search vector on tasks
+
+Revision ID: c47d0a8e5f13
+Revises: 9b1f4e6c3a27
+Create Date: 2026-10-17 16:48:05.277361
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47d0a8e5f13'
+down_revision = '9b1f4e6c3a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Postgres only; other databases are searched with the in-process index.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # A stored generated column (Postgres 12+) keeps itself up to date on
+    # every insert and update. Names are weighted above descriptions.
+    op.execute(
+        "ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+        ") STORED"
+    )
+    op.create_index('ix_tasks_search_vector', 'tasks', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_tasks_search_vector', table_name='tasks')
+    op.drop_column('tasks', 'search_vector')
@@ -0,0 +1,26 @@
+"""widen users.password_hash for longer hash algorithms
+
+Revision ID: d81e4b5f2c69
+Revises: a5d93e7c1b06
+Create Date: 2026-10-17 23:12:40.518302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81e4b5f2c69'
+down_revision = 'a5d93e7c1b06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=128), type_=sa.String(length=255))
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=255), type_=sa.String(length=128))
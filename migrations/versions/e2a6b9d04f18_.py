@@ -0,0 +1,27 @@
+"""add version counters to tasks and users
+
+Revision ID: e2a6b9d04f18
+Revises: c47d0a8e5f13
+Create Date: 2026-10-17 18:02:41.530218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a6b9d04f18'
+down_revision = 'c47d0a8e5f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows start at version 1, like new ones
+    op.add_column('tasks', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    op.drop_column('users', 'version')
+    op.drop_column('tasks', 'version')
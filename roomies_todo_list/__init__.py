@@ -1,30 +1,68 @@
 # third-party imports
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
 import os
 
 # local imports
 from config import app_config
+from roomies_todo_list.cache import ResponseCache
+from roomies_todo_list.database import RoutingSQLAlchemy, configure_engine
+from roomies_todo_list.encoding import Compression, configure_json
+from roomies_todo_list.events import EventLog
+from roomies_todo_list.households import HouseholdScope, current_household_id
+from roomies_todo_list.idempotency import IdempotencyStore
+from roomies_todo_list.instrumentation import Instrumentation
+from roomies_todo_list.passwords import PasswordHasher
+from roomies_todo_list.principals import PrincipalCache
 
-# db variable initialization
-db = SQLAlchemy()
+# extension initialization; bound to an app in create_app
+db = RoutingSQLAlchemy()
+household_scope = HouseholdScope()
+response_cache = ResponseCache(scope=current_household_id)
+task_events = EventLog(scope=current_household_id)
+idempotency = IdempotencyStore(scope=current_household_id)
+password_hasher = PasswordHasher()
+principals = PrincipalCache()
+request_metrics = Instrumentation()
+compression = Compression()
+login = LoginManager()
+login.login_view = 'main.login'
 
 
-# def create_app(config_name):
-app = Flask(__name__, instance_relative_config=True)
-config_name = os.getenv('FLASK_ENV')
-app.config.from_object(app_config[config_name])
-app.config.from_pyfile('config.py')
-db.init_app(app)
+def create_app(config_name=None):
+    app = Flask(__name__, instance_relative_config=True)
+    config_name = config_name or os.getenv('FLASK_ENV')
+    app.config.from_object(app_config[config_name])
+    if not app.testing:
+        app.config.from_pyfile('config.py')
+    configure_engine(app)
+    configure_json(app)
+    db.init_app(app)
+    household_scope.init_app(app)
+    response_cache.init_app(app)
+    task_events.init_app(app)
+    idempotency.init_app(app)
+    password_hasher.init_app(app)
+    principals.init_app(app)
+    request_metrics.init_app(app)
+    compression.init_app(app)
+    login.init_app(app)
 
-login = LoginManager(app)
-login.login_view = 'login'
+    # Alembic is only needed by the `flask db` commands, so web workers
+    # skip importing it.
+    if os.getenv('FLASK_RUN_FROM_CLI'):
+        from flask_migrate import Migrate
+        Migrate(app, db)
 
-import roomies_todo_list.views
+    from roomies_todo_list import errors, households, instrumentation, reminders, rotation, transfer, views
+    rotation.scheduler.init_app(app)
+    reminders.scheduler.init_app(app)
+    app.register_blueprint(errors.bp)
+    app.register_blueprint(views.bp)
+    app.register_blueprint(instrumentation.bp)
+    app.cli.add_command(transfer.cli)
+    app.cli.add_command(rotation.cli)
+    app.cli.add_command(households.cli)
+    app.cli.add_command(reminders.cli)
 
-migrate = Migrate(app, db)
-
-import roomies_todo_list.models
-    # return app
\ No newline at end of file
+    return app
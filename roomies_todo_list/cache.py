@@ -0,0 +1,172 @@
+import functools
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from http import HTTPStatus
+
+from flask import current_app, request
+from werkzeug.urls import url_encode
+from werkzeug.utils import import_string
+
+from .database import primary_reads
+
+
+def etag(body):
+    """The strong ETag of a response body, as served by cached views."""
+    return hashlib.sha1(body).hexdigest()
+
+
+class CacheBackend(object):
+    """
+    Storage interface for the response cache.
+
+    Keys are strings and values are bytes. Implementations must be safe to
+    share between threads; a backend shared between gunicorn workers (e.g.
+    Redis or memcached) only needs `get` and `set`.
+    """
+
+    @classmethod
+    def from_config(cls, config):
+        return cls()
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU store bounded by both entry count and total bytes."""
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            max_entries=config["RESPONSE_CACHE_MAX_ENTRIES"],
+            max_bytes=config["RESPONSE_CACHE_MAX_BYTES"],
+        )
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            if len(value) > self.max_bytes:
+                return
+
+            self._entries[key] = value
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+class ResponseCache(object):
+    """
+    Cache serialized GET responses and answer conditional requests with 304.
+
+    Every cached body is keyed by the versions of the names it depends on,
+    e.g. "task:3" and "users". Writes call `invalidate` to give those names a
+    fresh version, so stale bodies are never looked up again and age out of
+    the backend's LRU instead of being deleted.
+
+    `scope` returns the partition the current request belongs to (its
+    household), or None outside of one. Inside a scope, versions are kept
+    per partition, so a write only invalidates its own partition's bodies;
+    invalidating outside of any scope, e.g. from the CLI, invalidates the
+    name in every partition.
+    """
+
+    def __init__(self, app=None, scope=None):
+        self.backend = None
+        self.scope = scope
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RESPONSE_CACHE_BACKEND", "roomies_todo_list.cache.MemoryBackend")
+        app.config.setdefault("RESPONSE_CACHE_MAX_ENTRIES", 1024)
+        app.config.setdefault("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+        backend_cls = import_string(app.config["RESPONSE_CACHE_BACKEND"])
+        self.backend = backend_cls.from_config(app.config)
+
+    def _partition(self):
+        return self.scope() if self.scope is not None else None
+
+    def _version(self, name):
+        version = self.backend.get(f"version:{name}")
+        if version is None:
+            version = self._bump(name)
+        return version.decode()
+
+    def version(self, name):
+        partition = self._partition()
+        if partition is None:
+            return self._version(name)
+        return f"{self._version(name)}.{self._version(f'{partition}/{name}')}"
+
+    def invalidate(self, *names):
+        partition = self._partition()
+        for name in names:
+            self._bump(name if partition is None else f"{partition}/{name}")
+
+    def _bump(self, name):
+        # A random version rather than a counter means an evicted or
+        # concurrently reset version can never match an older body.
+        version = uuid.uuid4().hex.encode()
+        self.backend.set(f"version:{name}", version)
+        return version
+
+    def cached(self, *depends_on):
+        """
+        Cache a GET view's 200 response under the request path and query.
+
+        `depends_on` names may reference the view's URL arguments, e.g.
+        "task:{task_id}".
+        """
+
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(**kwargs):
+                versions = ".".join(self.version(name.format(**kwargs)) for name in depends_on)
+                key = f"response:{request.path}?{url_encode(request.args, sort=True)}@{versions}"
+
+                entry = self.backend.get(key)
+                if entry is not None:
+                    tag, body = entry.split(b" ", 1)
+                    response = current_app.response_class(body, mimetype="application/json")
+                    response.set_etag(tag.decode())
+                    return response.make_conditional(request)
+
+                # Fill the cache from the primary: a lagging replica would
+                # store the body from before a write under the version that
+                # write just bumped, and serve it until the next one.
+                with primary_reads():
+                    response = current_app.make_response(view(**kwargs))
+                if response.status_code != HTTPStatus.OK:
+                    return response
+
+                body = response.get_data()
+                tag = etag(body)
+                self.backend.set(key, tag.encode() + b" " + body)
+                response.set_etag(tag)
+                return response.make_conditional(request)
+
+            return wrapper
+
+        return decorator
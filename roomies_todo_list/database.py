@@ -0,0 +1,165 @@
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, get_state
+from sqlalchemy import event, exc, orm
+from sqlalchemy.pool import Pool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = "replica"
+
+
+@event.listens_for(Pool, "connect")
+def _remember_pid(dbapi_connection, connection_record):
+    connection_record.info["pid"] = os.getpid()
+
+
+@event.listens_for(Pool, "checkout")
+def _check_pid(dbapi_connection, connection_record, connection_proxy):
+    """
+    Refuse to hand a connection opened before a fork to the child process.
+
+    With `gunicorn --preload` any connection the master opened would
+    otherwise be shared by every worker. Dropping the reference without
+    closing it leaves the parent's socket alone, and the pool reconnects.
+    """
+    pid = os.getpid()
+    if connection_record.info["pid"] != pid:
+        connection_record.connection = connection_proxy.connection = None
+        raise exc.DisconnectionError(
+            f"Connection belongs to pid {connection_record.info['pid']}, "
+            f"attempting to check out in pid {pid}"
+        )
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to check out a connection."""
+
+    def __init__(self, creator, slow_checkout=0.1, **kwargs):
+        super().__init__(creator, **kwargs)
+        self.slow_checkout = slow_checkout
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.slow_checkout = self.slow_checkout
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            if waited >= self.slow_checkout:
+                logger.warning("Waited %.3fs for a database connection: %s", waited, self.stats())
+
+    def stats(self):
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": self.overflow(),
+            "checkouts": self.checkouts,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+
+class RoutingSession(SignallingSession):
+    """Session that sends reads to the replica bind inside `read_replica` views."""
+
+    def get_bind(self, mapper=None, clause=None):
+        if (
+            has_app_context()
+            and g.get("read_replica")
+            and not g.get("primary_reads")
+            and not self._flushing
+            and REPLICA_BIND in self.app.config["SQLALCHEMY_BINDS"]
+        ):
+            return get_state(self.app).db.get_engine(self.app, bind=REPLICA_BIND)
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def read_replica(view):
+    """Route a read-only view's queries to the replica bind, when one is configured."""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.read_replica = False
+
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Send reads to the primary inside the block, even within `read_replica` views."""
+    previous = g.get("primary_reads", False)
+    g.primary_reads = True
+    try:
+        yield
+    finally:
+        g.primary_reads = previous
+
+
+def configure_engine(app):
+    """
+    Translate the DB_* settings into SQLALCHEMY_ENGINE_OPTIONS.
+
+    Does nothing unless DB_POOL_SIZE is set, so development and test runs
+    keep Flask-SQLAlchemy's defaults.
+    """
+    config = app.config
+    config.setdefault("SQLALCHEMY_BINDS", {})
+    if config.get("DB_POOL_SIZE") is None:
+        return
+
+    options = config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+    options.setdefault("poolclass", InstrumentedQueuePool)
+    options.setdefault("slow_checkout", config["DB_SLOW_CHECKOUT_MS"] / 1000)
+    options.setdefault("pool_size", config["DB_POOL_SIZE"])
+    options.setdefault("max_overflow", config["DB_MAX_OVERFLOW"])
+    options.setdefault("pool_timeout", config["DB_POOL_TIMEOUT"])
+    options.setdefault("pool_recycle", config["DB_POOL_RECYCLE"])
+    options.setdefault("pool_pre_ping", config["DB_POOL_PRE_PING"])
+
+    if (config.get("SQLALCHEMY_DATABASE_URI") or "").startswith("postgres"):
+        # Batch inserts become multi-row INSERT ... VALUES statements.
+        options.setdefault("executemany_mode", "values")
+        if config.get("DB_STATEMENT_TIMEOUT_MS"):
+            connect_args = options.setdefault("connect_args", {})
+            connect_args.setdefault(
+                "options", f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"
+            )
+
+
+def pool_stats(db, app):
+    """Connection pool usage for the primary engine and every bind."""
+    stats = {}
+    for bind in [None] + list(app.config["SQLALCHEMY_BINDS"]):
+        pool = db.get_engine(app, bind=bind).pool
+        if isinstance(pool, InstrumentedQueuePool):
+            stats[bind or "default"] = pool.stats()
+    return stats
@@ -0,0 +1,169 @@
+import zlib
+from datetime import date
+
+from flask import json, request
+from werkzeug.utils import import_string
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ("br", "gzip")
+
+
+def encoded_etag(tag, encoding):
+    """The ETag of the body tagged `tag` once it is sent in `encoding`."""
+    return f"{tag}-{encoding}"
+
+
+def contains_etag(tags, tag):
+    """Whether `tags` names the body tagged `tag`, in any encoding."""
+    return tags.contains(tag) or any(tags.contains(encoded_etag(tag, encoding)) for encoding in ENCODINGS)
+
+
+class JSONEncoder(json.JSONEncoder):
+    """
+    Flask's encoder, but writing dates and datetimes in ISO 8601 as the
+    schemas do, rather than as HTTP dates, so every encoder agrees.
+    """
+
+    def default(self, o):
+        if isinstance(o, date):
+            return o.isoformat()
+        return super().default(o)
+
+
+class OrjsonEncoder(JSONEncoder):
+    """
+    Encode with orjson, which serializes datetimes natively and is several
+    times faster than the stdlib. Indented output falls back to the stdlib.
+    """
+
+    def encode(self, o):
+        if self.indent is not None:
+            return super().encode(o)
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(o, default=self.default, option=option).decode()
+
+
+def configure_json(app):
+    """
+    Set the app's JSON encoder from JSON_ENCODER, a dotted path, or the
+    fastest one installed when it is None.
+    """
+    app.config.setdefault("JSON_ENCODER", None)
+    path = app.config["JSON_ENCODER"]
+    if path is not None:
+        app.json_encoder = import_string(path)
+    else:
+        app.json_encoder = OrjsonEncoder if orjson is not None else JSONEncoder
+
+
+class Compression(object):
+    """
+    Compress responses with the best Content-Encoding the client accepts.
+
+    Only COMPRESS_MIMETYPES are compressed, and only bodies of at least
+    COMPRESS_MIN_SIZE bytes, where the savings outweigh the CPU. Encodings
+    are tried in COMPRESS_ENCODINGS order; "br" is skipped unless the
+    brotli package is installed. Streamed bodies, such as exports, are
+    compressed chunk by chunk as they are sent. Event streams are left
+    alone, as a compressor would hold events back.
+
+    A compressed body is a different representation, so its strong ETag
+    gets the encoding as a suffix, and If-None-Match is checked against
+    that tag here. If-Match accepts the tag in any encoding (see
+    `contains_etag`). `Vary: Accept-Encoding` keeps caches from mixing
+    them up.
+    """
+
+    def __init__(self):
+        self.encodings = ()
+        self.mimetypes = frozenset()
+        self.min_size = 1024
+        self.level = 6
+        self.br_quality = 4
+
+    def init_app(self, app):
+        app.config.setdefault("COMPRESS_ENCODINGS", ENCODINGS)
+        app.config.setdefault(
+            "COMPRESS_MIMETYPES", ("application/json", "application/x-ndjson", "text/csv", "text/html")
+        )
+        app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+        app.config.setdefault("COMPRESS_LEVEL", 6)
+        app.config.setdefault("COMPRESS_BR_QUALITY", 4)
+        self.encodings = tuple(
+            encoding for encoding in app.config["COMPRESS_ENCODINGS"] if encoding != "br" or brotli is not None
+        )
+        self.mimetypes = frozenset(app.config["COMPRESS_MIMETYPES"])
+        self.min_size = app.config["COMPRESS_MIN_SIZE"]
+        self.level = app.config["COMPRESS_LEVEL"]
+        self.br_quality = app.config["COMPRESS_BR_QUALITY"]
+        if self.encodings:
+            app.after_request(self._after_request)
+
+    def compressor(self, encoding):
+        """Return (compress, finish) functions for a new stream in `encoding`."""
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=self.br_quality)
+            return compressor.process, compressor.finish
+        # wbits 31 writes the gzip header and trailer
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress, compressor.flush
+
+    @timed("compress")
+    def compress(self, data, encoding):
+        compress, finish = self.compressor(encoding)
+        return compress(data) + finish()
+
+    def stream(self, chunks, encoding):
+        compress, finish = self.compressor(encoding)
+        try:
+            for chunk in chunks:
+                data = compress(chunk.encode() if isinstance(chunk, str) else chunk)
+                if data:
+                    yield data
+            yield finish()
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+    def _after_request(self, response):
+        if (
+            response.mimetype not in self.mimetypes
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None or response.status_code < 200 or response.status_code in (204, 304):
+            return response
+
+        tag, weak = response.get_etag()
+        if response.is_streamed:
+            response.response = self.stream(response.response, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            if tag and not weak and request.if_none_match.contains(encoded_etag(tag, encoding)):
+                # The view only knew the uncompressed tag
+                response.set_etag(encoded_etag(tag, encoding))
+                return response.make_conditional(request)
+            response.set_data(self.compress(data, encoding))
+        if tag and not weak:
+            response.set_etag(encoded_etag(tag, encoding))
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -1,11 +1,37 @@
-from flask import jsonify
-from roomies_todo_list import app
+from http import HTTPStatus
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy.orm.exc import StaleDataError
+from roomies_todo_list import db
 from .models import BadRequest
+from .passwords import HasherBusy
+
+bp = Blueprint("errors", __name__)
 
-@app.errorhandler(BadRequest)
+@bp.app_errorhandler(BadRequest)
 def handle_bad_request(error):
     """Catch BadRequest exception globally, serialize into JSON, and respond with 400."""
     body = {'error': dict(error.payload or ())}
     body['error']['message'] = error.message
     return jsonify(body), error.status
 
+
+@bp.app_errorhandler(HasherBusy)
+def handle_hasher_busy(error):
+    """Shed sign-ins with 503 while the password hashing pool is saturated."""
+    body = {'error': {'message': "Too many sign-ins in progress, please retry."}}
+    return jsonify(body), HTTPStatus.SERVICE_UNAVAILABLE, {'Retry-After': str(error.retry_after)}
+
+
+@bp.app_errorhandler(StaleDataError)
+def handle_stale_data(error):
+    """
+    Answer a write that lost a race on a row's version with 412 when the
+    client made it conditional with If-Match, and 409 otherwise.
+    """
+    db.session.rollback()
+    if request.if_match:
+        body = {'error': {'message': "The resource has been changed since it was read."}}
+        return jsonify(body), HTTPStatus.PRECONDITION_FAILED
+    body = {'error': {'message': "The resource was changed by another request, please retry."}}
+    return jsonify(body), HTTPStatus.CONFLICT
@@ -0,0 +1,63 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+class EventLog(object):
+    """
+    Bounded in-memory log of change events that streaming clients wait on.
+
+    Ids start from the boot time in milliseconds, so ids handed out before a
+    restart fall below the new log's range and the client is told to reset
+    instead of silently missing events. Waiting uses a Condition, so under
+    an async worker (gunicorn -k gevent) an idle stream costs a greenlet,
+    not an OS thread. Each worker process keeps its own log, so a stream
+    only sees the changes made through its own worker.
+
+    Events are (id, kind, data, scope) tuples, where `scope()` is called at
+    publish time to tag each event with the partition (household) it
+    belongs to, so streams can skip other partitions' events.
+    """
+
+    def __init__(self, maxlen=1000, scope=None):
+        self.scope = scope
+        self._events = deque(maxlen=maxlen)
+        self._last_id = int(time.time() * 1000)
+        self._condition = threading.Condition()
+
+    def init_app(self, app):
+        app.config.setdefault("EVENT_LOG_SIZE", 1000)
+        with self._condition:
+            self._events = deque(self._events, maxlen=app.config["EVENT_LOG_SIZE"])
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, kind, payload):
+        with self._condition:
+            self._last_id += 1
+            scope = self.scope() if self.scope is not None else None
+            self._events.append((self._last_id, kind, json.dumps(payload), scope))
+            self._condition.notify_all()
+
+    def since(self, last_id):
+        """
+        Return the events after `last_id`, or None if some of them have
+        already been dropped from the log and the client must resync.
+        """
+        with self._condition:
+            if last_id > self._last_id:
+                return None
+            if last_id == self._last_id:
+                return []
+            if not self._events or self._events[0][0] > last_id + 1:
+                return None
+            return [event for event in self._events if event[0] > last_id]
+
+    def wait(self, last_id, timeout):
+        """Block until there are events after `last_id` or `timeout` expires."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._last_id != last_id, timeout)
+        return self.since(last_id)
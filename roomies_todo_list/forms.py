@@ -26,11 +26,12 @@ class RegistrationForm(FlaskForm):
     submit = SubmitField("Register")
 
     def validate_username(self, username):
-        user = User.query.filter_by(username=username.data).first()
+        # Usernames and emails are unique across households
+        user = User.query.execution_options(all_households=True).filter_by(username=username.data).first()
         if user is not None:
             raise ValidationError("Please use a different username.")
 
     def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
+        user = User.query.execution_options(all_households=True).filter_by(email=email.data).first()
         if user is not None:
             raise ValidationError("Please use a different email address.")
@@ -0,0 +1,141 @@
+import hmac
+from http import HTTPStatus
+
+import click
+from flask import current_app, g, has_request_context, request
+from flask.cli import AppGroup
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Query
+
+HEADER = "X-Household-Id"
+
+
+def current_household_id():
+    """The household the current request is scoped to, or None outside of one."""
+    return g.get("household_id") if has_request_context() else None
+
+
+def default_household_id():
+    """Household new rows belong to: the request's, else DEFAULT_HOUSEHOLD_ID."""
+    household_id = current_household_id()
+    if household_id is None:
+        household_id = current_app.config["DEFAULT_HOUSEHOLD_ID"]
+    return household_id
+
+
+def _is_relationship_load(query):
+    # Lazy and selectin loads only follow foreign keys out of rows that were
+    # scoped when they were loaded. They are baked, and a criterion added
+    # here would stay in the cache with the first household's id.
+    return query._current_path or not query._invoke_all_eagers
+
+
+def _scope(query):
+    household_id = current_household_id()
+    if household_id is None or query.get_execution_options().get("all_households"):
+        return query
+    if _is_relationship_load(query):
+        return query
+    scoped = set()
+    for description in query.column_descriptions:
+        entity = description["entity"]
+        # Aliases are left alone: task_rows_query outer joins the completer,
+        # and the entity they hang off is scoped already.
+        if (
+            isinstance(entity, type)
+            and hasattr(entity, "household_id")
+            and getattr(entity, "__household_scoped__", True)
+            and entity not in scoped
+        ):
+            scoped.add(entity)
+            query = query.enable_assertions(False).filter(entity.household_id == household_id)
+    return query
+
+
+@event.listens_for(Query, "before_compile", retval=True)
+def _scope_query(query):
+    return _scope(query)
+
+
+@event.listens_for(Query, "before_compile_update", retval=True)
+@event.listens_for(Query, "before_compile_delete", retval=True)
+def _scope_bulk(query, context):
+    return _scope(query)
+
+
+class HouseholdScope(object):
+    """
+    Confine every ORM query made during a request to one household.
+
+    Signed-in users are scoped to their own household, and an X-Household-Id
+    header naming another one is refused. Other API clients get
+    DEFAULT_HOUSEHOLD_ID; only trusted services, which send
+    HOUSEHOLD_SERVICE_TOKEN as a bearer token, may pick any household with
+    the header.
+    Every Query over a model with a household_id column, including bulk
+    updates and deletes, gets a `household_id = ...` criterion, so each
+    household's reads walk its own slice of the household-leading indexes.
+    Models only ever reached through a scoped one can opt out by setting
+    `__household_scoped__ = False`; relationship loads are left alone too.
+    Queries outside of a request (the CLI, datagen) are not scoped. Pass
+    `execution_options(all_households=True)` for lookups that must see
+    every household, such as checks against globally unique columns.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("DEFAULT_HOUSEHOLD_ID", 1)
+        app.config.setdefault("HOUSEHOLD_SERVICE_TOKEN", None)
+        app.before_request(self._resolve)
+
+    @staticmethod
+    def _is_service():
+        token = current_app.config["HOUSEHOLD_SERVICE_TOKEN"]
+        auth = request.headers.get("Authorization", "")
+        return (
+            bool(token)
+            and auth.startswith("Bearer ")
+            and hmac.compare_digest(auth[len("Bearer "):].encode(), token.encode())
+        )
+
+    def _resolve(self):
+        if HEADER not in request.headers:
+            if current_user.is_authenticated:
+                g.household_id = current_user.household_id
+            else:
+                g.household_id = current_app.config["DEFAULT_HOUSEHOLD_ID"]
+            return
+
+        from .models import BadRequest, Household
+
+        try:
+            household_id = int(request.headers[HEADER])
+        except ValueError:
+            raise BadRequest(f"'{HEADER}' must be an integer.")
+        if current_user.is_authenticated:
+            if household_id != current_user.household_id:
+                raise BadRequest("Signed in to another household.", status=HTTPStatus.FORBIDDEN)
+            g.household_id = household_id
+            return
+        if not self._is_service():
+            raise BadRequest(f"'{HEADER}' needs the household service token.", status=HTTPStatus.FORBIDDEN)
+        if Household.query.get(household_id) is None:
+            raise BadRequest("Household not found.", status=HTTPStatus.NOT_FOUND)
+        g.household_id = household_id
+
+
+# CLI
+cli = AppGroup("households", help="Manage households.")
+
+
+@cli.command("create")
+@click.argument("name")
+def create_command(name):
+    """Add a household and print its id, for clients to send as X-Household-Id."""
+    from roomies_todo_list import db
+    from .models import Household
+
+    household = Household(name=name)
+    db.session.add(household)
+    db.session.commit()
+    click.echo(f"Created household {household.id}.")
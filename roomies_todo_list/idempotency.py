@@ -0,0 +1,143 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+
+from flask import current_app, request
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyStore(object):
+    """
+    Replay the first response to a POST for retries that send the same
+    Idempotency-Key, instead of writing again.
+
+    Successful responses are kept for IDEMPOTENCY_TTL seconds in an
+    in-process LRU of IDEMPOTENCY_MAX_ENTRIES, keyed by the partition
+    `scope()` returns (the household), the path and the key. Errors are not
+    kept, so a client can fix its request and retry with the same key. A
+    retry that arrives while the first request is still running waits up
+    to IDEMPOTENCY_WAIT_SECONDS for its response rather than running too.
+    Reusing a key with a different query or body is refused with 422.
+
+    Each worker process keeps its own store, so a retry only finds the
+    first response on the same worker.
+    """
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.ttl = 86400
+        self.max_entries = 10000
+        self.wait_seconds = 10
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault("IDEMPOTENCY_TTL", 86400)
+        app.config.setdefault("IDEMPOTENCY_MAX_ENTRIES", 10000)
+        app.config.setdefault("IDEMPOTENCY_WAIT_SECONDS", 10)
+        self.ttl = app.config["IDEMPOTENCY_TTL"]
+        self.max_entries = app.config["IDEMPOTENCY_MAX_ENTRIES"]
+        self.wait_seconds = app.config["IDEMPOTENCY_WAIT_SECONDS"]
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _claim(self, key, fingerprint):
+        """
+        Return ("replay", entry) for a stored response, ("wait", event) while
+        another request holds the key, or ("run", None) once this one does.
+        """
+        from .models import BadRequest
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                claim, held_for = ("replay", entry), entry[1]
+            elif key in self._in_flight:
+                held_for, done = self._in_flight[key]
+                claim = "wait", done
+            else:
+                self._in_flight[key] = (fingerprint, threading.Event())
+                return "run", None
+
+        if held_for != fingerprint:
+            raise BadRequest(
+                f"'{HEADER}' was already used for a different request.", status=HTTPStatus.UNPROCESSABLE_ENTITY
+            )
+        return claim
+
+    def _store(self, key, fingerprint, response):
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + self.ttl,
+                fingerprint,
+                response.status_code,
+                response.headers.get("Content-Type"),
+                response.get_data(),
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _release(self, key):
+        with self._lock:
+            _, done = self._in_flight.pop(key)
+        done.set()
+
+    def idempotent(self, view):
+        """Make a view replay its first successful response for retries with the same key."""
+
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            client_key = request.headers.get(HEADER)
+            if client_key is None:
+                return view(**kwargs)
+
+            from .models import BadRequest
+
+            if not client_key or len(client_key) > MAX_KEY_LENGTH:
+                raise BadRequest(f"'{HEADER}' must be 1 to {MAX_KEY_LENGTH} characters long.")
+            partition = self.scope() if self.scope is not None else None
+            key = (partition, request.path, client_key)
+            fingerprint = hashlib.sha256(request.query_string + b"?" + request.get_data()).digest()
+
+            deadline = time.monotonic() + self.wait_seconds
+            while True:
+                action, value = self._claim(key, fingerprint)
+                if action != "wait":
+                    break
+                # Wake up once it is done: to replay its response, or to
+                # run in its place if it failed.
+                if not value.wait(deadline - time.monotonic()):
+                    raise BadRequest(
+                        f"A request with this '{HEADER}' is still in progress.", status=HTTPStatus.CONFLICT
+                    )
+
+            if action == "replay":
+                _, _, status, content_type, body = value
+                response = current_app.response_class(body, status=status, content_type=content_type)
+                response.headers["Idempotent-Replayed"] = "true"
+                return response
+
+            try:
+                response = current_app.make_response(view(**kwargs))
+                if 200 <= response.status_code < 300:
+                    self._store(key, fingerprint, response)
+                return response
+            finally:
+                self._release(key)
+
+        return wrapper
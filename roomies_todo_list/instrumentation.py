@@ -0,0 +1,378 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import Blueprint, Response, abort, current_app, g, has_request_context, request
+from flask_sqlalchemy import get_state
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .database import pool_stats
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+
+class RequestStats(object):
+    """Time spent in each phase of the current request, and its SQL statement count."""
+
+    __slots__ = ("started", "statements", "phases", "sampler")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.phases = defaultdict(float)
+        self.sampler = None
+
+
+def current_stats():
+    return g.get("request_stats") if has_request_context() else None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["statement_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    if stats is not None:
+        stats.statements += 1
+        stats.phases["db"] += time.perf_counter() - conn.info.pop("statement_started")
+
+
+def timed(phase):
+    """
+    Charge the wrapped function's time to `phase` of the current request.
+
+    Statements it runs are already counted as "db", so their time is left
+    out to keep phases from overlapping.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stats = current_stats()
+            if stats is None:
+                return func(*args, **kwargs)
+            db_before = stats.phases["db"]
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                stats.phases[phase] += elapsed - (stats.phases["db"] - db_before)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_encoder(encoder_cls):
+    """Subclass `encoder_cls` so its encoding counts towards the "serialize" phase."""
+    return type(f"Timed{encoder_cls.__name__}", (encoder_cls,), {"encode": timed("serialize")(encoder_cls.encode)})
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram(object):
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, values, amount):
+        series = self._series.get(values)
+        if series is None:
+            # One count per bucket, then +Inf, then the sum
+            series = self._series[values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, amount)] += 1
+        series[-1] += amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for values, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {series[-1]}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {cumulative}"
+
+
+class CounterMetric(object):
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series = Counter()
+
+    def inc(self, values, amount=1):
+        self._series[values] += amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for values, count in sorted(self._series.items()):
+            yield f"{self.name}{_labels(self.labels, values)} {count}"
+
+
+class StackSampler(object):
+    """
+    Record one thread's Python stack every `interval` seconds from a
+    background thread, in the folded format flame graph tools read.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        return self.stacks
+
+
+class JSONFormatter(logging.Formatter):
+    """Format each record as one JSON object, with `extra` fields as keys."""
+
+    RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in self.RESERVED)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class Instrumentation(object):
+    """
+    Per-route request metrics, served in the Prometheus text format.
+
+    Every request records its latency, response size, SQL statement count
+    and the time spent in the database, serializing and compressing,
+    labelled by endpoint and method. Each worker process keeps its own
+    counters, so scrape every worker. METRICS_SERVER_TIMING echoes a request's phases
+    in a Server-Timing header, and PROFILE_ENDPOINT samples the stack of
+    a fraction of that endpoint's requests into PROFILE_DIR.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        labels = ("endpoint", "method")
+        with self._lock:
+            self.requests = CounterMetric(
+                "http_requests_total", "Requests handled.", labels + ("status",)
+            )
+            self.duration = Histogram(
+                "http_request_duration_seconds", "Time spent handling a request.", labels, LATENCY_BUCKETS
+            )
+            self.phases = Histogram(
+                "http_request_phase_seconds",
+                "Time a request spent in the database, serializing or compressing.",
+                labels + ("phase",),
+                LATENCY_BUCKETS,
+            )
+            self.statements = Histogram(
+                "http_request_db_statements", "SQL statements run by a request.", labels, STATEMENT_BUCKETS
+            )
+            self.sizes = Histogram(
+                "http_response_size_bytes", "Size of non-streamed response bodies.", labels, SIZE_BUCKETS
+            )
+
+    def init_app(self, app):
+        app.config.setdefault("METRICS_ENABLED", True)
+        app.config.setdefault("METRICS_SERVER_TIMING", False)
+        app.config.setdefault("PROFILE_ENDPOINT", None)
+        app.config.setdefault("PROFILE_SAMPLE_RATE", 0.01)
+        app.config.setdefault("PROFILE_INTERVAL", 0.005)
+        app.config.setdefault("PROFILE_DIR", None)
+        app.config.setdefault("LOG_LEVEL", "WARNING")
+        app.config.setdefault("LOG_JSON", False)
+        configure_logging(app)
+        self.reset()
+        if not app.config["METRICS_ENABLED"]:
+            return
+
+        app.json_encoder = timed_encoder(app.json_encoder)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        g.request_stats = stats = RequestStats()
+        config = current_app.config
+        if (
+            config["PROFILE_ENDPOINT"] is not None
+            and request.endpoint == config["PROFILE_ENDPOINT"]
+            and random.random() < config["PROFILE_SAMPLE_RATE"]
+        ):
+            stats.sampler = StackSampler(threading.get_ident(), config["PROFILE_INTERVAL"])
+            stats.sampler.start()
+
+    def _after_request(self, response):
+        stats = g.get("request_stats")
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        labels = (request.endpoint or "unmatched", request.method)
+        # Measuring a streamed body would consume it
+        size = None if response.is_streamed else response.calculate_content_length()
+
+        with self._lock:
+            self.requests.inc(labels + (str(response.status_code),))
+            self.duration.observe(labels, elapsed)
+            self.statements.observe(labels, stats.statements)
+            for phase, seconds in stats.phases.items():
+                self.phases.observe(labels + (phase,), seconds)
+            if size is not None:
+                self.sizes.observe(labels, size)
+
+        if current_app.config["METRICS_SERVER_TIMING"]:
+            response.headers["Server-Timing"] = server_timing(stats, elapsed)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "%s %s %s",
+                request.method,
+                request.full_path,
+                response.status_code,
+                extra={
+                    "endpoint": labels[0],
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "db_statements": stats.statements,
+                    "db_ms": round(stats.phases["db"] * 1000, 3),
+                },
+            )
+        return response
+
+    def _teardown_request(self, exc):
+        stats = g.pop("request_stats", None)
+        if stats is not None and stats.sampler is not None:
+            write_profile(stats.sampler.stop())
+
+    def render(self):
+        with self._lock:
+            lines = [
+                line
+                for metric in (self.requests, self.duration, self.phases, self.statements, self.sizes)
+                for line in metric.render()
+            ]
+        lines.extend(_render_pool_stats(pool_stats(get_state(current_app).db, current_app)))
+        return "\n".join(lines) + "\n"
+
+
+def server_timing(stats, elapsed):
+    entries = [f'db;dur={stats.phases["db"] * 1000:.3f};desc="{stats.statements} statements"']
+    entries.extend(
+        f"{phase};dur={seconds * 1000:.3f}" for phase, seconds in stats.phases.items() if phase != "db"
+    )
+    entries.append(f"total;dur={elapsed * 1000:.3f}")
+    return ", ".join(entries)
+
+
+def write_profile(stacks):
+    """Write folded stacks for one request under PROFILE_DIR (the instance folder by default)."""
+    directory = current_app.config["PROFILE_DIR"] or os.path.join(current_app.instance_path, "profiles")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{request.endpoint}-{time.time_ns()}.folded")
+    with open(path, "w") as f:
+        for stack, count in stacks.items():
+            f.write(f"{stack} {count}\n")
+    logger.info("Wrote %d stack samples to %s", sum(stacks.values()), path, extra={"profile": path})
+
+
+POOL_METRICS = (
+    ("db_pool_size", "size", "gauge"),
+    ("db_pool_checked_out", "checked_out", "gauge"),
+    ("db_pool_idle", "idle", "gauge"),
+    ("db_pool_overflow", "overflow", "gauge"),
+    ("db_pool_checkouts_total", "checkouts", "counter"),
+    ("db_pool_wait_seconds_total", "wait_seconds_total", "counter"),
+    ("db_pool_wait_seconds_max", "wait_seconds_max", "gauge"),
+)
+
+
+def _render_pool_stats(stats):
+    if not stats:
+        return
+    for name, key, kind in POOL_METRICS:
+        yield f"# TYPE {name} {kind}"
+        for bind, values in sorted(stats.items()):
+            yield f'{name}{{bind="{_escape(bind)}"}} {values[key]}'
+
+
+def configure_logging(app):
+    """
+    Set the package's log level from LOG_LEVEL and, with LOG_JSON, write
+    its records to stderr as one JSON object per line.
+    """
+    package = logging.getLogger("roomies_todo_list")
+    package.setLevel(app.config["LOG_LEVEL"])
+    has_handler = any(isinstance(handler.formatter, JSONFormatter) for handler in package.handlers)
+    if app.config["LOG_JSON"] and not has_handler:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JSONFormatter())
+        package.addHandler(handler)
+        package.propagate = False
+
+
+bp = Blueprint("metrics", __name__)
+
+
+@bp.route("/metrics")
+def export_metrics():
+    if not current_app.config["METRICS_ENABLED"]:
+        abort(404)
+    from roomies_todo_list import request_metrics
+
+    return Response(request_metrics.render(), mimetype="text/plain; version=0.0.4")
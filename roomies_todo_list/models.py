@@ -1,13 +1,17 @@
 from datetime import datetime
+from http import HTTPStatus
 
 from flask_login import UserMixin
 from marshmallow import Schema, fields, post_load
 from sqlalchemy import UniqueConstraint
 from sqlalchemy.orm import relationship
-from werkzeug.security import check_password_hash, generate_password_hash
 
 from roomies_todo_list import login
 from roomies_todo_list import db
+from roomies_todo_list import password_hasher
+from roomies_todo_list import principals
+from roomies_todo_list.households import default_household_id
+from roomies_todo_list.principals import Principal
 
 class BadRequest(Exception):
     """Custom exception class to be thrown when local error occurs."""
@@ -16,9 +20,35 @@ class BadRequest(Exception):
         self.status = status
         self.payload = payload
 
+def _load_principal(user_id):
+    row = (
+        db.session.query(
+            User.id, User.username, User.email, User.first_name, User.last_name, User.household_id
+        )
+        .filter(User.id == user_id)
+        .first()
+    )
+    return Principal(*row) if row else None
+
 @login.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    return principals.get(int(id), _load_principal)
+
+class Household(db.Model):
+    """
+    A group of roommates. Users, tasks and assignments all belong to one
+    household, and requests only ever see their own household's rows.
+    """
+
+    __tablename__ = 'households'
+
+    id = db.Column(db.Integer, primary_key=True, nullable=False, autoincrement=True)
+    name = db.Column(db.String(60), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def __repr__(self):
+        return f"<Household: id={self.id} name={self.name}>"
+
 
 class User(UserMixin, db.Model):
     """
@@ -28,14 +58,25 @@ class User(UserMixin, db.Model):
     __tablename__ = 'users'
 
     id = db.Column(db.Integer, primary_key=True, nullable=False, autoincrement=True)
+    household_id = db.Column(
+        db.Integer, db.ForeignKey('households.id'), nullable=False, default=default_household_id
+    )
     email = db.Column(db.String(60), index=True, unique=True)
     username = db.Column(db.String(60), index=True, unique=True)
     first_name = db.Column(db.String(60), index=True)
     last_name = db.Column(db.String(60), index=True)
-    password_hash = db.Column(db.String(128))
-    tasks = relationship('Task', secondary='tasks_assignees')
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now())
+    password_hash = db.Column(db.String(255))
+    tasks = relationship('Task', secondary='tasks_assignees', order_by='Task.id')
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
     updated_at = db.Column(db.DateTime, nullable=True)
+    # Bumped by every ORM update, which only applies while the row still has
+    # the version it was read at (optimistic concurrency control).
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __table_args__ = (
+        db.Index('ix_users_household_id_id', 'household_id', 'id'),
+    )
+    __mapper_args__ = {'version_id_col': version}
 
     def __init__(self, email, username, **kwargs):
         self.email = email
@@ -49,10 +90,15 @@ class User(UserMixin, db.Model):
         return f"<User: id={self.id} username={self.username} email={self.email}>"
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Check `password`, upgrading the stored hash if the configured cost has changed."""
+        if not password_hasher.verify(self.password_hash, password):
+            return False
+        if password_hasher.needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
 
 class UserSchema(Schema):
     id = fields.Integer() # TODO: Ensure that we cannot upate ID via put request
@@ -64,10 +110,11 @@ class UserSchema(Schema):
     password_hash = fields.Str(load_only=True)
     created_at = fields.DateTime()
     updated_at = fields.DateTime()
+    version = fields.Integer(dump_only=True)
 
     class Meta:
         model = User
-        fields = ('id', 'email', 'username', 'first_name', 'last_name', 'tasks')
+        fields = ('id', 'email', 'username', 'first_name', 'last_name', 'tasks', 'version')
         ordered = True
 
 
@@ -76,18 +123,50 @@ class Task(db.Model):
     __tablename__ = 'tasks'
 
     id = db.Column(db.Integer, primary_key=True, nullable=False, autoincrement=True)
+    household_id = db.Column(
+        db.Integer, db.ForeignKey('households.id'), nullable=False, default=default_household_id
+    )
     name = db.Column(db.String(60), nullable=False)
     description = db.Column(db.String(120), nullable=True)
     created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_by = relationship("User", foreign_keys=[created_by_id])
     completed_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), default=None, nullable=True)
     completed_by = relationship("User", foreign_keys=[completed_by_id])
-    assignees = relationship("User", secondary='tasks_assignees')
+    assignees = relationship("User", secondary='tasks_assignees', order_by="User.id")
     due_date = db.Column(db.DateTime, nullable=True)
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now())
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
     updated_at = db.Column(db.DateTime, nullable=True)
     completed_at = db.Column(db.DateTime, nullable=True)
     is_completed = db.Column(db.Boolean, nullable=False, default=False)
+    # Set on tasks materialized from an occurrence of a recurring task
+    template_id = db.Column(
+        db.Integer, db.ForeignKey('tasks.id', ondelete='SET NULL'), nullable=True
+    )
+    occurrence_at = db.Column(db.DateTime, nullable=True)
+    recurrence = relationship("Recurrence", uselist=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+
+    __table_args__ = (
+        UniqueConstraint('template_id', 'occurrence_at', name='_template_occurrence_uc'),
+        db.Index("ix_tasks_occurrence_at", "occurrence_at"),
+        # Every request is scoped to one household, so the indexes behind
+        # the task list lead with it.
+        db.Index("ix_tasks_household_id_created_at_id", "household_id", "created_at", "id"),
+        db.Index("ix_tasks_created_by_id", "created_by_id"),
+        db.Index("ix_tasks_completed_by_id", "completed_by_id", "completed_at"),
+        db.Index("ix_tasks_due_date", "due_date"),
+        db.Index("ix_tasks_household_id_is_completed_due_date", "household_id", "is_completed", "due_date"),
+        # Open tasks are the small, hot subset behind "my open tasks" and
+        # "overdue tasks", so keep a partial index over just those rows.
+        db.Index(
+            "ix_tasks_household_id_open_due_date",
+            "household_id",
+            "due_date",
+            postgresql_where=db.not_(is_completed),
+            sqlite_where=db.not_(is_completed),
+        ),
+    )
+    __mapper_args__ = {'version_id_col': version}
 
     def __init__(self, name, created_by, **kwargs):
         self.name = name
@@ -101,6 +180,45 @@ class Task(db.Model):
     def __repr__(self):
         return f"<Task: id={self.id} name={self.name} created_by={self.created_by}>"
 
+    def set_assignees(self, user_ids):
+        """
+        Reconcile tasks_assignees with `user_ids` using one lookup, one bulk
+        insert and one bulk delete. The caller is responsible for committing.
+        """
+        user_ids = set(user_ids)
+        found = {
+            user_id
+            for (user_id,) in db.session.query(User.id).filter(
+                User.id.in_(user_ids), User.household_id == self.household_id
+            )
+        }
+        if found != user_ids:
+            raise BadRequest("User not found.", status=HTTPStatus.NOT_FOUND)
+
+        existing = {
+            user_id
+            for (user_id,) in db.session.query(TaskAssignee.user_id).filter(
+                TaskAssignee.task_id == self.id
+            )
+        }
+        to_add = user_ids - existing
+        to_remove = existing - user_ids
+
+        if to_add:
+            db.session.execute(
+                TaskAssignee.__table__.insert(),
+                [
+                    {"household_id": self.household_id, "task_id": self.id, "user_id": user_id}
+                    for user_id in to_add
+                ],
+            )
+        if to_remove:
+            TaskAssignee.query.filter(
+                TaskAssignee.task_id == self.id, TaskAssignee.user_id.in_(to_remove)
+            ).delete(synchronize_session=False)
+
+        db.session.expire(self, ["assignees"])
+
 
 class TaskSchema(Schema):
     id = fields.Integer(dump_only=True)
@@ -114,11 +232,42 @@ class TaskSchema(Schema):
     created_at = fields.DateTime()
     updated_at = fields.DateTime()
     is_completed = fields.Boolean()
+    version = fields.Integer(dump_only=True)
     
 
     class Meta:
         model = Task
-        fields = ('id', 'name', 'description', 'created_by', 'completed_at', 'due_date', 'completed_by', 'assignees', 'is_completed')
+        fields = ('id', 'name', 'description', 'created_by', 'completed_at', 'due_date', 'completed_by', 'assignees', 'is_completed', 'version')
+
+
+class Recurrence(db.Model):
+    """
+    RRULE attached to a template task. Its occurrences are expanded on
+    demand; a task row is only written for an occurrence once it is
+    completed or edited.
+    """
+
+    __tablename__ = 'recurrences'
+
+    id = db.Column(db.Integer, primary_key=True, nullable=False, autoincrement=True)
+    task_id = db.Column(
+        db.Integer, db.ForeignKey('tasks.id', ondelete='CASCADE'), nullable=False, unique=True
+    )
+    rule = db.Column(db.String(255), nullable=False)
+    dtstart = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    def __repr__(self):
+        return f"<Recurrence: id={self.id} task_id={self.task_id} rule={self.rule}>"
+
+
+class RecurrenceSchema(Schema):
+    rule = fields.Str(required=True, error_messages={"required": "Rule is required."})
+    dtstart = fields.DateTime()
+
+    class Meta:
+        fields = ('rule', 'dtstart')
+        ordered = True
 
 
 class TaskAssignee(db.Model):
@@ -126,12 +275,23 @@ class TaskAssignee(db.Model):
     __tablename__ = 'tasks_assignees'
 
     id = db.Column(db.Integer, primary_key=True, nullable=False, autoincrement=True)
+    household_id = db.Column(
+        db.Integer, db.ForeignKey('households.id'), nullable=False, default=default_household_id
+    )
     task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now())
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
 
-    # TODO: Debug unique constraint
-    #__table_args__ = (UniqueConstraint('task_id', 'user_id', name='_task_user_uc'),)
+    # The unique constraint also serves lookups by task_id; the index covers
+    # the reverse direction, from a user to their tasks.
+    __table_args__ = (
+        UniqueConstraint('task_id', 'user_id', name='_task_user_uc'),
+        db.Index('ix_tasks_assignees_user_id_task_id', 'user_id', 'task_id'),
+    )
+    # Assignments are always reached through a task or user that is scoped
+    # already. Checking household_id too would cost a row lookup per
+    # assignment, where both indexes above cover the query on their own.
+    __household_scoped__ = False
 
     def __init__(self, task_id, user_id, **kwargs):
         self.task_id = task_id
@@ -143,3 +303,49 @@ class TaskAssignee(db.Model):
 
     def __repr__(self):
         return f"<TaskAssignee: id={self.id} task_id={self.task_id} user_id={self.user_id}>"
+
+
+class TaskCompletionStat(db.Model):
+    """
+    Completions per user per day, kept up to date as tasks are completed,
+    reopened or deleted so the stats endpoints never scan task history.
+    """
+
+    __tablename__ = 'task_completion_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    completions = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_task_completion_stats_day', 'day'),
+    )
+
+    def __repr__(self):
+        return f"<TaskCompletionStat: user_id={self.user_id} day={self.day} completions={self.completions}>"
+
+
+class SyncChange(db.Model):
+    """
+    The latest change to each task and user. Ids are handed out in commit
+    order, so clients can fetch what changed after the last id they saw.
+    Deleted rows stay behind as tombstones.
+    """
+
+    __tablename__ = 'sync_changes'
+
+    id = db.Column(db.Integer, primary_key=True, nullable=False, autoincrement=True)
+    household_id = db.Column(db.Integer, db.ForeignKey('households.id'), nullable=False)
+    table_name = db.Column(db.String(20), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        UniqueConstraint('table_name', 'row_id', name='_sync_change_row_uc'),
+        db.Index('ix_sync_changes_household_id_id', 'household_id', 'id'),
+        # Without AUTOINCREMENT SQLite reuses the highest id once it is deleted
+        {'sqlite_autoincrement': True},
+    )
+
+    def __repr__(self):
+        return f"<SyncChange: id={self.id} {self.table_name}:{self.row_id} deleted={self.deleted}>"
@@ -0,0 +1,102 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool already has its maximum number of jobs pending."""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+
+
+def _generate(password, method):
+    from werkzeug.security import generate_password_hash
+
+    return generate_password_hash(password, method=method)
+
+
+def _check(pwhash, password):
+    from werkzeug.security import check_password_hash
+
+    return check_password_hash(pwhash, password)
+
+
+class PasswordHasher(object):
+    """
+    Hash and verify passwords in a bounded pool of worker processes.
+
+    PBKDF2 is deliberately slow and holds the GIL, so a burst of logins run
+    inline would stall every other request in the worker. At most
+    PASSWORD_HASH_MAX_PENDING hashes may be queued or running at once; past
+    that, HasherBusy is raised and answered with a 503 and Retry-After
+    instead of piling requests up. With
+    PASSWORD_HASH_WORKERS = 0 hashing runs inline, as it does under test.
+    """
+
+    def __init__(self):
+        self.method = None
+        self.workers = 0
+        self.retry_after = 1
+        self._pending = None
+        self._executor = None
+        self._pid = None
+        self._pool_lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault("PASSWORD_HASH_ALGORITHM", "sha256")
+        app.config.setdefault("PASSWORD_HASH_ITERATIONS", 150000)
+        app.config.setdefault("PASSWORD_HASH_WORKERS", 0)
+        app.config.setdefault("PASSWORD_HASH_MAX_PENDING", 32)
+        app.config.setdefault("PASSWORD_HASH_RETRY_AFTER", 1)
+
+        self.method = (
+            f"pbkdf2:{app.config['PASSWORD_HASH_ALGORITHM']}:"
+            f"{app.config['PASSWORD_HASH_ITERATIONS']}"
+        )
+        self.workers = app.config["PASSWORD_HASH_WORKERS"]
+        self.retry_after = app.config["PASSWORD_HASH_RETRY_AFTER"]
+        self._pending = threading.BoundedSemaphore(app.config["PASSWORD_HASH_MAX_PENDING"])
+        self.shutdown()
+
+    def shutdown(self):
+        """Stop this process's pool; the next hash starts a new one sized from the current config."""
+        with self._pool_lock:
+            # A pool inherited across a fork belongs to the parent, so only drop the reference.
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._pid = None
+
+    def _pool(self):
+        # Start the pool lazily, and again after a fork, so gunicorn
+        # workers never share the master's worker processes. The lock keeps
+        # concurrent first requests from each building a pool.
+        with self._pool_lock:
+            if self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+
+        if not self._pending.acquire(blocking=False):
+            raise HasherBusy(self.retry_after)
+        try:
+            return self._pool().submit(fn, *args).result()
+        finally:
+            self._pending.release()
+
+    def hash(self, password):
+        return self._run(_generate, password, self.method)
+
+    def verify(self, pwhash, password):
+        if not pwhash:
+            return False
+        return self._run(_check, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Whether `pwhash` was made with a different algorithm or cost than configured."""
+        return pwhash.split("$", 1)[0] != self.method
@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+
+class Principal(namedtuple("Principal", "id username email first_name last_name household_id")):
+    """
+    Immutable stand-in for the signed-in User, built from one row.
+
+    It satisfies flask-login's user interface, so `current_user` costs no
+    query at all when the cache is warm. Call `load()` when a view needs the
+    ORM object.
+    """
+
+    __slots__ = ()
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def get_id(self):
+        return str(self.id)
+
+    def load(self):
+        from .models import User
+
+        return User.query.get(self.id)
+
+
+class PrincipalCache(object):
+    """
+    In-process LRU of Principals with a time-to-live.
+
+    Each worker process keeps its own cache, so a change made through
+    another worker is only picked up once the entry expires; keep
+    PRINCIPAL_CACHE_TTL short enough for that to be acceptable.
+    """
+
+    def __init__(self, ttl=60, max_entries=4096):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault("PRINCIPAL_CACHE_TTL", 60)
+        app.config.setdefault("PRINCIPAL_CACHE_MAX_ENTRIES", 4096)
+        self.ttl = app.config["PRINCIPAL_CACHE_TTL"]
+        self.max_entries = app.config["PRINCIPAL_CACHE_MAX_ENTRIES"]
+        self.clear()
+
+    def get(self, user_id, loader):
+        """Return the cached Principal for `user_id`, calling `loader` on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        principal = loader(user_id)
+        if principal is None:
+            self.invalidate(user_id)
+            return None
+
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, principal)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,151 @@
+import base64
+import binascii
+from datetime import datetime
+
+from dateutil.parser import isoparse
+from marshmallow import fields as ma_fields
+from sqlalchemy import and_, exists, inspect, or_
+from sqlalchemy.orm import joinedload, selectinload
+
+from .models import BadRequest, Task, TaskAssignee, User
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+TRUE_VALUES = ("true", "1", "yes")
+FALSE_VALUES = ("false", "0", "no")
+
+
+def parse_bool(args, name):
+    """Parse a boolean query argument, raising BadRequest on anything unrecognised."""
+    value = args[name].lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise BadRequest(f"'{name}' must be true or false.")
+
+
+def parse_int(args, name):
+    try:
+        return int(args[name])
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an integer.")
+
+
+def parse_datetime(args, name):
+    try:
+        return isoparse(args[name])
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an ISO 8601 datetime.")
+
+
+def parse_limit(args):
+    limit = parse_int(args, "limit") if "limit" in args else DEFAULT_PAGE_SIZE
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise BadRequest(f"'limit' must be between 1 and {MAX_PAGE_SIZE}.")
+    return limit
+
+
+def parse_fields(args, schema_cls):
+    """Turn a comma-separated `fields` argument into a tuple for the schema's `only`."""
+    raw = args.get("fields")
+    if not raw:
+        return None
+
+    fields = tuple(field.strip() for field in raw.split(",") if field.strip())
+    unknown = set(fields) - set(schema_cls.Meta.fields)
+    if unknown:
+        raise BadRequest(f"Unknown fields: {', '.join(sorted(unknown))}.")
+    return fields
+
+
+def loader_options(model, schema, parent=None):
+    """
+    Build eager-loading options for every relationship `schema` will dump.
+
+    Many-to-one relationships are joined into the main SELECT; collections are
+    fetched with one extra SELECT ... IN per relationship, so the statement
+    count no longer depends on the number of rows.
+    """
+    relationships = inspect(model).relationships
+    options = []
+    for name, field in schema.dump_fields.items():
+        if name not in relationships:
+            continue
+
+        relationship = relationships[name]
+        attr = relationship.class_attribute
+        if relationship.uselist:
+            loader = parent.selectinload(attr) if parent is not None else selectinload(attr)
+        else:
+            loader = parent.joinedload(attr) if parent is not None else joinedload(attr)
+        options.append(loader)
+
+        nested = field.inner if isinstance(field, ma_fields.List) else field
+        if isinstance(nested, ma_fields.Nested):
+            options.extend(loader_options(relationship.mapper.class_, nested.schema, loader))
+    return options
+
+
+def users_by_id(ids):
+    """Fetch every user in `ids` with a single IN query, keyed by id."""
+    if not ids:
+        return {}
+    return {user.id: user for user in User.query.filter(User.id.in_(ids))}
+
+
+def filter_tasks(query, args):
+    """Apply the task list filters in `args` as SQL predicates on `query`."""
+    if "is_completed" in args:
+        query = query.filter(Task.is_completed == parse_bool(args, "is_completed"))
+    if "created_by_id" in args:
+        query = query.filter(Task.created_by_id == parse_int(args, "created_by_id"))
+    if "assignee_id" in args:
+        assignee_id = parse_int(args, "assignee_id")
+        query = query.filter(
+            exists().where(
+                and_(TaskAssignee.task_id == Task.id, TaskAssignee.user_id == assignee_id)
+            )
+        )
+    if "due_after" in args:
+        query = query.filter(Task.due_date >= parse_datetime(args, "due_after"))
+    if "due_before" in args:
+        query = query.filter(Task.due_date < parse_datetime(args, "due_before"))
+    return query
+
+
+def encode_cursor(row):
+    raw = f"{row.created_at.isoformat()}|{row.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise BadRequest("Invalid cursor.")
+
+
+def paginate(query, model, args):
+    """
+    Keyset-paginate `query` on (created_at, id).
+
+    Returns the rows of the requested page and the cursor for the next one,
+    or None when this is the last page.
+    """
+    limit = parse_limit(args)
+    if args.get("cursor"):
+        created_at, row_id = decode_cursor(args["cursor"])
+        query = query.filter(
+            or_(
+                model.created_at > created_at,
+                and_(model.created_at == created_at, model.id > row_id),
+            )
+        )
+
+    rows = query.order_by(model.created_at, model.id).limit(limit + 1).all()
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
@@ -0,0 +1,249 @@
+import functools
+from datetime import timedelta, timezone
+
+from dateutil.parser import isoparse
+from dateutil.rrule import rrulestr
+from sqlalchemy import and_, exists
+
+from roomies_todo_list import db
+from .models import BadRequest, Recurrence, Task, TaskAssignee
+from .queries import users_by_id
+from .rotation import scheduler
+
+# Longest window a single expansion may cover
+MAX_WINDOW = timedelta(days=366)
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+# Rule parts the arithmetic expansion understands; anything else goes to dateutil
+SIMPLE_PARTS = {"FREQ", "INTERVAL", "BYDAY", "UNTIL", "COUNT", "WKST"}
+
+
+def _parts(rule):
+    rule = rule.strip()
+    if rule.upper().startswith("RRULE:"):
+        rule = rule[len("RRULE:"):]
+    parts = {}
+    for part in rule.split(";"):
+        name, _, value = part.partition("=")
+        parts[name.strip().upper()] = value.strip().upper()
+    return parts
+
+
+def validate_rule(rule, dtstart):
+    """Raise BadRequest unless `rule` is an RRULE dateutil can expand."""
+    try:
+        rrulestr(rule, dtstart=dtstart)
+    except (ValueError, TypeError) as e:
+        raise BadRequest({"rule": [f"Not a valid RRULE: {e}"]})
+
+
+class _Daily(object):
+    """FREQ=DAILY or FREQ=WEEKLY without BYDAY: dtstart plus a fixed step."""
+
+    def __init__(self, dtstart, step, until, count):
+        self.dtstart = dtstart
+        self.step = step
+        self.until = until
+        self.count = count
+
+    def between(self, start, end):
+        first = max(0, -(-(start - self.dtstart) // self.step))
+        last = (end - self.dtstart) // self.step
+        if (end - self.dtstart) % self.step == timedelta(0):
+            last -= 1
+        if self.count is not None:
+            last = min(last, self.count - 1)
+        if self.until is not None:
+            last = min(last, (self.until - self.dtstart) // self.step)
+        occurrence = self.dtstart + first * self.step
+        occurrences = []
+        for _ in range(last - first + 1):
+            occurrences.append(occurrence)
+            occurrence += self.step
+        return occurrences
+
+
+class _Weekly(object):
+    """FREQ=WEEKLY;BYDAY=... without COUNT: fixed offsets within every INTERVAL-th week."""
+
+    def __init__(self, dtstart, interval, weekdays, wkst, until):
+        self.dtstart = dtstart
+        self.interval = interval
+        self.until = until
+        self.week0 = dtstart - timedelta(days=(dtstart.weekday() - wkst) % 7)
+        self.offsets = sorted(timedelta(days=(day - wkst) % 7) for day in weekdays)
+
+    def between(self, start, end):
+        week = max(0, (start - self.week0).days // 7)
+        week_start = self.week0 + timedelta(weeks=week - week % self.interval)
+        step = timedelta(weeks=self.interval)
+        start = max(start, self.dtstart)
+        if self.until is not None and self.until < end:
+            end = self.until + timedelta(microseconds=1)
+
+        occurrences = []
+        while week_start < end:
+            for offset in self.offsets:
+                occurrence = week_start + offset
+                if occurrence >= end:
+                    return occurrences
+                if occurrence >= start:
+                    occurrences.append(occurrence)
+            week_start += step
+        return occurrences
+
+
+class _Fallback(object):
+    def __init__(self, rule, dtstart):
+        self.rrule = rrulestr(rule, dtstart=dtstart)
+
+    def between(self, start, end):
+        return [occurrence for occurrence in self.rrule.between(start, end, inc=True) if occurrence < end]
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_rule(rule, dtstart):
+    """
+    Build an expander for `rule` with a `between(start, end)` method.
+
+    Plain DAILY and WEEKLY rules, which are nearly all chores, are expanded
+    with date arithmetic; dateutil's generic iterator is two orders of
+    magnitude slower for them. Everything else is handed to dateutil.
+    """
+    parts = _parts(rule)
+    if set(parts) - SIMPLE_PARTS or parts.get("FREQ") not in ("DAILY", "WEEKLY"):
+        return _Fallback(rule, dtstart)
+
+    try:
+        interval = int(parts.get("INTERVAL", 1))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+        until = isoparse(parts["UNTIL"]) if "UNTIL" in parts else None
+        wkst = WEEKDAYS.index(parts.get("WKST", "MO"))
+        weekdays = [WEEKDAYS.index(day) for day in parts["BYDAY"].split(",")] if "BYDAY" in parts else None
+    except ValueError:
+        # Ordinal weekdays like 2TU and other forms dateutil knows best
+        return _Fallback(rule, dtstart)
+    if interval < 1 or (until is not None and until.tzinfo is not None):
+        return _Fallback(rule, dtstart)
+
+    if parts["FREQ"] == "DAILY" and weekdays is None:
+        return _Daily(dtstart, timedelta(days=interval), until, count)
+    if parts["FREQ"] == "WEEKLY" and weekdays is None:
+        return _Daily(dtstart, timedelta(weeks=interval), until, count)
+    if parts["FREQ"] == "WEEKLY" and count is None:
+        return _Weekly(dtstart, interval, weekdays, wkst, until)
+    return _Fallback(rule, dtstart)
+
+
+def expand(rule, dtstart, start, end):
+    """Occurrences of `rule` from `dtstart` that fall in [start, end)."""
+    return compile_rule(rule, dtstart).between(start, end)
+
+
+def naive_utc(value):
+    """`value` as a naive datetime, converting aware ones to UTC, to compare with stored times."""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_window(args):
+    """Read the required `start` and `end` arguments, limited to MAX_WINDOW."""
+    try:
+        start, end = naive_utc(isoparse(args["start"])), naive_utc(isoparse(args["end"]))
+    except KeyError:
+        raise BadRequest("'start' and 'end' are required.")
+    except ValueError:
+        raise BadRequest("'start' and 'end' must be ISO 8601 datetimes.")
+    if not start < end <= start + MAX_WINDOW:
+        raise BadRequest(f"'end' must be after 'start' and at most {MAX_WINDOW.days} days later.")
+    return start, end
+
+
+def is_occurrence(rule, dtstart, occurrence_at):
+    return occurrence_at in expand(rule, dtstart, occurrence_at, occurrence_at + timedelta(microseconds=1))
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def list_occurrences(start, end, assignee_id=None):
+    """
+    Every occurrence of every recurring task in [start, end), merged with
+    the tasks already materialized for some of them.
+    """
+    templates = db.session.query(
+        Task.id, Task.name, Task.description, Recurrence.rule, Recurrence.dtstart
+    ).join(Recurrence, Recurrence.task_id == Task.id).filter(Recurrence.dtstart < end)
+    if assignee_id is not None:
+        templates = templates.filter(
+            exists().where(and_(TaskAssignee.task_id == Task.id, TaskAssignee.user_id == assignee_id))
+        )
+
+    materialized = {
+        (task.template_id, task.occurrence_at): task
+        for task in db.session.query(
+            Task.id, Task.template_id, Task.occurrence_at, Task.name, Task.description,
+            Task.due_date, Task.is_completed,
+        ).filter(Task.occurrence_at >= start, Task.occurrence_at < end)
+    }
+
+    occurrences = []
+    for template in templates:
+        for occurrence_at in expand(template.rule, template.dtstart, start, end):
+            task = materialized.get((template.id, occurrence_at))
+            occurrences.append(
+                {
+                    "template_id": template.id,
+                    "occurrence_at": occurrence_at.isoformat(),
+                    "task_id": task.id if task else None,
+                    "name": task.name if task else template.name,
+                    "description": task.description if task else template.description,
+                    "due_date": _isoformat(task.due_date) if task else occurrence_at.isoformat(),
+                    "is_completed": task.is_completed if task else False,
+                }
+            )
+    occurrences.sort(key=lambda occurrence: (occurrence["occurrence_at"], occurrence["template_id"]))
+    return occurrences
+
+
+def materialize(pairs):
+    """
+    Return a task for every (template, occurrence_at) pair, creating the
+    missing ones as copies of their template in one batch. Each new one is
+    assigned by rotation, to as many roommates as the template has (at
+    least one), so successive occurrences move around the household. The
+    caller flushes and commits.
+    """
+    pairs = set(pairs)
+    tasks = {}
+    if not pairs:
+        return tasks
+
+    for task in Task.query.filter(
+        Task.template_id.in_({template.id for template, _ in pairs}),
+        Task.occurrence_at.in_({occurrence_at for _, occurrence_at in pairs}),
+    ):
+        tasks[task.template_id, task.occurrence_at] = task
+
+    picks = {}
+    for template, occurrence_at in sorted(pairs, key=lambda pair: (pair[1], pair[0].id)):
+        if (template.id, occurrence_at) in tasks:
+            continue
+        task = Task(
+            name=template.name,
+            created_by=template.created_by,
+            description=template.description,
+            due_date=occurrence_at,
+            template_id=template.id,
+            occurrence_at=occurrence_at,
+        )
+        picks[task] = scheduler.pick(template.household_id, max(1, len(template.assignees)))
+        db.session.add(task)
+        tasks[template.id, occurrence_at] = task
+
+    users = users_by_id({user_id for picked in picks.values() for user_id in picked})
+    for task, picked in picks.items():
+        task.assignees = [users[user_id] for user_id in picked]
+    return tasks
@@ -0,0 +1,387 @@
+import json
+import logging
+import math
+import time
+import urllib.request
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, func, or_
+from werkzeug.utils import import_string
+
+from roomies_todo_list import db
+from .models import SyncChange, Task, TaskAssignee
+from .serializers import IN_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class TimingWheel(object):
+    """
+    Hierarchical timing wheel of keys waiting for a deadline.
+
+    Time advances in ticks of `resolution` seconds. Level 0 has a slot per
+    tick; each level above has slots covering a whole turn of the level
+    below, so `levels` levels of `slots` slots span slots ** levels ticks.
+    A key sits on the lowest level whose turn its deadline falls in (the
+    top level wraps around), and is moved down a level when that turn
+    comes around, so adding, removing and firing a key is O(1) however
+    many are waiting.
+
+    Deadlines are rounded up to a tick: keys never fire early, and at most
+    one tick late if `advance` is called every tick.
+    """
+
+    def __init__(self, now, resolution=0.1, slots=256, levels=3):
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+        # Ticks covered by one slot of each level, and by the whole wheel
+        self._turns = [slots ** level for level in range(levels + 1)]
+        self._now = int(now / resolution)
+        self._deadlines = {}
+        self._wheels = [[set() for _ in range(slots)] for _ in range(levels)]
+        self._expired = set()
+
+    @property
+    def span(self):
+        """How far ahead, in seconds, a deadline may be."""
+        return (self._turns[-1] - 2) * self.resolution
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __iter__(self):
+        return iter(self._deadlines)
+
+    def __contains__(self, key):
+        return key in self._deadlines
+
+    def _tick(self, when):
+        return math.ceil(when / self.resolution)
+
+    def _bucket(self, deadline):
+        if deadline <= self._now:
+            return self._expired
+        turns = self._turns
+        for level in range(self.levels - 1):
+            if deadline // turns[level + 1] == self._now // turns[level + 1]:
+                return self._wheels[level][deadline // turns[level] % self.slots]
+        if deadline - self._now < turns[-1]:
+            top = self.levels - 1
+            return self._wheels[top][deadline // turns[top] % self.slots]
+        raise ValueError(f"Deadline is more than {self.span:.0f}s ahead.")
+
+    def add(self, key, when):
+        """Fire `key` at `when` (seconds since the epoch), replacing any earlier deadline."""
+        self.remove(key)
+        deadline = self._tick(when)
+        self._bucket(deadline).add(key)
+        self._deadlines[key] = deadline
+
+    def remove(self, key):
+        deadline = self._deadlines.pop(key, None)
+        if deadline is not None:
+            self._bucket(deadline).discard(key)
+
+    def _cascade(self, level):
+        slot = self._now // self._turns[level] % self.slots
+        keys, self._wheels[level][slot] = self._wheels[level][slot], set()
+        for key in keys:
+            self._bucket(self._deadlines[key]).add(key)
+
+    def advance(self, now):
+        """Move the wheel on to `now` and return the keys that came due, in deadline order."""
+        target = int(now / self.resolution)
+        fired = sorted(self._expired, key=self._deadlines.get)
+        self._expired = set()
+        while self._now < target:
+            # Jump over turns of the lower levels while they are empty
+            empty = 0
+            while empty < self.levels - 1 and not any(self._wheels[empty]):
+                empty += 1
+            if empty:
+                turn = self._turns[empty]
+                self._now = min((self._now // turn + 1) * turn - 1, target)
+                if self._now == target:
+                    break
+            self._now += 1
+            # Higher levels first, so keys they hand down for this tick
+            # land in buckets that are cascaded or fired next. Keys handed
+            # down with this very tick as their deadline land in _expired.
+            for level in range(self.levels - 1, 0, -1):
+                if self._now % self._turns[level] == 0:
+                    self._cascade(level)
+            slot = self._now % self.slots
+            keys, self._wheels[0][slot] = self._wheels[0][slot] | self._expired, set()
+            self._expired = set()
+            fired.extend(sorted(keys))
+        for key in fired:
+            del self._deadlines[key]
+        return fired
+
+
+class ReminderSink(object):
+    """
+    Destination for due-date reminders.
+
+    `send` gets one batch at a time: a list of dicts with the task's `id`,
+    `household_id`, `name`, `due_date` and `assignee_ids`.
+    """
+
+    @classmethod
+    def from_config(cls, config):
+        return cls()
+
+    def send(self, reminders):
+        raise NotImplementedError
+
+
+class LogSink(ReminderSink):
+    """Log every reminder at WARNING, so they show at the default LOG_LEVEL."""
+
+    def send(self, reminders):
+        for reminder in reminders:
+            logger.warning("Task %(id)s '%(name)s' is due at %(due_date)s", reminder, extra={"reminder": reminder})
+
+
+class WebhookSink(ReminderSink):
+    """POST each batch as `{"reminders": [...]}` to REMINDER_WEBHOOK_URL."""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls, config):
+        if not config["REMINDER_WEBHOOK_URL"]:
+            raise ValueError("REMINDER_WEBHOOK_URL must be set to use WebhookSink.")
+        return cls(config["REMINDER_WEBHOOK_URL"])
+
+    def send(self, reminders):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"reminders": reminders}).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class ReminderScheduler(object):
+    """
+    Send a reminder REMINDER_LEAD_SECONDS before each open task is due.
+
+    Runs as its own process (`flask reminders run`). Tasks due within the
+    next REMINDER_WINDOW_SECONDS are loaded into a TimingWheel by a range
+    scan of ix_tasks_due_date, at most REMINDER_MAX_PENDING at a time, so
+    memory stays bounded however many tasks have due dates; the window is
+    extended as reminders fire. Task writes are picked up by tailing the
+    sync changelog rather than rescanning, and reminders that come due
+    together are sent to the REMINDER_SINK in batches of
+    REMINDER_BATCH_SIZE.
+
+    Delivery is at most once per run: a failed batch is logged and dropped,
+    and a restart resends reminders for tasks whose lead time has begun.
+    """
+
+    def __init__(self):
+        self.lead_seconds = 900
+        self.window_seconds = 86400
+        self.max_pending = 1000000
+        self.batch_size = 500
+        self.poll_seconds = 1
+        self.sink = None
+        self.wheel = None
+        self._cursor = None
+        self._last_change_id = 0
+
+    def init_app(self, app):
+        app.config.setdefault("REMINDER_SINK", "roomies_todo_list.reminders.LogSink")
+        app.config.setdefault("REMINDER_WEBHOOK_URL", None)
+        app.config.setdefault("REMINDER_LEAD_SECONDS", 900)
+        app.config.setdefault("REMINDER_WINDOW_SECONDS", 86400)
+        app.config.setdefault("REMINDER_MAX_PENDING", 1000000)
+        app.config.setdefault("REMINDER_BATCH_SIZE", 500)
+        app.config.setdefault("REMINDER_POLL_SECONDS", 1)
+        self.lead_seconds = app.config["REMINDER_LEAD_SECONDS"]
+        self.window_seconds = app.config["REMINDER_WINDOW_SECONDS"]
+        self.max_pending = app.config["REMINDER_MAX_PENDING"]
+        self.batch_size = app.config["REMINDER_BATCH_SIZE"]
+        self.poll_seconds = app.config["REMINDER_POLL_SECONDS"]
+        self.sink = import_string(app.config["REMINDER_SINK"]).from_config(app.config)
+
+    def _remind_at(self, due_date):
+        return due_date.timestamp() - self.lead_seconds
+
+    def start(self, now):
+        """Forget everything pending and load the reminders due from `now`."""
+        self.wheel = TimingWheel(now)
+        if self.window_seconds > self.wheel.span:
+            raise ValueError(f"REMINDER_WINDOW_SECONDS may be at most {self.wheel.span:.0f}.")
+        # Tasks already overdue get no reminder
+        self._cursor = (datetime.fromtimestamp(now), 0)
+        self._last_change_id = db.session.query(func.max(SyncChange.id)).scalar() or 0
+        self.extend(now)
+
+    def _loaded(self, task_id, due_date):
+        return (due_date, task_id) <= self._cursor
+
+    def extend(self, now):
+        """Load the next open tasks, by due date, up to the window or REMINDER_MAX_PENDING."""
+        horizon = datetime.fromtimestamp(now + self.lead_seconds + self.window_seconds)
+        while len(self.wheel) < self.max_pending:
+            last_due, last_id = self._cursor
+            rows = (
+                db.session.query(Task.id, Task.due_date)
+                .filter(
+                    db.not_(Task.is_completed),
+                    Task.due_date < horizon,
+                    or_(Task.due_date > last_due, and_(Task.due_date == last_due, Task.id > last_id)),
+                )
+                .order_by(Task.due_date, Task.id)
+                .limit(min(IN_BATCH_SIZE * 10, self.max_pending - len(self.wheel)))
+                .all()
+            )
+            if not rows:
+                # Nothing else is due before the horizon
+                self._cursor = (horizon, 0)
+                break
+            for task_id, due_date in rows:
+                # The cursor can fall behind while the wheel is full
+                if due_date.timestamp() > now:
+                    self.wheel.add(task_id, self._remind_at(due_date))
+            self._cursor = (rows[-1].due_date, rows[-1].id)
+
+    def poll_changes(self, now):
+        """Reschedule the tasks written since the last poll."""
+        latest = db.session.query(func.max(SyncChange.id)).scalar() or 0
+        if latest < self._last_change_id:
+            # The changelog was rebuilt, so positions in it are meaningless
+            self.start(now)
+            return
+
+        while True:
+            changes = (
+                db.session.query(SyncChange.id, SyncChange.row_id)
+                .filter(SyncChange.table_name == "tasks", SyncChange.id > self._last_change_id)
+                .order_by(SyncChange.id)
+                .limit(IN_BATCH_SIZE)
+                .all()
+            )
+            if not changes:
+                return
+            self._last_change_id = changes[-1].id
+            self._reschedule(sorted({change.row_id for change in changes}), now)
+
+    def _reschedule(self, task_ids, now):
+        found = {
+            row.id: row
+            for row in db.session.query(Task.id, Task.due_date, Task.is_completed).filter(Task.id.in_(task_ids))
+        }
+        for task_id in task_ids:
+            row = found.get(task_id)
+            if (
+                row is None
+                or row.is_completed
+                or row.due_date is None
+                or row.due_date.timestamp() <= now
+                or not self._loaded(task_id, row.due_date)
+            ):
+                # Tasks due past the cursor are loaded as it moves on
+                self.wheel.remove(task_id)
+            else:
+                self.wheel.add(task_id, self._remind_at(row.due_date))
+
+    def dispatch(self, task_ids):
+        """Send reminders for the tasks in `task_ids` that are still open. Returns how many were sent."""
+        sent = 0
+        for start in range(0, len(task_ids), self.batch_size):
+            chunk = task_ids[start : start + self.batch_size]
+            rows = (
+                db.session.query(Task.id, Task.household_id, Task.name, Task.due_date)
+                .filter(Task.id.in_(chunk), db.not_(Task.is_completed))
+                .order_by(Task.due_date, Task.id)
+                .all()
+            )
+            assignees = {}
+            for task_id, user_id in (
+                db.session.query(TaskAssignee.task_id, TaskAssignee.user_id)
+                .filter(TaskAssignee.task_id.in_(chunk))
+                .order_by(TaskAssignee.user_id)
+            ):
+                assignees.setdefault(task_id, []).append(user_id)
+            reminders = [
+                {
+                    "id": row.id,
+                    "household_id": row.household_id,
+                    "name": row.name,
+                    "due_date": row.due_date.isoformat(),
+                    "assignee_ids": assignees.get(row.id, []),
+                }
+                for row in rows
+            ]
+            if not reminders:
+                continue
+            try:
+                self.sink.send(reminders)
+            except Exception:
+                logger.exception("Dropped %d reminders", len(reminders))
+                continue
+            sent += len(reminders)
+        return sent
+
+    def step(self, now):
+        """Pick up writes, top up the wheel and send whatever came due by `now`."""
+        self.poll_changes(now)
+        self.extend(now)
+        sent = self.dispatch(self.wheel.advance(now))
+        # Don't sit in a transaction between polls
+        db.session.remove()
+        return sent
+
+    def fire(self, now):
+        """Send whatever came due by `now`, without touching the database if nothing did."""
+        task_ids = self.wheel.advance(now)
+        if not task_ids:
+            return 0
+        sent = self.dispatch(task_ids)
+        db.session.remove()
+        return sent
+
+    def run(self, clock=time.time, sleep=time.sleep):
+        """
+        Poll for writes every REMINDER_POLL_SECONDS and fire the wheel every
+        tick in between, so reminders go out within a tick of being due.
+        """
+        self.start(clock())
+        db.session.remove()
+        next_poll = clock() + self.poll_seconds
+        while True:
+            now = clock()
+            if now >= next_poll:
+                self.step(now)
+                next_poll = now + self.poll_seconds
+            else:
+                self.fire(now)
+            resolution = self.wheel.resolution
+            sleep(resolution - clock() % resolution)
+
+
+scheduler = ReminderScheduler()
+
+
+# CLI
+cli = AppGroup("reminders", help="Send due-date reminders.")
+
+
+@cli.command("run")
+def run_command():
+    """Send reminders as tasks come due, until interrupted."""
+    click.echo(f"Sending reminders {scheduler.lead_seconds}s before tasks are due.")
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
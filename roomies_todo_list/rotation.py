@@ -0,0 +1,283 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, exists, func
+from sqlalchemy.orm import Session
+
+from roomies_todo_list import db, response_cache
+from .models import BadRequest, Recurrence, Task, TaskAssignee, TaskCompletionStat, User
+from .sync import record_changes
+
+
+class LoadIndex(object):
+    """
+    Min-heap of users keyed by their current chore load.
+
+    Updates push a fresh entry and leave the old one behind; stale entries
+    are skipped when they reach the top. Ties go to whoever was assigned
+    least recently, so equally loaded roommates take turns.
+    """
+
+    def __init__(self, loads=None):
+        self._loads = {}
+        self._heap = []
+        self._turns = itertools.count()
+        for user_id, load in (loads or {}).items():
+            self.set(user_id, load)
+
+    def __len__(self):
+        return len(self._loads)
+
+    def load(self, user_id):
+        return self._loads.get(user_id)
+
+    def set(self, user_id, load):
+        self._loads[user_id] = load
+        heapq.heappush(self._heap, (load, next(self._turns), user_id))
+        if len(self._heap) > 2 * len(self._loads) + 64:
+            self._compact()
+
+    def add(self, user_id, delta):
+        if user_id in self._loads:
+            self.set(user_id, self._loads[user_id] + delta)
+
+    def available(self, candidates=None):
+        """How many users `pick` can choose from."""
+        if candidates is None:
+            return len(self._loads)
+        return len({user_id for user_id in candidates if user_id in self._loads})
+
+    def _compact(self):
+        self._heap = [entry for entry in self._heap if self._loads.get(entry[2]) == entry[0]]
+        heapq.heapify(self._heap)
+
+    def pick(self, count, candidates=None):
+        """
+        Take the `count` least loaded users, optionally only from
+        `candidates`, and charge each of them one task.
+        """
+        if candidates is not None:
+            known = [user_id for user_id in set(candidates) if user_id in self._loads]
+            picked = heapq.nsmallest(count, known, key=lambda user_id: self._loads[user_id])
+        else:
+            picked = []
+            while self._heap and len(picked) < count:
+                load, _, user_id = heapq.heappop(self._heap)
+                if self._loads.get(user_id) == load and user_id not in picked:
+                    picked.append(user_id)
+        for user_id in picked:
+            self.set(user_id, self._loads[user_id] + 1)
+        return picked
+
+
+class RotationScheduler(object):
+    """
+    Pick assignees for tasks so chores are spread evenly.
+
+    A user's load is their open assigned tasks, other than the templates of
+    recurring chores, plus ROTATION_COMPLETION_WEIGHT for every task they
+    completed in the last ROTATION_HISTORY_DAYS, so whoever has been doing
+    the most lately gets a break. The index is built from two GROUP BY
+    queries and then kept up to date by the assignments made through it; it
+    is rebuilt every ROTATION_REFRESH_SECONDS to pick up changes made
+    elsewhere. Every household has its own index, built from its own rows
+    only.
+
+    Picks are charged to the index straight away, and undone if the
+    session's transaction ends without committing them, so a failed
+    write doesn't leave its assignees looking busier than they are.
+    """
+
+    def __init__(self):
+        self.completion_weight = 0.5
+        self.history_days = 28
+        self.refresh_seconds = 60
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault("ROTATION_COMPLETION_WEIGHT", 0.5)
+        app.config.setdefault("ROTATION_HISTORY_DAYS", 28)
+        app.config.setdefault("ROTATION_REFRESH_SECONDS", 60)
+        self.completion_weight = app.config["ROTATION_COMPLETION_WEIGHT"]
+        self.history_days = app.config["ROTATION_HISTORY_DAYS"]
+        self.refresh_seconds = app.config["ROTATION_REFRESH_SECONDS"]
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._indexes = {}
+
+    def _build(self, household_id):
+        # Filtered explicitly, as the CLI assigns outside of any request scope
+        loads = {
+            user_id: 0
+            for (user_id,) in db.session.query(User.id).filter(User.household_id == household_id)
+        }
+        open_counts = (
+            db.session.query(TaskAssignee.user_id, func.count(TaskAssignee.id))
+            .join(Task, Task.id == TaskAssignee.task_id)
+            .filter(TaskAssignee.household_id == household_id, db.not_(Task.is_completed))
+            # Templates stand for chores that move between roommates, so
+            # holding one is no load; their occurrences are
+            .filter(~exists().where(Recurrence.task_id == Task.id))
+            .group_by(TaskAssignee.user_id)
+        )
+        for user_id, count in open_counts:
+            loads[user_id] = loads.get(user_id, 0) + count
+
+        since = date.today() - timedelta(days=self.history_days)
+        recent = (
+            db.session.query(TaskCompletionStat.user_id, func.sum(TaskCompletionStat.completions))
+            .filter(TaskCompletionStat.day >= since)
+            .group_by(TaskCompletionStat.user_id)
+        )
+        for user_id, completions in recent:
+            if user_id in loads:
+                loads[user_id] += self.completion_weight * completions
+        return LoadIndex(loads)
+
+    def _current(self, household_id):
+        index, built_at = self._indexes.get(household_id, (None, 0))
+        if index is None or time.monotonic() - built_at > self.refresh_seconds:
+            index = self._build(household_id)
+            self._indexes[household_id] = (index, time.monotonic())
+        return index
+
+    def pick(self, household_id, count, candidates=None, release=()):
+        """
+        Choose `count` of `household_id`'s users as assignees, optionally
+        from `candidates`. Users in `release` are the task's previous
+        assignees and are credited first.
+        """
+        with self._lock:
+            index = self._current(household_id)
+            available = index.available(candidates)
+            if available < count:
+                raise BadRequest(f"Only {available} users are available to assign.")
+            for user_id in release:
+                index.add(user_id, -1)
+            picked = index.pick(count, candidates)
+        db.session.info.setdefault(_PENDING_PICKS, []).append((index, picked, release))
+        return picked
+
+    def _undo(self, picks):
+        with self._lock:
+            for index, picked, release in picks:
+                for user_id in picked:
+                    index.add(user_id, -1)
+                for user_id in release:
+                    index.add(user_id, 1)
+
+
+scheduler = RotationScheduler()
+
+# Session.info key of the picks the session's transaction has yet to commit
+_PENDING_PICKS = "rotation_picks"
+
+
+@event.listens_for(Session, "after_commit")
+def _keep_picks(session):
+    session.info.pop(_PENDING_PICKS, None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _undo_picks(session, transaction):
+    # Rolled back, or closed without committing
+    if transaction.parent is None and _PENDING_PICKS in session.info:
+        scheduler._undo(session.info.pop(_PENDING_PICKS))
+
+
+def unassigned_open_tasks(first_id, last_id):
+    return db.session.query(Task.id, Task.household_id).filter(
+        Task.id.between(first_id, last_id),
+        db.not_(Task.is_completed),
+        ~exists().where(TaskAssignee.task_id == Task.id),
+    )
+
+
+def assign_unassigned(count=1, batch_size=1000, on_skip=None):
+    """
+    Give every open task without assignees `count` of them, writing one
+    batch of tasks_assignees rows per `batch_size` ids. Batches walk the
+    primary key in fixed windows so each one is a short range scan.
+    Tasks whose household has too few users are left alone and passed to
+    `on_skip(task_id, message)`. Returns the number of tasks assigned.
+    """
+    assigned = 0
+    last_id = db.session.query(func.max(Task.id)).scalar() or 0
+    for first_id in range(1, last_id + 1, batch_size):
+        tasks = sorted(unassigned_open_tasks(first_id, first_id + batch_size - 1))
+        if not tasks:
+            continue
+
+        now = datetime.now()
+        rows = []
+        picked_tasks = []
+        for task_id, household_id in tasks:
+            try:
+                picked = scheduler.pick(household_id, count)
+            except BadRequest as e:
+                if on_skip is not None:
+                    on_skip(task_id, e.message)
+                continue
+            rows.extend(
+                {"household_id": household_id, "task_id": task_id, "user_id": user_id, "created_at": now}
+                for user_id in picked
+            )
+            picked_tasks.append((task_id, household_id))
+        if not picked_tasks:
+            continue
+
+        db.session.execute(TaskAssignee.__table__.insert(), rows)
+        for task_id, household_id in picked_tasks:
+            record_changes("tasks", [task_id], household_id=household_id)
+        db.session.commit()
+        assigned += len(picked_tasks)
+    return assigned
+
+
+def assign_task(task, count=1, candidates=None):
+    """Replace `task`'s assignees with the `count` least loaded users. The caller commits."""
+    previous = [user.id for user in task.assignees] if not task.is_completed else []
+    picked = scheduler.pick(task.household_id, count, candidates, release=previous)
+    task.set_assignees(picked)
+    return picked
+
+
+def parse_assignment(data):
+    count = data.get("count", 1)
+    candidates = data.get("user_ids")
+    if not isinstance(count, int) or count < 1:
+        raise BadRequest("'count' must be a positive integer.")
+    if candidates is not None and (
+        not isinstance(candidates, list) or not all(isinstance(user_id, int) for user_id in candidates)
+    ):
+        raise BadRequest("'user_ids' must be a list of integers.")
+    return count, candidates
+
+
+# CLI
+cli = AppGroup("rotation", help="Assign chores by rotation.")
+
+
+@cli.command("assign")
+@click.option("--count", type=click.IntRange(min=1), default=1, help="Assignees per task.")
+@click.option("--batch-size", type=click.IntRange(min=1), default=1000)
+def assign_command(count, batch_size):
+    """Assign every open task that has no assignees yet."""
+    skipped = []
+
+    def skip(task_id, message):
+        skipped.append(task_id)
+        click.echo(f"Skipped task {task_id}: {message}", err=True)
+
+    started = time.perf_counter()
+    assigned = assign_unassigned(count, batch_size, on_skip=skip)
+    response_cache.invalidate("tasks", "users")
+    click.echo(f"Assigned {assigned} tasks in {time.perf_counter() - started:.2f}s; skipped {len(skipped)}.")
@@ -0,0 +1,192 @@
+import base64
+import binascii
+import heapq
+import itertools
+import math
+import re
+import threading
+from array import array
+
+from sqlalchemy import func, literal_column
+
+from roomies_todo_list import db, response_cache
+from .households import current_household_id
+from .models import BadRequest, Task
+from .queries import filter_tasks, parse_limit
+from .serializers import IN_BATCH_SIZE, task_rows_query
+
+# Terms found in a task's name count this many times a match in its description
+NAME_WEIGHT = 2
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def encode_offset(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def decode_offset(cursor):
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise BadRequest("Invalid cursor.")
+    if offset < 0:
+        raise BadRequest("Invalid cursor.")
+    return offset
+
+
+class InvertedIndex(object):
+    """
+    In-memory term -> task id postings over task names and descriptions.
+
+    Used where the database has no full-text search (SQLite in tests and
+    development). It is rebuilt whenever the "tasks" response cache version
+    changes, which every task write already bumps. Postings are compact
+    arrays of ids, so a million short tasks fit in tens of megabytes.
+    Each household gets its own index, see `fallback_index`.
+    """
+
+    def __init__(self):
+        self._names = {}
+        self._descriptions = {}
+        self._size = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def build(self, rows):
+        names, descriptions, size = {}, {}, 0
+        for task_id, name, description in rows:
+            size += 1
+            for term in set(tokenize(name)):
+                names.setdefault(term, array("q")).append(task_id)
+            for term in set(tokenize(description)):
+                descriptions.setdefault(term, array("q")).append(task_id)
+        self._names, self._descriptions, self._size = names, descriptions, size
+
+    def refresh(self):
+        version = response_cache.version("tasks")
+        with self._lock:
+            if version != self._version:
+                self.build(
+                    db.session.query(Task.id, Task.name, Task.description)
+                    .execution_options(stream_results=True)
+                    .yield_per(10000)
+                )
+                self._version = version
+
+    def search(self, text):
+        """
+        Yield (score, task id) for every task matching all terms in `text`,
+        best first. Hits are ordered lazily from a heap, so reading one page
+        of a broad query does not pay for sorting all of it.
+        """
+        terms = set(tokenize(text))
+        if not terms:
+            return
+
+        matches = None
+        scores = {}
+        for term in sorted(terms, key=self._frequency):
+            in_name = self._names.get(term, ())
+            in_description = self._descriptions.get(term, ())
+            found = set(in_name).union(in_description)
+            matches = found if matches is None else matches & found
+            if not matches:
+                return
+            idf = math.log(1 + self._size / len(found))
+            for task_id in in_name:
+                scores[task_id] = scores.get(task_id, 0) + NAME_WEIGHT * idf
+            for task_id in in_description:
+                scores[task_id] = scores.get(task_id, 0) + idf
+
+        ranking = [(-scores[task_id], task_id) for task_id in matches]
+        heapq.heapify(ranking)
+        while ranking:
+            score, task_id = heapq.heappop(ranking)
+            yield -score, task_id
+
+    def _frequency(self, term):
+        return len(self._names.get(term, ())) + len(self._descriptions.get(term, ()))
+
+
+_fallback_indexes = {}
+_fallback_lock = threading.Lock()
+
+
+def fallback_index():
+    """
+    The current household's InvertedIndex. Together they hold every task
+    once, and a write only rebuilds the index of its own household.
+    """
+    household_id = current_household_id()
+    with _fallback_lock:
+        index = _fallback_indexes.get(household_id)
+        if index is None:
+            index = _fallback_indexes[household_id] = InvertedIndex()
+        return index
+
+
+def _search_postgres(text, args, offset, limit):
+    vector = literal_column("tasks.search_vector")
+    tsquery = func.plainto_tsquery("english", text)
+    rank = func.ts_rank_cd(vector, tsquery)
+    query = (
+        filter_tasks(task_rows_query(), args)
+        .filter(vector.op("@@")(tsquery))
+        .order_by(rank.desc(), Task.id)
+    )
+    return query.offset(offset).limit(limit + 1).all()
+
+
+def _search_fallback(text, args, offset, limit):
+    index = fallback_index()
+    index.refresh()
+    hits = index.search(text)
+    filtered = bool(set(args) - {"q", "limit", "cursor", "fields"})
+
+    # Walk the ranking in IN-sized chunks, keeping the ids that pass the
+    # filters, until the requested page (plus one) is full.
+    page_ids = []
+    skipped = 0
+    while True:
+        chunk = [task_id for _, task_id in itertools.islice(hits, IN_BATCH_SIZE)]
+        if not chunk:
+            break
+        if filtered:
+            allowed = {
+                task_id
+                for (task_id,) in filter_tasks(db.session.query(Task.id), args).filter(Task.id.in_(chunk))
+            }
+            chunk = [task_id for task_id in chunk if task_id in allowed]
+        take = chunk[max(0, offset - skipped):]
+        skipped += len(chunk) - len(take)
+        page_ids.extend(take[: limit + 1 - len(page_ids)])
+        if len(page_ids) > limit:
+            break
+
+    rows = {row.id: row for row in task_rows_query().filter(Task.id.in_(page_ids))} if page_ids else {}
+    return [rows[task_id] for task_id in page_ids if task_id in rows]
+
+
+def search_tasks(args):
+    """
+    Rank tasks matching every word of `q` in their name or description.
+
+    Returns the rows of the requested page and the cursor for the next one.
+    Postgres answers from the GIN-indexed tasks.search_vector column; other
+    databases use the in-process InvertedIndex.
+    """
+    text = args.get("q", "").strip()
+    if not text:
+        raise BadRequest("'q' is required.")
+    limit = parse_limit(args)
+    offset = decode_offset(args["cursor"]) if args.get("cursor") else 0
+
+    search = _search_postgres if db.engine.dialect.name == "postgresql" else _search_fallback
+    rows = search(text, args, offset, limit)
+    if len(rows) > limit:
+        return rows[:limit], encode_offset(offset + limit)
+    return rows, None
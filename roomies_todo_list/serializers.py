@@ -0,0 +1,139 @@
+import functools
+from collections import defaultdict
+
+from sqlalchemy.orm import aliased
+
+from roomies_todo_list import db
+from .instrumentation import timed
+from .models import Task, TaskAssignee, TaskSchema, User, UserSchema
+
+# Same batch size selectinload uses, which keeps IN lists under the bound
+# parameter limits of every backend.
+IN_BATCH_SIZE = 500
+
+
+@functools.lru_cache(maxsize=None)
+def get_schema(schema_cls, only=None, many=False, partial=False):
+    """
+    Return a shared schema instance for this combination of options.
+
+    Marshmallow schemas keep no per-call state, so one instance per
+    combination can serve every request. Building it once also resolves the
+    nested schemas once instead of on every dump.
+    """
+    schema = schema_cls(only=only, many=many, partial=partial)
+    schema.dump = timed("serialize")(schema.dump)
+    return schema
+
+
+def _in_batches(query, column, ids):
+    for start in range(0, len(ids), IN_BATCH_SIZE):
+        yield from query.filter(column.in_(ids[start : start + IN_BATCH_SIZE]))
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _user_ref(user_id, username, email):
+    if user_id is None:
+        return None
+    return {"id": user_id, "username": username, "email": email}
+
+
+def task_rows_query():
+    """
+    Select the columns TaskSchema dumps as plain rows, without building ORM
+    objects. Filter and paginate it like `Task.query`.
+    """
+    creator = aliased(User)
+    completer = aliased(User)
+    return (
+        db.session.query(
+            Task.id,
+            Task.name,
+            Task.description,
+            Task.due_date,
+            Task.completed_at,
+            Task.created_at,
+            Task.is_completed,
+            Task.version,
+            creator.id.label("created_by_id"),
+            creator.username.label("created_by_username"),
+            creator.email.label("created_by_email"),
+            completer.id.label("completed_by_id"),
+            completer.username.label("completed_by_username"),
+            completer.email.label("completed_by_email"),
+        )
+        .join(creator, creator.id == Task.created_by_id)
+        .outerjoin(completer, completer.id == Task.completed_by_id)
+    )
+
+
+@timed("serialize")
+def dump_task_rows(rows, only=None):
+    """Serialize rows from `task_rows_query` exactly as TaskSchema would."""
+    fields = only or TaskSchema.Meta.fields
+    assignees = defaultdict(list)
+    if "assignees" in fields and rows:
+        query = (
+            db.session.query(TaskAssignee.task_id, User.id, User.username, User.email)
+            .join(User, User.id == TaskAssignee.user_id)
+            .order_by(TaskAssignee.task_id, User.id)
+        )
+        for task_id, *user in _in_batches(query, TaskAssignee.task_id, [row.id for row in rows]):
+            assignees[task_id].append(_user_ref(*user))
+
+    tasks = []
+    for row in rows:
+        task = {
+            "id": row.id,
+            "name": row.name,
+            "description": row.description,
+            "created_by": _user_ref(
+                row.created_by_id, row.created_by_username, row.created_by_email
+            ),
+            "completed_at": _isoformat(row.completed_at),
+            "due_date": _isoformat(row.due_date),
+            "completed_by": _user_ref(
+                row.completed_by_id, row.completed_by_username, row.completed_by_email
+            ),
+            "assignees": assignees[row.id],
+            "is_completed": row.is_completed,
+            "version": row.version,
+        }
+        tasks.append({field: task[field] for field in fields})
+    return tasks
+
+
+def user_rows_query():
+    return db.session.query(User.id, User.email, User.username, User.first_name, User.last_name, User.version)
+
+
+@timed("serialize")
+def dump_user_rows(rows, only=None):
+    """Serialize rows from `user_rows_query` exactly as UserSchema would."""
+    fields = only or UserSchema.Meta.fields
+    tasks = defaultdict(list)
+    if "tasks" in fields and rows:
+        query = (
+            db.session.query(TaskAssignee.user_id, Task.id, Task.name)
+            .join(Task, Task.id == TaskAssignee.task_id)
+            .order_by(TaskAssignee.user_id, Task.id)
+        )
+        for user_id, task_id, name in _in_batches(query, TaskAssignee.user_id, [row.id for row in rows]):
+            tasks[user_id].append({"id": task_id, "name": name})
+
+    users = []
+    for row in rows:
+        user = {
+            "id": row.id,
+            "email": row.email,
+            "username": row.username,
+            "first_name": row.first_name,
+            "last_name": row.last_name,
+            "tasks": tasks[row.id],
+            "version": row.version,
+        }
+        users.append({field: user[field] for field in fields})
+    return users
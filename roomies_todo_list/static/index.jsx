@@ -30,16 +30,56 @@ class App extends React.Component {
     );
   } // end render
 
-  componentDidMount() {
-    const tasks = this.state.tasks;
+  fetchTasks = cursor => {
+    const params = new URLSearchParams({
+      fields: "id,name,assignees,due_date,is_completed"
+    });
+    if (cursor) {
+      params.set("cursor", cursor);
+    }
 
-    fetch("/api/tasks", { method: "GET" })
+    fetch(`/api/tasks?${params}`, { method: "GET" })
       .then(resp => resp.json())
       .then(data => {
-        console.log(data);
-        this.setState({ tasks: data.tasks });
+        this.setState({ tasks: this.state.tasks.concat(data.tasks) });
+        if (data.next_cursor) {
+          this.fetchTasks(data.next_cursor);
+        }
+      });
+  }; // end fetchTasks
+
+  handleTaskEvent = event => {
+    const task = JSON.parse(event.data);
+    const others = this.state.tasks.filter(t => t.id !== task.id);
+    if (event.type === "deleted") {
+      this.setState({ tasks: others });
+    } else if (event.type === "created") {
+      this.setState({ tasks: others.concat([task]) });
+    } else {
+      this.setState({
+        tasks: this.state.tasks.map(t => (t.id === task.id ? task : t))
       });
+    }
+  }; // end handleTaskEvent
+
+  componentDidMount() {
+    this.fetchTasks(null);
+
+    // The browser resumes with Last-Event-ID after a dropped connection;
+    // "reset" means the server no longer has the missed events.
+    this.events = new EventSource("/api/tasks/stream");
+    ["created", "updated", "completed", "deleted"].forEach(type =>
+      this.events.addEventListener(type, this.handleTaskEvent)
+    );
+    this.events.addEventListener("reset", () => {
+      this.setState({ tasks: [] });
+      this.fetchTasks(null);
+    });
   } // end componentDidMount
+
+  componentWillUnmount() {
+    this.events.close();
+  } // end componentWillUnmount
 } // end Index
 
 class Task extends React.Component {
@@ -52,6 +92,20 @@ class Task extends React.Component {
     };
   } // end constructor
 
+  componentDidUpdate(prevProps) {
+    if (
+      prevProps.is_completed !== this.props.is_completed ||
+      prevProps.due_date !== this.props.due_date ||
+      prevProps.assignees !== this.props.assignees
+    ) {
+      this.setState({
+        assignees: this.props.assignees,
+        is_completed: Boolean(this.props.is_completed),
+        due_date: this.props.due_date
+      });
+    }
+  } // end componentDidUpdate
+
   updateTask = data => {
     fetch(`/api/tasks/${this.props.id}`, {
       method: "PATCH",
@@ -0,0 +1,147 @@
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql
+
+from roomies_todo_list import db
+from .models import BadRequest, Task, TaskAssignee, TaskCompletionStat, User
+from .queries import parse_datetime, parse_int
+
+BUCKETS = ("day", "week", "month")
+DEFAULT_HISTORY_DAYS = 90
+
+
+def completion_key(task):
+    """The (user_id, day) summary row a task counts towards, or None if it counts towards none."""
+    if not task.is_completed or task.completed_by_id is None or task.completed_at is None:
+        return None
+    return task.completed_by_id, task.completed_at.date()
+
+
+def record_completions(before, after):
+    """
+    Move completion counts from the `before` keys to the `after` keys.
+
+    Call it with `completion_key` of each task before and after a change,
+    in the same transaction as the change. Keys present on both sides
+    cancel out, so an edit that doesn't touch completion issues nothing.
+    """
+    deltas = Counter(key for key in after if key is not None)
+    deltas.subtract(key for key in before if key is not None)
+
+    table = TaskCompletionStat.__table__
+    for (user_id, day), delta in deltas.items():
+        if not delta:
+            continue
+        if db.engine.dialect.name == "postgresql":
+            insert = postgresql.insert(table).values(user_id=user_id, day=day, completions=delta)
+            db.session.execute(
+                insert.on_conflict_do_update(
+                    index_elements=[table.c.user_id, table.c.day],
+                    set_={"completions": table.c.completions + delta},
+                )
+            )
+            continue
+
+        updated = db.session.execute(
+            table.update()
+            .where(table.c.user_id == user_id)
+            .where(table.c.day == day)
+            .values(completions=table.c.completions + delta)
+        ).rowcount
+        if not updated:
+            db.session.execute(table.insert().values(user_id=user_id, day=day, completions=delta))
+
+
+def rebuild_completion_stats():
+    """Recompute the summary table from the tasks table, e.g. after a bulk import."""
+    table = TaskCompletionStat.__table__
+    day = func.date(Task.completed_at)
+    db.session.execute(table.delete())
+    db.session.execute(
+        table.insert().from_select(
+            ["user_id", "day", "completions"],
+            db.session.query(Task.completed_by_id, day, func.count(Task.id))
+            .filter(Task.is_completed, Task.completed_by_id.isnot(None), Task.completed_at.isnot(None))
+            .group_by(Task.completed_by_id, day),
+        )
+    )
+
+
+def open_task_counts(now=None):
+    """Open and overdue task counts, overall and per assignee."""
+    now = now or datetime.now()
+    overdue = func.sum(case([(Task.due_date < now, 1)], else_=0))
+
+    total_open, total_overdue = (
+        db.session.query(func.count(Task.id), overdue).filter(db.not_(Task.is_completed)).one()
+    )
+    per_user = (
+        db.session.query(TaskAssignee.user_id, func.count(Task.id), overdue)
+        .join(Task, Task.id == TaskAssignee.task_id)
+        .filter(db.not_(Task.is_completed))
+        .group_by(TaskAssignee.user_id)
+        .order_by(TaskAssignee.user_id)
+    )
+    return {
+        "open": total_open,
+        "overdue": total_overdue or 0,
+        "users": [
+            {"user_id": user_id, "open": open_count, "overdue": overdue_count or 0}
+            for user_id, open_count, overdue_count in per_user
+        ],
+    }
+
+
+def bucket_start(day, bucket):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def completion_histogram(args):
+    """
+    Completions per user per day, week (starting Monday) or month between
+    `since` and `until`, read from the summary table.
+    """
+    bucket = args.get("bucket", "week")
+    if bucket not in BUCKETS:
+        raise BadRequest(f"'bucket' must be one of {', '.join(BUCKETS)}.")
+
+    until = parse_datetime(args, "until").date() if "until" in args else date.today()
+    since = (
+        parse_datetime(args, "since").date()
+        if "since" in args
+        else until - timedelta(days=DEFAULT_HISTORY_DAYS)
+    )
+    if since > until:
+        raise BadRequest("'since' must not be after 'until'.")
+
+    # The summary rows carry no household; the user subquery is scoped to it
+    query = db.session.query(
+        TaskCompletionStat.user_id, TaskCompletionStat.day, TaskCompletionStat.completions
+    ).filter(
+        TaskCompletionStat.day >= since,
+        TaskCompletionStat.day <= until,
+        TaskCompletionStat.user_id.in_(db.session.query(User.id)),
+    )
+    if "user_id" in args:
+        query = query.filter(TaskCompletionStat.user_id == parse_int(args, "user_id"))
+
+    counts = defaultdict(int)
+    for user_id, day, completions in query:
+        counts[user_id, bucket_start(day, bucket)] += completions
+
+    return {
+        "bucket": bucket,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "completions": [
+            {"user_id": user_id, "period": period.isoformat(), "count": count}
+            for (user_id, period), count in sorted(counts.items())
+            if count
+        ],
+    }
@@ -0,0 +1,170 @@
+import base64
+import binascii
+import itertools
+from http import HTTPStatus
+
+from sqlalchemy import event, func, literal
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from roomies_todo_list import db
+from .households import default_household_id
+from .models import BadRequest, SyncChange, Task, User, UserSchema
+from .queries import parse_limit
+from .serializers import IN_BATCH_SIZE, dump_task_rows, dump_user_rows, task_rows_query, user_rows_query
+
+SYNCED_TABLES = ("tasks", "users")
+# Sync sends users without their `tasks`, which assignments change without
+# touching the user; clients rebuild them from the tasks' `assignees`.
+SYNCED_USER_FIELDS = tuple(field for field in UserSchema.Meta.fields if field != "tasks")
+# pg_advisory_xact_lock key serializing changelog writes
+CHANGELOG_LOCK = 0x73796E63
+
+
+# TRACKING
+def record_changes(table_name, row_ids, deleted=False, household_id=None):
+    """
+    Mark rows of `household_id`, by default the current one, as changed in
+    the current transaction. Writes made through the ORM are tracked on
+    flush; bulk statements must call this.
+    """
+    household_id = household_id or default_household_id()
+    changes = db.session.info.setdefault("sync_changes", {})
+    for row_id in row_ids:
+        changes[table_name, row_id] = deleted, household_id
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_rows(session, flush_context):
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        table_name = getattr(obj, "__tablename__", None)
+        if table_name in SYNCED_TABLES:
+            changes = session.info.setdefault("sync_changes", {})
+            changes[table_name, obj.id] = obj in session.deleted, obj.household_id
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop("sync_changes", None)
+
+
+def _lock_changelog(session):
+    # Held from here until the commit, so ids become visible in order: a
+    # sync can never see a change and later miss one committed under a
+    # lower id. SQLite already lets a single writer in at a time.
+    if db.engine.dialect.name == "postgresql":
+        session.execute(func.pg_advisory_xact_lock(CHANGELOG_LOCK))
+
+
+@event.listens_for(Session, "before_commit")
+def _write_changes(session):
+    """Give every row the transaction changed a new, higher change id."""
+    session.flush()
+    changes = session.info.pop("sync_changes", None)
+    if not changes:
+        return
+
+    _lock_changelog(session)
+    table = SyncChange.__table__
+    rows = [
+        {"household_id": household_id, "table_name": table_name, "row_id": row_id, "deleted": deleted}
+        for (table_name, row_id), (deleted, household_id) in changes.items()
+    ]
+    if db.engine.dialect.name == "postgresql":
+        insert = postgresql.insert(table)
+        session.execute(
+            insert.on_conflict_do_update(
+                constraint="_sync_change_row_uc",
+                set_={
+                    "id": insert.excluded.id,
+                    "household_id": insert.excluded.household_id,
+                    "deleted": insert.excluded.deleted,
+                },
+            ),
+            rows,
+        )
+        return
+
+    for table_name in SYNCED_TABLES:
+        row_ids = [row_id for name, row_id in changes if name == table_name]
+        for start in range(0, len(row_ids), IN_BATCH_SIZE):
+            session.execute(
+                table.delete()
+                .where(table.c.table_name == table_name)
+                .where(table.c.row_id.in_(row_ids[start : start + IN_BATCH_SIZE]))
+            )
+    session.execute(table.insert(), rows)
+
+
+def rebuild_sync_changes():
+    """Record every task and user as changed, e.g. after rows were loaded behind the ORM's back."""
+    table = SyncChange.__table__
+    _lock_changelog(db.session)
+    db.session.execute(table.delete())
+    for table_name, model in (("users", User), ("tasks", Task)):
+        db.session.execute(
+            table.insert().from_select(
+                ["household_id", "table_name", "row_id", "deleted"],
+                db.session.query(model.household_id, literal(table_name), model.id, literal(False)).order_by(
+                    model.id
+                ),
+            )
+        )
+
+
+# READING
+def encode_token(change_id):
+    return base64.urlsafe_b64encode(str(change_id).encode()).decode()
+
+
+def decode_token(token):
+    try:
+        return int(base64.urlsafe_b64decode(token.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise BadRequest("Invalid sync token.")
+
+
+def changes_since(args):
+    """
+    The tasks and users changed after the `since` token, and the ids of
+    those deleted, one page of at most `limit` changes at a time.
+
+    Only the latest change to each row is kept, so the cost follows the
+    number of rows changed, not the number of writes or the table sizes.
+    Without `since` every task and user is sent. Changes are read through
+    the household scope; tokens are positions in the shared changelog.
+    """
+    limit = parse_limit(args)
+    since = decode_token(args["since"]) if args.get("since") else 0
+    latest = db.session.query(func.max(SyncChange.id)).execution_options(all_households=True).scalar()
+    if since > (latest or 0):
+        # The database was reset or restored from an older backup
+        raise BadRequest("Sync token is no longer valid, sync from scratch.", status=HTTPStatus.GONE)
+
+    changes = (
+        db.session.query(SyncChange.id, SyncChange.table_name, SyncChange.row_id, SyncChange.deleted)
+        .filter(SyncChange.id > since)
+        .order_by(SyncChange.id)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    changed = {table_name: [] for table_name in SYNCED_TABLES}
+    deleted = {table_name: [] for table_name in SYNCED_TABLES}
+    for change in changes:
+        (deleted if change.deleted else changed)[change.table_name].append(change.row_id)
+
+    tasks = users = []
+    if changed["tasks"]:
+        tasks = task_rows_query().filter(Task.id.in_(changed["tasks"])).order_by(Task.id).all()
+    if changed["users"]:
+        users = user_rows_query().filter(User.id.in_(changed["users"])).order_by(User.id).all()
+    return {
+        "tasks": dump_task_rows(tasks),
+        "users": dump_user_rows(users, SYNCED_USER_FIELDS),
+        "deleted": deleted,
+        "next_token": encode_token(changes[-1].id if changes else since),
+        "has_more": has_more,
+    }
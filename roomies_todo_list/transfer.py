@@ -0,0 +1,365 @@
+import csv
+import io
+import itertools
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import click
+from flask.cli import AppGroup
+from marshmallow import ValidationError
+
+from roomies_todo_list import db, response_cache
+from .models import BadRequest, Task, TaskAssignee, TaskSchema, User, UserSchema
+from .serializers import dump_task_rows, get_schema, task_rows_query, user_rows_query
+from .stats import completion_key, record_completions
+from .sync import record_changes
+
+KINDS = ("tasks", "users")
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+EXPORT_CHUNK_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+# Bytes of encoded records to gather before handing a chunk to the server
+WRITE_BUFFER_SIZE = 64 * 1024
+MAX_REPORTED_ERRORS = 100
+
+TASK_CSV_FIELDS = (
+    "id",
+    "name",
+    "description",
+    "created_by_id",
+    "completed_by_id",
+    "assignee_ids",
+    "due_date",
+    "completed_at",
+    "is_completed",
+)
+USER_CSV_FIELDS = ("id", "email", "username", "first_name", "last_name")
+
+
+# EXPORT
+def _chunks(query):
+    """Stream `query` through a server-side cursor, EXPORT_CHUNK_SIZE rows at a time."""
+    rows = iter(query.execution_options(stream_results=True).yield_per(EXPORT_CHUNK_SIZE))
+    while True:
+        chunk = list(itertools.islice(rows, EXPORT_CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_tasks():
+    for chunk in _chunks(task_rows_query().order_by(Task.id)):
+        yield from dump_task_rows(chunk)
+
+
+def export_users(with_password_hashes=False):
+    query = user_rows_query()
+    if with_password_hashes:
+        query = query.add_columns(User.password_hash)
+    for chunk in _chunks(query.order_by(User.id)):
+        for row in chunk:
+            yield row._asdict()
+
+
+def _task_to_csv(task):
+    return {
+        "id": task["id"],
+        "name": task["name"],
+        "description": task["description"],
+        "created_by_id": task["created_by"]["id"],
+        "completed_by_id": task["completed_by"]["id"] if task["completed_by"] else None,
+        "assignee_ids": " ".join(str(user["id"]) for user in task["assignees"]),
+        "due_date": task["due_date"],
+        "completed_at": task["completed_at"],
+        "is_completed": "true" if task["is_completed"] else "false",
+    }
+
+
+def _task_from_csv(row):
+    task = {key: value for key, value in row.items() if value not in ("", None)}
+    task["created_by"] = {"id": task.pop("created_by_id", None)}
+    if "completed_by_id" in task:
+        task["completed_by"] = {"id": task.pop("completed_by_id")}
+    task["assignees"] = [{"id": user_id} for user_id in task.pop("assignee_ids", "").split()]
+    return task
+
+
+def _user_from_csv(row):
+    return {key: value for key, value in row.items() if value not in ("", None)}
+
+
+def _encode(records, fmt, fieldnames, to_csv=None):
+    if fmt == "ndjson":
+        for record in records:
+            yield json.dumps(record) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    for record in records:
+        writer.writerow(to_csv(record) if to_csv else record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _buffered(pieces):
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= WRITE_BUFFER_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def export_lines(kind, fmt, with_password_hashes=False):
+    """
+    Encode every task or user as NDJSON or CSV, yielding chunks of text.
+
+    Rows come off a server-side cursor and are encoded as they arrive, so
+    memory stays flat however large the table is. Password hashes are
+    only included on request, which the HTTP endpoint never makes.
+    """
+    if kind == "tasks":
+        lines = _encode(export_tasks(), fmt, TASK_CSV_FIELDS, _task_to_csv)
+    else:
+        fieldnames = USER_CSV_FIELDS + (("password_hash",) if with_password_hashes else ())
+        lines = _encode(export_users(with_password_hashes), fmt, fieldnames)
+    return _buffered(lines)
+
+
+# IMPORT
+def _read_records(stream, fmt, from_csv):
+    """Yield (line number, record) pairs from a binary NDJSON or CSV stream."""
+    lines = (line.decode("utf-8") for line in stream)
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, from_csv(row)
+        return
+
+    for line_num, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            yield line_num, BadRequest("Each line must be a JSON object.")
+        else:
+            # Exports write missing values as null, which the schemas refuse
+            yield line_num, {key: value for key, value in record.items() if value is not None}
+
+
+def _require(record, *names):
+    missing = {name: ["Missing data for required field."] for name in names if not record.get(name)}
+    if missing:
+        raise BadRequest(missing)
+
+
+def _load_task(record):
+    # TaskSchema treats ids as dump-only, but imports keep them so that
+    # references between records survive. Versions start over.
+    task_id = record.pop("id", None)
+    record.pop("version", None)
+    data = get_schema(TaskSchema, partial=True).load(record)
+    _require(dict(data, id=task_id), "id", "name", "created_by")
+    try:
+        data["id"] = int(task_id)
+    except (TypeError, ValueError):
+        raise BadRequest({"id": ["Not a valid integer."]})
+    return data
+
+
+def _load_user(record):
+    # UserSchema never loads password hashes, but exports made with them
+    # should restore them.
+    password_hash = record.pop("password_hash", None)
+    record.pop("version", None)
+    data = get_schema(UserSchema).load(record)
+    _require(data, "id")
+    data.pop("tasks", None)
+    data["password_hash"] = password_hash
+    return data
+
+
+def _write_tasks(batch, report):
+    ids = [data["id"] for _, data in batch]
+    # Ids are unique across households, referenced users must be in this one
+    existing = {
+        task_id
+        for (task_id,) in db.session.query(Task.id)
+        .execution_options(all_households=True)
+        .filter(Task.id.in_(ids))
+    }
+    user_ids = {
+        ref["id"]
+        for _, data in batch
+        for ref in [data["created_by"], data.get("completed_by")] + data.get("assignees", [])
+        if ref
+    }
+    users = {user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_(user_ids))}
+
+    now = datetime.now()
+    tasks, assignees, completions = [], [], []
+    for line_num, data in batch:
+        refs = [data["created_by"], data.get("completed_by")] + data.get("assignees", [])
+        if data["id"] in existing:
+            report(line_num, "Task already exists.")
+            continue
+        if any(ref and ref["id"] not in users for ref in refs):
+            report(line_num, "User not found.")
+            continue
+
+        existing.add(data["id"])
+        task = {
+            "id": data["id"],
+            "name": data["name"],
+            "description": data.get("description"),
+            "created_by_id": data["created_by"]["id"],
+            "completed_by_id": (data.get("completed_by") or {}).get("id"),
+            "due_date": data.get("due_date"),
+            "completed_at": data.get("completed_at"),
+            "is_completed": data.get("is_completed", False),
+            "created_at": now,
+        }
+        tasks.append(task)
+        assignees.extend(
+            {"task_id": data["id"], "user_id": user_id, "created_at": now}
+            for user_id in {ref["id"] for ref in data.get("assignees", [])}
+        )
+        completions.append(completion_key(SimpleNamespace(**task)))
+
+    if tasks:
+        db.session.execute(Task.__table__.insert(), tasks)
+        record_changes("tasks", [task["id"] for task in tasks])
+    if assignees:
+        db.session.execute(TaskAssignee.__table__.insert(), assignees)
+    record_completions([], completions)
+    return len(tasks)
+
+
+def _write_users(batch, report):
+    ids = [data["id"] for _, data in batch]
+    emails = [data["email"] for _, data in batch]
+    usernames = [data["username"] for _, data in batch]
+    taken = set()
+    for row in (
+        db.session.query(User.id, User.email, User.username)
+        .execution_options(all_households=True)
+        .filter(db.or_(User.id.in_(ids), User.email.in_(emails), User.username.in_(usernames)))
+    ):
+        taken.update([("id", row.id), ("email", row.email), ("username", row.username)])
+
+    now = datetime.now()
+    users = []
+    for line_num, data in batch:
+        keys = [("id", data["id"]), ("email", data["email"]), ("username", data["username"])]
+        if taken.intersection(keys):
+            report(line_num, "User already exists.")
+            continue
+
+        taken.update(keys)
+        users.append(
+            {
+                "id": data["id"],
+                "email": data["email"],
+                "username": data["username"],
+                "first_name": data.get("first_name"),
+                "last_name": data.get("last_name"),
+                "password_hash": data.get("password_hash"),
+                "created_at": now,
+            }
+        )
+
+    if users:
+        db.session.execute(User.__table__.insert(), users)
+        record_changes("users", [user["id"] for user in users])
+    return len(users)
+
+
+def _sync_sequence(table):
+    """Move a Postgres id sequence past ids that were inserted explicitly."""
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+        )
+
+
+def import_stream(kind, stream, fmt):
+    """
+    Validate and insert the records in `stream`, IMPORT_BATCH_SIZE at a time.
+
+    Records keep their ids, so users must be imported before the tasks
+    that reference them. Each batch is committed on its own; invalid
+    records are skipped and reported by line number.
+    """
+    if kind == "tasks":
+        from_csv, load, write = _task_from_csv, _load_task, _write_tasks
+    else:
+        from_csv, load, write = _user_from_csv, _load_user, _write_users
+    result = {"imported": 0, "failed": 0, "errors": []}
+
+    def report(line_num, message):
+        result["failed"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append({"line": line_num, "error": {"message": message}})
+
+    def flush(batch):
+        result["imported"] += write(batch, report)
+        db.session.commit()
+
+    batch = []
+    for line_num, record in _read_records(stream, fmt, from_csv):
+        try:
+            if isinstance(record, BadRequest):
+                raise record
+            batch.append((line_num, load(record)))
+        except ValidationError as e:
+            report(line_num, e.messages)
+        except BadRequest as e:
+            report(line_num, e.message)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    _sync_sequence(kind)
+    db.session.commit()
+    response_cache.invalidate("users", "tasks")
+    return result
+
+
+# CLI
+cli = AppGroup("data", help="Export and import tasks and users.")
+
+
+@cli.command("export")
+@click.argument("kind", type=click.Choice(KINDS))
+@click.option("--format", "fmt", type=click.Choice(list(FORMATS)), default="ndjson")
+@click.option("--output", type=click.File("w"), default="-")
+def export_command(kind, fmt, output):
+    """Write every task or user to OUTPUT, including password hashes."""
+    for chunk in export_lines(kind, fmt, with_password_hashes=True):
+        output.write(chunk)
+
+
+@cli.command("import")
+@click.argument("kind", type=click.Choice(KINDS))
+@click.argument("input", type=click.File("rb"), default="-")
+@click.option("--format", "fmt", type=click.Choice(list(FORMATS)), default="ndjson")
+def import_command(kind, input, fmt):
+    """Load tasks or users exported by `flask data export`."""
+    result = import_stream(kind, input, fmt)
+    for error in result["errors"]:
+        click.echo(f"line {error['line']}: {error['error']['message']}", err=True)
+    click.echo(f"Imported {result['imported']} {kind}, {result['failed']} failed.")
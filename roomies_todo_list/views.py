@@ -1,59 +1,133 @@
-from flask import request, jsonify, render_template, redirect, url_for, flash
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    flash,
+    g,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    stream_with_context,
+    url_for,
+)
 from flask_login import current_user, login_user, logout_user, login_required
-from roomies_todo_list import app, db, forms
-from .models import User, UserSchema, Task, TaskSchema, TaskAssignee
+from roomies_todo_list import db, idempotency, principals, response_cache, task_events
+from .cache import etag
+from .models import User, UserSchema, Task, TaskSchema, TaskAssignee, Recurrence, RecurrenceSchema
+from .database import read_replica
+from .encoding import contains_etag
+from .households import current_household_id
+from .queries import filter_tasks, loader_options, paginate, parse_fields, parse_int, users_by_id
+from .recurrence import is_occurrence, list_occurrences, materialize, naive_utc, parse_window, validate_rule
+from .rotation import assign_task, parse_assignment
+from . import search, sync
+from .stats import completion_histogram, completion_key, open_task_counts, record_completions
+from .transfer import FORMATS, export_lines, import_stream
+from .serializers import (
+    dump_task_rows,
+    dump_user_rows,
+    get_schema,
+    task_rows_query,
+    user_rows_query,
+)
 from http import HTTPStatus
 from datetime import datetime
+import logging
 from werkzeug import urls
+from dateutil.parser import isoparse
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.exc import StaleDataError
 
 # Error Handling Imports
 from .errors import BadRequest
 from sqlalchemy.exc import IntegrityError
 from marshmallow import ValidationError
 
+bp = Blueprint("main", __name__)
+logger = logging.getLogger(__name__)
+
 API = "/api"
+MAX_BATCH_SIZE = 5000
+STREAM_HEARTBEAT_SECONDS = 15
+
+
+def _check_if_match(version, representation):
+    """
+    Refuse a PATCH or DELETE with 412 unless its If-Match header names the
+    resource's `version`, or the ETag GET serves for `representation()`.
+    Writes without the header are not checked here, but still fail if the
+    row changes between being read and written.
+    """
+    tags = request.if_match
+    if not tags or tags.contains(str(version)):
+        return
+    if not contains_etag(tags, etag(jsonify(representation()).get_data())):
+        raise BadRequest(
+            "The resource has been changed since it was read.",
+            status=HTTPStatus.PRECONDITION_FAILED,
+            payload={"version": version},
+        )
+
+
+def _tagged(body):
+    """Respond with `body` and the ETag a GET would serve for it."""
+    response = jsonify(body)
+    response.set_etag(etag(response.get_data()))
+    return response
 
 
-@app.route("/")
+@bp.route("/")
 @login_required
 def index():
     return render_template("index.html")
 
 
-@app.route("/favicon.ico")
+@bp.route("/favicon.ico")
 def favicon():
     return ""
 
 
-@app.route("/login", methods=["GET", "POST"])
+@bp.route("/login", methods=["GET", "POST"])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for("index"))
-    form = forms.LoginForm()
+        return redirect(url_for("main.index"))
+    from roomies_todo_list.forms import LoginForm
+
+    form = LoginForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(username=form.username.data).first()
+        # Signing in is what picks the household, so look in all of them
+        user = (
+            User.query.execution_options(all_households=True)
+            .filter_by(username=form.username.data)
+            .first()
+        )
         if user is None or not user.check_password(form.password.data):
             flash("Invalid username or password")
-            return redirect(url_for("login"))
+            return redirect(url_for("main.login"))
+        g.household_id = user.household_id
+        # check_password may have upgraded the stored hash
+        db.session.commit()
         login_user(user, remember=form.remember_me.data)
         next_page = request.args.get("next")
         if not next_page or urls.url_parse(next_page).netloc != "":
-            next_page = url_for("index")
+            next_page = url_for("main.index")
         return redirect(next_page)
     return render_template("login.html", title="Sign In", form=form)
 
 
-@app.route("/logout")
+@bp.route("/logout")
 def logout():
     logout_user()
-    return redirect(url_for("index"))
+    return redirect(url_for("main.index"))
 
 
 # USER ROUTES
-@app.route(API + "/users", methods=["POST"])
+@bp.route(API + "/users", methods=["POST"])
+@idempotency.idempotent
 def add_user():
     try:
-        data = UserSchema().load(request.get_json().get("user"))
+        data = get_schema(UserSchema).load(request.get_json().get("user"))
         new_user = User(**data)
     except ValidationError as e:
         raise BadRequest(e.messages)
@@ -66,15 +140,18 @@ def add_user():
         raise BadRequest("Email or username is already taken.")
     else:
         db.session.commit()
-        body = {"user": UserSchema().dump(new_user)}
+        response_cache.invalidate("users")
+        body = {"user": get_schema(UserSchema).dump(new_user)}
         return jsonify(body), HTTPStatus.CREATED
 
 
-@app.route("/register", methods=["GET", "POST"])
+@bp.route("/register", methods=["GET", "POST"])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for("index"))
-    form = forms.RegistrationForm()
+        return redirect(url_for("main.index"))
+    from roomies_todo_list.forms import RegistrationForm
+
+    form = RegistrationForm()
     if form.validate_on_submit():
         try:
             user = User( #TODO validate
@@ -86,42 +163,54 @@ def register():
             user.set_password(form.password.data)
             db.session.add(user)
             db.session.commit()
+            response_cache.invalidate("users")
             flash("Congratulations, you are now a registered user!")
         except ValidationError as e:
             raise BadRequest(e.messages)
 
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
     return render_template("register.html", title="Register", form=form)
 
 
-@app.route(API + "/users", methods=["GET"])
+@bp.route(API + "/users", methods=["GET"])
+@response_cache.cached("users", "tasks")
+@read_replica
 def get_all_users():
-    all_users = User.query.all()
-    body = {"users": UserSchema().dump(all_users, many=True)}
+    if current_app.config["SERIALIZE_FROM_ROWS"]:
+        users = dump_user_rows(user_rows_query().order_by(User.id).all())
+    else:
+        schema = get_schema(UserSchema, many=True)
+        all_users = User.query.options(*loader_options(User, schema)).order_by(User.id).all()
+        users = schema.dump(all_users)
+    body = {"users": users}
 
     return jsonify(body), HTTPStatus.OK
 
 
-@app.route(API + "/users/<int:user_id>", methods=["GET"])
+@bp.route(API + "/users/<int:user_id>", methods=["GET"])
+@response_cache.cached("user:{user_id}", "tasks")
+@read_replica
 def get_user(user_id):
-    user = User.query.get(user_id)
+    schema = get_schema(UserSchema)
+    user = User.query.options(*loader_options(User, schema)).get(user_id)
 
     if not user:
         raise BadRequest("Resource not found.", status=HTTPStatus.NOT_FOUND)
 
-    body = {"user": UserSchema().dump(user)}
+    body = {"user": schema.dump(user)}
 
     return jsonify(body), HTTPStatus.OK
 
 
-@app.route(API + "/users/<int:user_id>", methods=["PATCH"])
+@bp.route(API + "/users/<int:user_id>", methods=["PATCH"])
 def update_user(user_id):
     user = User.query.get(user_id)
 
     if not user:
         raise BadRequest("Resource not found.", status=HTTPStatus.NOT_FOUND)
+    _check_if_match(user.version, lambda: {"user": get_schema(UserSchema).dump(user)})
     try:
-        data = UserSchema(partial=True).load(request.get_json().get("user"))
+        data = get_schema(UserSchema, partial=True).load(request.get_json().get("user"))
     except ValidationError as e:
         raise BadRequest(e.messages)
 
@@ -131,18 +220,25 @@ def update_user(user_id):
     user.updated_at = datetime.now()
     db.session.add(user)
     db.session.commit()
+    response_cache.invalidate("users", f"user:{user_id}")
+    principals.invalidate(user_id)
 
-    body = {"user": UserSchema().dump(user)}
+    body = {"user": get_schema(UserSchema).dump(user)}
 
-    return jsonify(body), HTTPStatus.OK
+    return _tagged(body), HTTPStatus.OK
 
 
-@app.route(API + "/users/<int:user_id>", methods=["DELETE"])
+@bp.route(API + "/users/<int:user_id>", methods=["DELETE"])
 def delete_user(user_id):
     user = User.query.get(user_id)
     if user:
-        User.query.filter(User.id == user.id).delete()
+        _check_if_match(user.version, lambda: {"user": get_schema(UserSchema).dump(user)})
+        if not User.query.filter(User.id == user.id, User.version == user.version).delete():
+            raise StaleDataError("DELETE statement on table 'users' expected to delete 1 row(s); 0 were matched.")
+        sync.record_changes("users", [user_id], deleted=True)
         db.session.commit()
+        response_cache.invalidate("users", f"user:{user_id}")
+        principals.invalidate(user_id)
     else:
         raise BadRequest("Resource not found.", status=HTTPStatus.NOT_FOUND)
 
@@ -150,11 +246,12 @@ def delete_user(user_id):
 
 
 # TASK ROUTES
-@app.route(API + "/tasks", methods=["POST"])
+@bp.route(API + "/tasks", methods=["POST"])
+@idempotency.idempotent
 def add_task():
     # Check against TaskSchema
     try:
-        data = TaskSchema(partial=("created_by.username", "created_by.email")).load(
+        data = get_schema(TaskSchema, partial=("created_by.username", "created_by.email")).load(
             request.get_json().get("task")
         )
     except ValidationError as e:
@@ -169,104 +266,588 @@ def add_task():
     else:
         raise BadRequest("User not found.", status=HTTPStatus.NOT_FOUND)
 
-    # Add task to database
+    # Add task to database, optionally assigning it by rotation
+    changed = ["tasks"]
     try:
         db.session.add(new_task)
         db.session.flush()
+        record_completions([], [completion_key(new_task)])
+        if "assign" in request.args:
+            assign_task(new_task, parse_int(request.args, "assign"))
+            changed.append("users")
     except IntegrityError:
         db.session.rollback()
         raise BadRequest("Something went wrong.")
     else:
         db.session.commit()
-        body = {"task": TaskSchema().dump(new_task)}
+        response_cache.invalidate(*changed)
+        body = {"task": get_schema(TaskSchema).dump(new_task)}
+        task_events.publish("created", body["task"])
         return jsonify(body), HTTPStatus.CREATED
 
 
-@app.route(API + "/tasks", methods=["GET"])
+@bp.route(API + "/tasks", methods=["GET"])
+@response_cache.cached("tasks", "users")
+@read_replica
 def get_all_tasks():
-    all_tasks = Task.query.all()
-    body = {"tasks": TaskSchema().dump(all_tasks, many=True)}
+    only = parse_fields(request.args, TaskSchema)
+    if current_app.config["SERIALIZE_FROM_ROWS"]:
+        query = filter_tasks(task_rows_query(), request.args)
+        rows, next_cursor = paginate(query, Task, request.args)
+        tasks = dump_task_rows(rows, only)
+    else:
+        schema = get_schema(TaskSchema, only=only, many=True)
+        query = filter_tasks(Task.query.options(*loader_options(Task, schema)), request.args)
+        rows, next_cursor = paginate(query, Task, request.args)
+        tasks = schema.dump(rows)
+    body = {
+        "tasks": tasks,
+        "next_cursor": next_cursor,
+    }
 
     return jsonify(body), HTTPStatus.OK
 
 
-@app.route(API + "/tasks/<int:task_id>", methods=["GET"])
+@bp.route(API + "/tasks/search", methods=["GET"])
+@response_cache.cached("tasks", "users")
+@read_replica
+def search_tasks():
+    """Ranked keyword search over task names and descriptions, with the task list filters."""
+    only = parse_fields(request.args, TaskSchema)
+    rows, next_cursor = search.search_tasks(request.args)
+    body = {
+        "tasks": dump_task_rows(rows, only),
+        "next_cursor": next_cursor,
+    }
+
+    return jsonify(body), HTTPStatus.OK
+
+
+@bp.route(API + "/tasks/<int:task_id>", methods=["GET"])
+@response_cache.cached("task:{task_id}", "users")
+@read_replica
 def get_task(task_id):
-    task = Task.query.get(task_id)
+    schema = get_schema(TaskSchema)
+    task = Task.query.options(*loader_options(Task, schema)).get(task_id)
 
     if not task:
         raise BadRequest("Resource not found.", status=HTTPStatus.NOT_FOUND)
 
-    body = {"task": TaskSchema().dump(task)}
+    body = {"task": schema.dump(task)}
 
     return jsonify(body), HTTPStatus.OK
 
 
-@app.route(API + "/tasks/<int:task_id>", methods=["PATCH"])
+def _is_assignee_conflict(error):
+    """Whether `error` broke the tasks_assignees unique key, as racing assignee updates do."""
+    diag = getattr(error.orig, "diag", None)
+    if diag is not None:
+        return diag.constraint_name == "_task_user_uc"
+    # SQLite names the columns instead
+    return "tasks_assignees.task_id, tasks_assignees.user_id" in str(error.orig)
+
+
+@bp.route(API + "/tasks/<int:task_id>", methods=["PATCH"])
 def update_task(task_id):
     task = Task.query.get(task_id)
 
     if not task:
         raise BadRequest("Resource not found.", status=HTTPStatus.NOT_FOUND)
+    _check_if_match(task.version, lambda: {"task": get_schema(TaskSchema).dump(task)})
     try:
-        print(request.get_json())
-        data = TaskSchema(partial=True).load(request.get_json().get('task'))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Updating task %s", task_id, extra={"task_id": task_id, "body": request.get_json()})
+        data = get_schema(TaskSchema, partial=True).load(request.get_json().get('task'))
     except ValidationError as e:
         raise BadRequest(e.messages)
 
-    existing_assignees = set(task.assignees)
-    print(existing_assignees)
-    new_assignees = set()
-    for assignee in data.get("assignees", []):
-        user = User.query.get(assignee["id"])
-        if user:
-            new_assignees.add(user)
-        else:
-            raise BadRequest("User not found.", status=HTTPStatus.NOT_FOUND)
-
-    to_remove = existing_assignees - new_assignees
-    to_add = new_assignees - existing_assignees
-    print(f"to_remove: {to_remove}")
-    print(f"to_add: {to_add}")
+    was_completed = task.is_completed
+    completed_before = completion_key(task)
+    assignees = data.pop("assignees", None)
+    _resolve_users(data, users_by_id(_referenced_user_ids([data])))
     try:
-        for user in to_add:
-            new_assignee = TaskAssignee(task_id=task.id, user_id=user.id)
-            db.session.add(new_assignee)
+        if assignees is not None:
+            task.set_assignees(assignee["id"] for assignee in assignees)
 
-        for user in to_remove:
-            old_assignee = TaskAssignee.query.filter(
-                TaskAssignee.user_id == user.id, TaskAssignee.task_id == task.id
-            ).first()
-            if old_assignee:
-                db.session.delete(old_assignee)
+        for attr, val in data.items():
+            setattr(task, attr, val)
 
+        task.updated_at = datetime.now()
+        _stamp_completion(task, was_completed, data, task.updated_at)
+        db.session.flush()
+        record_completions([completed_before], [completion_key(task)])
         db.session.commit()
-    except Exception as e:
+        response_cache.invalidate("tasks", f"task:{task_id}")
+    except IntegrityError as e:
         db.session.rollback()
-        raise BadRequest(f"Something went wrong: {e}")
+        if _is_assignee_conflict(e):
+            message = "Assignees were changed by another request, please retry."
+        else:
+            message = "The resource was changed by another request, please retry."
+        raise BadRequest(message, status=HTTPStatus.CONFLICT)
 
-    data.pop("assignees", None)
+    body = {"task": get_schema(TaskSchema).dump(task)}
+    task_events.publish(_change_kind(was_completed, task), body["task"])
+
+    return _tagged(body), HTTPStatus.OK
 
-    for attr, val in data.items():
-        setattr(task, attr, val)
 
+@bp.route(API + "/tasks/<int:task_id>", methods=["DELETE"])
+def delete_task(task_id):
+    task = Task.query.get(task_id)
+    if task:
+        dumped = get_schema(TaskSchema).dump(task)
+        _check_if_match(task.version, lambda: {"task": dumped})
+        if not Task.query.filter(Task.id == task.id, Task.version == task.version).delete():
+            raise StaleDataError("DELETE statement on table 'tasks' expected to delete 1 row(s); 0 were matched.")
+        sync.record_changes("tasks", [task_id], deleted=True)
+        record_completions([completion_key(task)], [])
+        db.session.commit()
+        response_cache.invalidate("tasks", f"task:{task_id}")
+        task_events.publish("deleted", dumped)
+    else:
+        raise BadRequest("Resource not found.", status=HTTPStatus.NOT_FOUND)
+
+    return "", HTTPStatus.NO_CONTENT
+
+
+@bp.route(API + "/tasks/<int:task_id>/assign", methods=["POST"])
+def assign(task_id):
+    """
+    Replace a task's assignees with the least loaded roommates, optionally
+    choosing only from `user_ids`.
+    """
+    task = Task.query.get(task_id)
+    if not task:
+        raise BadRequest("Resource not found.", status=HTTPStatus.NOT_FOUND)
+    count, candidates = parse_assignment(request.get_json(silent=True) or {})
+
+    assign_task(task, count, candidates)
     task.updated_at = datetime.now()
-    db.session.add(task)
     db.session.commit()
+    response_cache.invalidate("tasks", f"task:{task_id}", "users")
+
+    body = {"task": get_schema(TaskSchema).dump(task)}
+    task_events.publish("updated", body["task"])
+    return jsonify(body), HTTPStatus.OK
+
+
+def _change_kind(was_completed, task):
+    return "completed" if task.is_completed and not was_completed else "updated"
+
+
+def _stamp_completion(task, was_completed, data, now):
+    """
+    Date a task that has just been completed and credit it to the signed-in
+    user, unless the request set completed_at or completed_by itself, so
+    that it counts towards the completion stats.
+    """
+    if not task.is_completed or was_completed:
+        return
+    if "completed_at" not in data:
+        task.completed_at = now
+    if "completed_by" not in data and current_user.is_authenticated:
+        task.completed_by = User.query.get(current_user.id)
+
+
+def _format_event(event_id, kind, data):
+    return f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n"
+
+
+@bp.route(API + "/tasks/stream", methods=["GET"])
+def stream_tasks():
+    """
+    Push task changes as Server-Sent Events.
+
+    Reconnecting clients send Last-Event-ID and receive whatever they missed
+    while it is still in the event log, or a `reset` event telling them to
+    refetch the task list. The generator never touches the database.
+    Only the request's household's events are sent.
+    """
+    household_id = current_household_id()
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    cursor = int(last_event_id) if last_event_id.isdigit() else task_events.last_id
+
+    def generate(cursor):
+        yield "retry: 3000\n\n"
+        while True:
+            events = task_events.wait(cursor, STREAM_HEARTBEAT_SECONDS)
+            if events is None:
+                cursor = task_events.last_id
+                yield _format_event(cursor, "reset", "{}")
+            elif not events:
+                yield ": keep-alive\n\n"
+            for event_id, kind, data, scope in events or ():
+                cursor = event_id
+                if scope == household_id:
+                    yield _format_event(event_id, kind, data)
+
+    return Response(
+        generate(cursor),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# BATCH TASK ROUTES
+def _batch_items(key):
+    """Pull the list of batch items out of the request body."""
+    items = (request.get_json() or {}).get(key)
+    if not isinstance(items, list):
+        raise BadRequest(f"'{key}' must be a list.")
+    if len(items) > MAX_BATCH_SIZE:
+        raise BadRequest(f"Batches are limited to {MAX_BATCH_SIZE} items.")
+    return items
+
+
+def _load_batch(items):
+    """Validate `items` with TaskSchema, returning valid data and errors keyed by index."""
+    try:
+        return dict(enumerate(get_schema(TaskSchema, many=True, partial=True).load(items))), {}
+    except ValidationError as e:
+        valid = {i: data for i, data in enumerate(e.valid_data) if i not in e.messages}
+        return valid, e.messages
+
+
+def _referenced_user_ids(batch):
+    ids = set()
+    for data in batch:
+        refs = [data.get("created_by"), data.get("completed_by")] + data.get("assignees", [])
+        ids.update(ref["id"] for ref in refs if ref and "id" in ref)
+    return ids
+
+
+def _resolve_users(data, users):
+    """Replace the nested user references in `data` with User rows."""
+
+    def resolve(ref):
+        user = users.get(ref.get("id"))
+        if user is None:
+            raise BadRequest("User not found.", status=HTTPStatus.NOT_FOUND)
+        return user
+
+    for key in ("created_by", "completed_by"):
+        if data.get(key) is not None:
+            data[key] = resolve(data[key])
+    if "assignees" in data:
+        data["assignees"] = [resolve(ref) for ref in data["assignees"]]
+
+
+def _item_error(error):
+    return {"status": error.status, "error": {"message": error.message}}
+
+
+def _commit_batch(tasks, status, kinds, completed_before=()):
+    """Flush `tasks` in one go, dump them, commit the whole batch and publish the changes."""
+    try:
+        db.session.flush()
+        record_completions(completed_before, [completion_key(task) for task in tasks.values()])
+    except IntegrityError:
+        db.session.rollback()
+        raise BadRequest("Something went wrong.")
+
+    dumped = get_schema(TaskSchema, many=True).dump(tasks.values())
+    db.session.commit()
+    response_cache.invalidate("tasks", *(f"task:{task.id}" for task in tasks.values()))
+    for i, task in zip(tasks, dumped):
+        task_events.publish(kinds[i], task)
+    return {i: {"status": status, "task": task} for i, task in zip(tasks, dumped)}
+
 
-    body = {"task": TaskSchema().dump(task)}
+@bp.route(API + "/tasks:batch", methods=["POST"])
+def add_tasks():
+    items = _batch_items("tasks")
+    valid, errors = _load_batch(items)
+    users = users_by_id(_referenced_user_ids(valid.values()))
 
+    results = {i: _item_error(BadRequest(messages)) for i, messages in errors.items()}
+    new_tasks = {}
+    for i, data in valid.items():
+        try:
+            if not data.get("name"):
+                raise BadRequest({"name": ["Missing data for required field."]})
+            if not data.get("created_by"):
+                raise BadRequest({"created_by": ["Missing data for required field."]})
+            data.setdefault("assignees", [])
+            _resolve_users(data, users)
+        except BadRequest as e:
+            results[i] = _item_error(e)
+        else:
+            new_tasks[i] = Task(**data)
+
+    db.session.add_all(new_tasks.values())
+    results.update(_commit_batch(new_tasks, HTTPStatus.CREATED, dict.fromkeys(new_tasks, "created")))
+
+    body = {"results": [results[i] for i in range(len(items))]}
     return jsonify(body), HTTPStatus.OK
 
 
-@app.route(API + "/tasks/<int:task_id>", methods=["DELETE"])
-def delete_task(task_id):
+@bp.route(API + "/tasks:batch", methods=["PATCH"])
+def update_tasks():
+    items = _batch_items("tasks")
+    task_ids = [item.pop("id", None) if isinstance(item, dict) else None for item in items]
+    valid, errors = _load_batch(items)
+    results = {i: _item_error(BadRequest(messages)) for i, messages in errors.items()}
+    for i in [i for i in valid if not isinstance(task_ids[i], int)]:
+        del valid[i]
+        results[i] = _item_error(BadRequest("Task ids must be integers."))
+
+    users = users_by_id(_referenced_user_ids(valid.values()))
+    tasks = {
+        task.id: task
+        for task in Task.query.options(*loader_options(Task, get_schema(TaskSchema))).filter(
+            Task.id.in_({task_ids[i] for i in valid})
+        )
+    }
+
+    updated_tasks = {}
+    kinds = {}
+    completed_before = []
+    now = datetime.now()
+    for i, data in valid.items():
+        task = tasks.get(task_ids[i])
+        try:
+            if task is None:
+                raise BadRequest("Resource not found.", status=HTTPStatus.NOT_FOUND)
+            _resolve_users(data, users)
+        except BadRequest as e:
+            results[i] = _item_error(e)
+            continue
+
+        was_completed = task.is_completed
+        completed_before.append(completion_key(task))
+        for attr, val in data.items():
+            setattr(task, attr, val)
+        task.updated_at = now
+        _stamp_completion(task, was_completed, data, now)
+        updated_tasks[i] = task
+        kinds[i] = _change_kind(was_completed, task)
+
+    results.update(_commit_batch(updated_tasks, HTTPStatus.OK, kinds, completed_before))
+
+    body = {"results": [results[i] for i in range(len(items))]}
+    return jsonify(body), HTTPStatus.OK
+
+
+@bp.route(API + "/tasks:batch", methods=["DELETE"])
+def delete_tasks():
+    task_ids = _batch_items("ids")
+    valid_ids = {task_id for task_id in task_ids if isinstance(task_id, int)}
+    schema = get_schema(TaskSchema, many=True)
+    dumped = schema.dump(
+        Task.query.options(*loader_options(Task, schema)).filter(Task.id.in_(valid_ids))
+    )
+    existing = {task["id"] for task in dumped}
+    record_completions(
+        [
+            completion_key(row)
+            for row in db.session.query(
+                Task.is_completed, Task.completed_by_id, Task.completed_at
+            ).filter(Task.id.in_(existing))
+        ],
+        [],
+    )
+
+    TaskAssignee.query.filter(TaskAssignee.task_id.in_(existing)).delete(
+        synchronize_session=False
+    )
+    Task.query.filter(Task.id.in_(existing)).delete(synchronize_session=False)
+    sync.record_changes("tasks", existing, deleted=True)
+    db.session.commit()
+    response_cache.invalidate("tasks", *(f"task:{task_id}" for task_id in existing))
+    for task in dumped:
+        task_events.publish("deleted", task)
+
+    results = []
+    for task_id in task_ids:
+        if task_id in existing:
+            result = {"status": HTTPStatus.NO_CONTENT}
+        elif task_id in valid_ids:
+            result = _item_error(BadRequest("Resource not found.", status=HTTPStatus.NOT_FOUND))
+        else:
+            result = _item_error(BadRequest("Task ids must be integers."))
+        results.append(dict(result, id=task_id))
+
+    body = {"results": results}
+    return jsonify(body), HTTPStatus.OK
+
+
+# RECURRENCE ROUTES
+def _get_template(task_id):
     task = Task.query.get(task_id)
-    if task:
-        Task.query.filter(Task.id == task.id).delete()
-        db.session.commit()
-    else:
+    if not task:
         raise BadRequest("Resource not found.", status=HTTPStatus.NOT_FOUND)
+    return task
+
+
+@bp.route(API + "/tasks/<int:task_id>/recurrence", methods=["GET"])
+def get_recurrence(task_id):
+    recurrence = _get_template(task_id).recurrence
+    if not recurrence:
+        raise BadRequest("Resource not found.", status=HTTPStatus.NOT_FOUND)
+
+    body = {"recurrence": get_schema(RecurrenceSchema).dump(recurrence)}
+    return jsonify(body), HTTPStatus.OK
+
+
+@bp.route(API + "/tasks/<int:task_id>/recurrence", methods=["PUT"])
+def set_recurrence(task_id):
+    """Make a task the template of a recurring chore, or change its rule."""
+    task = _get_template(task_id)
+    try:
+        data = get_schema(RecurrenceSchema).load(request.get_json().get("recurrence"))
+    except ValidationError as e:
+        raise BadRequest(e.messages)
+
+    dtstart = naive_utc(data.get("dtstart") or task.due_date or datetime.now().replace(microsecond=0))
+    validate_rule(data["rule"], dtstart)
+    recurrence = task.recurrence or Recurrence(task_id=task.id)
+    recurrence.rule = data["rule"]
+    recurrence.dtstart = dtstart
+    db.session.add(recurrence)
+    db.session.commit()
+
+    body = {"recurrence": get_schema(RecurrenceSchema).dump(recurrence)}
+    return jsonify(body), HTTPStatus.OK
+
+
+@bp.route(API + "/tasks/<int:task_id>/recurrence", methods=["DELETE"])
+def delete_recurrence(task_id):
+    """Stop a chore recurring. Occurrences already materialized are kept."""
+    task = _get_template(task_id)
+    if not task.recurrence:
+        raise BadRequest("Resource not found.", status=HTTPStatus.NOT_FOUND)
+    db.session.delete(task.recurrence)
+    db.session.commit()
 
     return "", HTTPStatus.NO_CONTENT
 
+
+@bp.route(API + "/occurrences", methods=["GET"])
+@read_replica
+def get_occurrences():
+    """Expand every recurring chore over the requested window without writing anything."""
+    start, end = parse_window(request.args)
+    assignee_id = parse_int(request.args, "assignee_id") if "assignee_id" in request.args else None
+
+    body = {"occurrences": list_occurrences(start, end, assignee_id)}
+    return jsonify(body), HTTPStatus.OK
+
+
+@bp.route(API + "/occurrences", methods=["PATCH"])
+def update_occurrences():
+    """
+    Complete or edit occurrences of recurring chores. Occurrences that are
+    still virtual are materialized as tasks in one batch first.
+    """
+    items = _batch_items("occurrences")
+    valid, errors = _load_batch(
+        [item.get("task") or {} if isinstance(item, dict) else {} for item in items]
+    )
+    results = {i: _item_error(BadRequest(messages)) for i, messages in errors.items()}
+
+    keys = {}
+    for i in valid:
+        item = items[i] if isinstance(items[i], dict) else {}
+        try:
+            keys[i] = (int(item["template_id"]), naive_utc(isoparse(item["occurrence_at"])))
+        except (KeyError, TypeError, ValueError):
+            results[i] = _item_error(BadRequest("'template_id' and 'occurrence_at' are required."))
+
+    templates = {
+        task.id: task
+        for task in Task.query.options(
+            joinedload(Task.recurrence), joinedload(Task.created_by), selectinload(Task.assignees)
+        ).filter(Task.id.in_({template_id for template_id, _ in keys.values()}))
+    }
+    pairs = {}
+    for i, (template_id, occurrence_at) in keys.items():
+        template = templates.get(template_id)
+        recurrence = template.recurrence if template else None
+        if not recurrence or not is_occurrence(recurrence.rule, recurrence.dtstart, occurrence_at):
+            results[i] = _item_error(BadRequest("Occurrence not found.", status=HTTPStatus.NOT_FOUND))
+        else:
+            pairs[i] = (template, occurrence_at)
+
+    users = users_by_id(_referenced_user_ids(valid[i] for i in pairs))
+    occurrences = materialize(pairs.values())
+    updated_tasks = {}
+    kinds = {}
+    completed_before = []
+    now = datetime.now()
+    for i, (template, occurrence_at) in pairs.items():
+        task = occurrences[template.id, occurrence_at]
+        data = valid[i]
+        try:
+            _resolve_users(data, users)
+        except BadRequest as e:
+            results[i] = _item_error(e)
+            continue
+
+        was_completed = task.is_completed
+        completed_before.append(completion_key(task))
+        for attr, val in data.items():
+            setattr(task, attr, val)
+        task.updated_at = now
+        _stamp_completion(task, was_completed, data, now)
+        updated_tasks[i] = task
+        kinds[i] = _change_kind(was_completed, task)
+
+    results.update(_commit_batch(updated_tasks, HTTPStatus.OK, kinds, completed_before))
+
+    body = {"results": [results[i] for i in range(len(items))]}
+    return jsonify(body), HTTPStatus.OK
+
+
+# STATS ROUTES
+@bp.route(API + "/stats/open", methods=["GET"])
+@read_replica
+def get_open_stats():
+    """
+    Open and overdue task counts, overall and per assignee. Not cached:
+    "overdue" changes with the clock, not only with writes.
+    """
+    return jsonify(open_task_counts()), HTTPStatus.OK
+
+
+@bp.route(API + "/stats/completions", methods=["GET"])
+@read_replica
+def get_completion_stats():
+    """Completions per user, bucketed by day, week or month."""
+    return jsonify(completion_histogram(request.args)), HTTPStatus.OK
+
+
+# EXPORT AND IMPORT ROUTES
+def _transfer_format(fmt):
+    if fmt not in FORMATS:
+        raise BadRequest(f"'format' must be one of {', '.join(FORMATS)}.")
+    return fmt
+
+
+@bp.route(API + "/export/<any(tasks, users):kind>", methods=["GET"])
+def export_records(kind):
+    """Stream every task or user as NDJSON (default) or CSV."""
+    fmt = _transfer_format(request.args.get("format", "ndjson"))
+    return Response(
+        stream_with_context(export_lines(kind, fmt)),
+        mimetype=FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={kind}.{fmt}"},
+    )
+
+
+@bp.route(API + "/import/<any(tasks, users):kind>", methods=["POST"])
+def import_records(kind):
+    """Load an NDJSON or CSV (Content-Type: text/csv) body produced by the export endpoint."""
+    fmt = "csv" if request.mimetype == FORMATS["csv"] else "ndjson"
+    return jsonify(import_stream(kind, request.stream, fmt)), HTTPStatus.OK
+
+
+# SYNC ROUTES
+@bp.route(API + "/sync", methods=["GET"])
+@read_replica
+def sync_changes():
+    """
+    Tasks and users created, updated or deleted since the `since` token
+    from the previous sync; pages until `has_more` is false.
+    """
+    return jsonify(sync.changes_since(request.args)), HTTPStatus.OK
@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from roomies_todo_list import create_app, db
+from roomies_todo_list.models import Household, Task, TaskAssignee, User
+
+NUM_USERS = 10
+NUM_TASKS = 50
+
+
+def pytest_addoption(parser):
+    parser.addoption("--runslow", action="store_true", help="also run tests marked slow")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: takes a minute or more; only runs with --runslow")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--runslow"):
+        return
+    skip = pytest.mark.skip(reason="slow; run with --runslow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def app():
+    flask_app = create_app("testing")
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def max_queries(app):
+    """Fail the test if the wrapped block issues more than `limit` SQL statements."""
+
+    @contextmanager
+    def counter(limit):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+        assert len(statements) <= limit, "\n\n".join(statements)
+
+    return counter
+
+
+@pytest.fixture
+def seeded(app):
+    db.session.add(Household(name="Default"))
+    users = [User(email=f"user{i}@example.com", username=f"user{i}") for i in range(NUM_USERS)]
+    db.session.add_all(users)
+    db.session.flush()
+
+    tasks = [
+        Task(
+            name=f"task {i}",
+            created_by=users[i % NUM_USERS],
+            completed_by=users[(i + 1) % NUM_USERS] if i % 2 else None,
+            completed_at=datetime(2026, 1, 1) if i % 2 else None,
+            is_completed=bool(i % 2),
+            due_date=datetime(2026, 1, 1) + timedelta(days=i),
+        )
+        for i in range(NUM_TASKS)
+    ]
+    db.session.add_all(tasks)
+    db.session.flush()
+
+    db.session.add_all(
+        TaskAssignee(task_id=task.id, user_id=users[(i + offset) % NUM_USERS].id)
+        for i, task in enumerate(tasks)
+        for offset in range(3)
+    )
+    db.session.commit()
+    db.session.remove()
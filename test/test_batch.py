@@ -0,0 +1,88 @@
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import event
+
+from roomies_todo_list import db
+from roomies_todo_list.models import Task
+
+
+@pytest.fixture
+def commits(app):
+    """Count the transactions committed while the test runs."""
+    committed = []
+
+    def record(conn):
+        committed.append(conn)
+
+    event.listen(db.engine, "commit", record)
+    yield committed
+    event.remove(db.engine, "commit", record)
+
+
+def statuses(response):
+    assert response.status_code == HTTPStatus.OK
+    return [result["status"] for result in response.get_json()["results"]]
+
+
+def test_create_reports_each_item_and_commits_once(client, seeded, commits):
+    count = Task.query.count()
+    response = client.post(
+        "/api/tasks:batch",
+        json={
+            "tasks": [
+                {"name": "Mop", "created_by": {"id": 1}, "assignees": [{"id": 2}]},
+                {"created_by": {"id": 1}},
+                {"name": "Dust", "created_by": {"id": 999}},
+                {"name": "Sweep", "created_by": {"id": 2}},
+            ]
+        },
+    )
+
+    assert statuses(response) == [201, 400, 404, 201]
+    results = response.get_json()["results"]
+    assert results[0]["task"]["assignees"][0]["id"] == 2
+    assert "name" in results[1]["error"]["message"]
+    assert Task.query.count() == count + 2
+    assert len(commits) == 1
+
+
+def test_update_rejects_malformed_ids_per_item(client, seeded, commits):
+    response = client.patch(
+        "/api/tasks:batch",
+        json={
+            "tasks": [
+                {"id": 2, "name": "Renamed"},
+                {"id": [1], "name": "Listed"},
+                {"id": "abc", "name": "Lettered"},
+                {"name": "Anonymous"},
+                {"id": 999, "name": "Missing"},
+                {"id": 4, "name": "Dated", "due_date": "soon"},
+                {"id": 3, "is_completed": False},
+            ]
+        },
+    )
+
+    assert statuses(response) == [200, 400, 400, 400, 404, 400, 200]
+    results = response.get_json()["results"]
+    assert results[1]["error"]["message"] == "Task ids must be integers."
+    assert results[2]["error"]["message"] == "Task ids must be integers."
+    assert Task.query.get(2).name == "Renamed"
+    assert not Task.query.get(3).is_completed
+    assert Task.query.get(4).name == "task 3"
+    assert len(commits) == 1
+
+
+def test_delete_reports_each_id_and_commits_once(client, seeded, commits):
+    count = Task.query.count()
+    response = client.delete("/api/tasks:batch", json={"ids": [1, "abc", 999, 2]})
+
+    assert statuses(response) == [204, 400, 404, 204]
+    assert [result["id"] for result in response.get_json()["results"]] == [1, "abc", 999, 2]
+    assert Task.query.count() == count - 2
+    assert len(commits) == 1
+
+
+def test_batches_must_be_lists(client, seeded):
+    assert client.post("/api/tasks:batch", json={"tasks": {"name": "Mop"}}).status_code == HTTPStatus.BAD_REQUEST
+    assert client.delete("/api/tasks:batch", json={}).status_code == HTTPStatus.BAD_REQUEST
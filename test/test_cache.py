@@ -0,0 +1,77 @@
+import pytest
+
+from roomies_todo_list import db
+from roomies_todo_list.cache import MemoryBackend
+from roomies_todo_list.models import Task, User
+
+
+@pytest.fixture
+def task(app):
+    user = User(email="user@example.com", username="user")
+    task = Task(name="Take out trash", created_by=user)
+    db.session.add_all([user, task])
+    db.session.commit()
+    return task.id
+
+
+def test_matching_etag_returns_not_modified_without_queries(client, task, max_queries):
+    resp = client.get(f"/api/tasks/{task}")
+    etag = resp.headers["ETag"]
+
+    with max_queries(0):
+        cached = client.get(f"/api/tasks/{task}", headers={"If-None-Match": etag})
+
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+
+def test_writes_invalidate_cached_responses(client, task):
+    etag = client.get(f"/api/tasks/{task}").headers["ETag"]
+    list_etag = client.get("/api/tasks").headers["ETag"]
+
+    client.patch(f"/api/tasks/{task}", json={"task": {"name": "Recycling"}})
+
+    resp = client.get(f"/api/tasks/{task}", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.get_json()["task"]["name"] == "Recycling"
+    assert client.get("/api/tasks", headers={"If-None-Match": list_etag}).status_code == 200
+
+
+def test_user_changes_invalidate_tasks_that_embed_them(client, task):
+    etag = client.get(f"/api/tasks/{task}").headers["ETag"]
+
+    client.patch("/api/users/1", json={"user": {"username": "renamed"}})
+
+    resp = client.get(f"/api/tasks/{task}", headers={"If-None-Match": etag})
+    assert resp.get_json()["task"]["created_by"]["username"] == "renamed"
+
+
+@pytest.fixture
+def lagging_replica(app, tmp_path):
+    """A replica bind that never receives the primary's writes."""
+    app.config["SQLALCHEMY_BINDS"] = {"replica": f"sqlite:///{tmp_path / 'replica.db'}"}
+    db.Model.metadata.create_all(db.get_engine(app, bind="replica"))
+
+
+def test_cache_is_filled_from_the_primary(client, task, lagging_replica):
+    # Uncached read-only views do read the replica
+    assert client.get("/api/stats/open").get_json()["open"] == 0
+
+    assert [t["id"] for t in client.get("/api/tasks").get_json()["tasks"]] == [task]
+    client.patch(f"/api/tasks/{task}", json={"task": {"name": "Recycling"}})
+    resp = client.get(f"/api/tasks/{task}")
+    assert resp.get_json()["task"]["name"] == "Recycling"
+    assert client.get("/api/tasks").get_json()["tasks"][0]["name"] == "Recycling"
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2, max_bytes=10)
+    backend.set("a", b"1")
+    backend.set("b", b"2")
+    backend.get("a")
+    backend.set("c", b"3")
+    backend.set("big", b"x" * 11)
+
+    assert backend.get("a") == b"1"
+    assert backend.get("b") is None
+    assert backend.get("big") is None
@@ -0,0 +1,62 @@
+from sqlalchemy import event
+
+from roomies_todo_list import db
+from roomies_todo_list.models import Task, TaskAssignee, User
+
+
+def test_if_match_accepts_the_etag_or_the_version(client, seeded):
+    response = client.get("/api/tasks/1")
+    etag, version = response.headers["ETag"], response.get_json()["task"]["version"]
+
+    updated = client.patch("/api/tasks/1", json={"task": {"name": "Recycling"}}, headers={"If-Match": etag})
+    assert updated.status_code == 200
+    assert updated.get_json()["task"]["version"] == version + 1
+    assert updated.headers["ETag"] == client.get("/api/tasks/1").headers["ETag"]
+
+    stale = client.patch("/api/tasks/1", json={"task": {"name": "Trash"}}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+    assert stale.get_json()["error"]["version"] == version + 1
+
+    assert client.delete("/api/tasks/1", headers={"If-Match": f'"{version}"'}).status_code == 412
+    assert client.delete("/api/tasks/1", headers={"If-Match": f'"{version + 1}"'}).status_code == 204
+
+
+def test_concurrent_write_is_refused_instead_of_lost(client, seeded):
+    # Another roommate completes the task between this request's read and
+    # write, so its UPDATE no longer matches the version it read
+    def complete_concurrently(mapper, connection, target):
+        connection.execute(
+            Task.__table__.update()
+            .where(Task.id == target.id)
+            .values(is_completed=True, completed_by_id=2, version=Task.version + 1)
+        )
+
+    event.listen(Task, "before_update", complete_concurrently)
+    try:
+        conditional = client.patch(
+            "/api/tasks/1", json={"task": {"is_completed": True}}, headers={"If-Match": '"1"'}
+        )
+        blind = client.patch("/api/tasks/3", json={"task": {"is_completed": True}})
+    finally:
+        event.remove(Task, "before_update", complete_concurrently)
+
+    assert conditional.status_code == 412
+    assert blind.status_code == 409
+
+
+def test_only_assignee_races_are_reported_as_such(client, seeded, monkeypatch):
+    def duplicate_assignee(task, user_ids):
+        db.session.execute(TaskAssignee.__table__.insert(), [{"household_id": 1, "task_id": 1, "user_id": 1}] * 2)
+
+    def duplicate_email(task, user_ids):
+        db.session.execute(User.__table__.insert(), [{"email": "user1@example.com", "username": "again"}])
+
+    monkeypatch.setattr(Task, "set_assignees", duplicate_assignee)
+    response = client.patch("/api/tasks/1", json={"task": {"assignees": [{"id": 1}]}})
+    assert response.status_code == 409
+    assert response.get_json()["error"]["message"].startswith("Assignees were changed")
+
+    monkeypatch.setattr(Task, "set_assignees", duplicate_email)
+    response = client.patch("/api/tasks/1", json={"task": {"assignees": [{"id": 1}]}})
+    assert response.status_code == 409
+    assert response.get_json()["error"]["message"] == "The resource was changed by another request, please retry."
@@ -0,0 +1,66 @@
+import gzip
+import json
+from datetime import date, datetime
+
+import pytest
+
+from roomies_todo_list.encoding import JSONEncoder, OrjsonEncoder
+
+GZIP = {"Accept-Encoding": "gzip, deflate"}
+
+
+def test_large_bodies_are_gzipped_for_clients_that_accept_it(client, seeded):
+    plain = client.get("/api/tasks?limit=50")
+    assert "Content-Encoding" not in plain.headers
+
+    response = client.get("/api/tasks?limit=50", headers=GZIP)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(response.data) < len(plain.data)
+    assert gzip.decompress(response.data) == plain.data
+    # Each encoding is its own representation, with its own strong ETag
+    assert response.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+    not_modified = client.get("/api/tasks?limit=50", headers={**GZIP, "If-None-Match": response.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == response.headers["ETag"]
+    assert client.get("/api/tasks?limit=50", headers={"If-None-Match": response.headers["ETag"]}).status_code == 200
+
+    assert "Content-Encoding" not in client.get("/api/tasks/1", headers=GZIP).headers
+    assert "Content-Encoding" not in client.get("/api/tasks?limit=50", headers={"Accept-Encoding": "gzip;q=0"}).headers
+
+
+def test_writes_accept_the_etag_of_any_encoding(client, seeded):
+    gzipped = {"If-Match": client.get("/api/tasks/1").headers["ETag"][:-1] + '-gzip"'}
+    assert client.patch("/api/tasks/1", json={"task": {"name": "Mop"}}, headers=gzipped).status_code == 200
+    assert client.patch("/api/tasks/1", json={"task": {"name": "Dust"}}, headers=gzipped).status_code == 412
+
+
+def test_streamed_exports_are_compressed_as_they_go(client, seeded):
+    plain = client.get("/api/export/tasks").data
+    response = client.get("/api/export/tasks", headers=GZIP)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data) == plain
+
+
+def test_brotli_is_preferred_when_installed(client, seeded):
+    brotli = pytest.importorskip("brotli")
+    response = client.get("/api/tasks?limit=50", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.data) == client.get("/api/tasks?limit=50").data
+
+
+def test_encoders_write_dates_in_iso_format():
+    value = {"due": datetime(2026, 1, 2, 3, 4, 5, 6), "day": date(2026, 1, 2), "name": "Mop ü"}
+    encoded = json.dumps(value, cls=JSONEncoder, sort_keys=True)
+    assert json.loads(encoded) == {"day": "2026-01-02", "due": "2026-01-02T03:04:05.000006", "name": "Mop ü"}
+
+
+def test_orjson_encoder_matches_the_stdlib(client, seeded):
+    pytest.importorskip("orjson")
+    for url in ("/api/tasks?limit=50", "/api/users", "/api/stats/completions"):
+        body = client.get(url).get_json()
+        assert json.loads(json.dumps(body, cls=OrjsonEncoder, sort_keys=True)) == body
+    value = {"due": datetime(2026, 1, 2, 3, 4, 5, 6), "day": date(2026, 1, 2)}
+    assert json.dumps(value, cls=OrjsonEncoder, sort_keys=True) == json.dumps(
+        value, cls=JSONEncoder, sort_keys=True, separators=(",", ":")
+    )
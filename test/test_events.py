@@ -0,0 +1,38 @@
+from roomies_todo_list import task_events
+from roomies_todo_list.events import EventLog
+
+
+def test_since_returns_missed_events():
+    log = EventLog(maxlen=10)
+    start = log.last_id
+    log.publish("created", {"id": 1})
+    log.publish("updated", {"id": 1})
+
+    assert [kind for _, kind, _, _ in log.since(start)] == ["created", "updated"]
+    assert log.since(log.last_id) == []
+
+
+def test_since_requests_reset_when_events_were_dropped():
+    log = EventLog(maxlen=2)
+    start = log.last_id
+    for i in range(3):
+        log.publish("created", {"id": i})
+
+    assert log.since(start) is None
+    assert log.since(log.last_id + 100) is None
+
+
+def test_stream_resumes_from_last_event_id(client, seeded):
+    last_id = task_events.last_id
+    client.patch("/api/tasks/1", json={"task": {"is_completed": True}})
+    client.delete("/api/tasks/2")
+
+    resp = client.get("/api/tasks/stream", headers={"Last-Event-ID": str(last_id)})
+    chunks = iter(resp.response)
+    assert next(chunks).startswith(b"retry:")
+    completed, deleted = next(chunks).decode(), next(chunks).decode()
+    resp.close()
+
+    assert resp.mimetype == "text/event-stream"
+    assert "event: completed" in completed and '"id": 1' in completed
+    assert "event: deleted" in deleted and '"id": 2' in deleted
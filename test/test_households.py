@@ -0,0 +1,79 @@
+import pytest
+from conftest import NUM_TASKS
+
+from roomies_todo_list import db
+from roomies_todo_list.models import Household, User
+
+SERVICE = {"Authorization": "Bearer service-token"}
+OTHER = {"X-Household-Id": "2", **SERVICE}
+
+
+@pytest.fixture
+def other_household(app, seeded):
+    app.config["HOUSEHOLD_SERVICE_TOKEN"] = "service-token"
+    db.session.add(Household(name="Next door"))
+    db.session.commit()
+    db.session.remove()
+
+
+def add_user(client, username, headers=None):
+    user = {"email": f"{username}@example.com", "username": username}
+    return client.post("/api/users", json={"user": user}, headers=headers).get_json()["user"]["id"]
+
+
+def test_households_only_see_their_own_rows(client, other_household):
+    default_etag = client.get("/api/tasks").headers["ETag"]
+
+    neighbour = add_user(client, "neighbour", OTHER)
+    created = client.post("/api/tasks", json={"task": {"name": "Mow", "created_by": {"id": neighbour}}}, headers=OTHER)
+    task_id = created.get_json()["task"]["id"]
+
+    assert [task["name"] for task in client.get("/api/tasks", headers=OTHER).get_json()["tasks"]] == ["Mow"]
+    assert [user["username"] for user in client.get("/api/users", headers=OTHER).get_json()["users"]] == [
+        "neighbour"
+    ]
+    assert client.get(f"/api/tasks/{task_id}", headers=OTHER).get_json()["task"]["created_by"]["id"] == neighbour
+    assert client.get("/api/tasks/1", headers=OTHER).status_code == 404
+    assert client.delete("/api/tasks:batch", json={"ids": [1]}, headers=OTHER).get_json()["results"][0][
+        "status"
+    ] == 404
+    assert client.get("/api/tasks/search", query_string={"q": "task"}, headers=OTHER).get_json()["tasks"] == []
+    assert [task["id"] for task in client.get("/api/sync", headers=OTHER).get_json()["tasks"]] == [task_id]
+
+    # The other household's writes leave this one's cached list alone
+    default = client.get("/api/tasks", query_string={"limit": 500})
+    assert client.get("/api/tasks").headers["ETag"] == default_etag
+    assert len(default.get_json()["tasks"]) == NUM_TASKS
+    assert client.get(f"/api/tasks/{task_id}").status_code == 404
+    # Nor can a task be created for, or assigned to, a user of another household
+    refused = client.post("/api/tasks", json={"task": {"name": "Mow", "created_by": {"id": neighbour}}})
+    assert refused.status_code == 404
+    assigned = client.patch("/api/tasks/1", json={"task": {"assignees": [{"id": neighbour}]}})
+    assert assigned.status_code == 404
+
+
+def test_unknown_household_is_refused(client, other_household):
+    assert client.get("/api/tasks", headers={"X-Household-Id": "3", **SERVICE}).status_code == 404
+    assert client.get("/api/tasks", headers={"X-Household-Id": "next door", **SERVICE}).status_code == 400
+
+
+def test_only_the_service_may_pick_a_household(client, other_household):
+    assert client.get("/api/tasks", headers={"X-Household-Id": "2"}).status_code == 403
+    wrong = {"X-Household-Id": "2", "Authorization": "Bearer guess"}
+    assert client.get("/api/tasks", headers=wrong).status_code == 403
+    assert client.get("/api/tasks", headers={"X-Household-Id": "2", "Authorization": "Bearer güess"}).status_code == 403
+    assert client.get("/api/tasks", headers=OTHER).status_code == 200
+
+
+def test_signing_in_picks_the_users_household(client, other_household):
+    user = User(email="neighbour@example.com", username="neighbour", household_id=2)
+    user.set_password("hunter2")
+    db.session.add(user)
+    db.session.commit()
+
+    client.post("/login", data={"username": "neighbour", "password": "hunter2"})
+    assert [user["username"] for user in client.get("/api/users").get_json()["users"]] == ["neighbour"]
+    assert client.get("/api/users", headers={"X-Household-Id": "2"}).status_code == 200
+    # Signed-in users cannot switch households, even with the service token
+    assert client.get("/api/users", headers={"X-Household-Id": "1"}).status_code == 403
+    assert client.get("/api/users", headers={"X-Household-Id": "1", **SERVICE}).status_code == 403
@@ -0,0 +1,86 @@
+import threading
+import time
+from http import HTTPStatus
+
+from roomies_todo_list import idempotency
+from roomies_todo_list.models import Task
+
+NEW_TASK = {"task": {"name": "Descale kettle", "created_by": {"id": 1}}}
+
+
+def post_task(client, key, body=NEW_TASK):
+    return client.post("/api/tasks", json=body, headers={"Idempotency-Key": key})
+
+
+def test_retried_task_is_created_once(client, seeded, max_queries):
+    first = post_task(client, "retry-1")
+    assert first.status_code == HTTPStatus.CREATED
+    assert "Idempotent-Replayed" not in first.headers
+    count = Task.query.count()
+
+    with max_queries(0):
+        retry = post_task(client, "retry-1")
+    assert retry.status_code == HTTPStatus.CREATED
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json() == first.get_json()
+    assert Task.query.count() == count
+
+    assert post_task(client, "retry-2").get_json()["task"]["id"] != first.get_json()["task"]["id"]
+    assert Task.query.count() == count + 1
+
+
+def test_key_reused_for_a_different_request_is_refused(client, seeded):
+    post_task(client, "retry-1")
+    other = post_task(client, "retry-1", {"task": {"name": "Defrost freezer", "created_by": {"id": 1}}})
+    assert other.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert post_task(client, "x" * 256).status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_errors_are_not_replayed(client, seeded):
+    missing_user = {"task": {"name": "Descale kettle", "created_by": {"id": 999}}}
+    assert post_task(client, "retry-1", missing_user).status_code == HTTPStatus.NOT_FOUND
+    assert post_task(client, "retry-1", missing_user).status_code == HTTPStatus.NOT_FOUND
+    assert "Idempotent-Replayed" not in post_task(client, "retry-1", missing_user).headers
+
+
+def test_retried_signup_replays_instead_of_conflicting(client, seeded):
+    body = {"user": {"email": "new@example.com", "username": "new"}}
+    headers = {"Idempotency-Key": "signup"}
+    first = client.post("/api/users", json=body, headers=headers)
+    assert first.status_code == HTTPStatus.CREATED
+    retry = client.post("/api/users", json=body, headers=headers)
+    assert retry.status_code == HTTPStatus.CREATED
+    assert retry.get_json() == first.get_json()
+    assert client.post("/api/users", json=body).status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_concurrent_retries_wait_for_the_first(app):
+    started, proceed = threading.Event(), threading.Event()
+    calls = []
+
+    @idempotency.idempotent
+    def view():
+        calls.append(1)
+        started.set()
+        proceed.wait(5)
+        return {"created": len(calls)}, HTTPStatus.CREATED
+
+    responses = []
+
+    def send():
+        with app.test_request_context("/slow", method="POST", data=b"{}", headers={"Idempotency-Key": "k"}):
+            responses.append(view())
+
+    first = threading.Thread(target=send)
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=send)
+    second.start()
+    time.sleep(0.1)
+    proceed.set()
+    first.join(5)
+    second.join(5)
+
+    assert len(calls) == 1
+    assert [response.get_json() for response in responses] == [{"created": 1}] * 2
+    assert sorted(response.headers.get("Idempotent-Replayed", "") for response in responses) == ["", "true"]
@@ -0,0 +1,46 @@
+import logging
+import os
+
+from roomies_todo_list.instrumentation import JSONFormatter
+
+
+def test_metrics_count_requests_and_statements(client, seeded):
+    client.get("/api/tasks/1")
+    client.get("/api/tasks/1")
+    client.get("/api/tasks/999")
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'http_requests_total{endpoint="main.get_task",method="GET",status="200"} 2' in body
+    assert 'http_requests_total{endpoint="main.get_task",method="GET",status="404"} 1' in body
+    assert 'http_request_duration_seconds_count{endpoint="main.get_task",method="GET"} 3' in body
+    # The second request is answered from the response cache
+    assert 'http_request_db_statements_bucket{endpoint="main.get_task",method="GET",le="0"} 1' in body
+    assert 'http_request_phase_seconds_count{endpoint="main.get_task",method="GET",phase="serialize"}' in body
+
+
+def test_server_timing_header(app, client, seeded):
+    assert "Server-Timing" not in client.get("/api/users/1").headers
+
+    app.config["METRICS_SERVER_TIMING"] = True
+    timing = client.get("/api/tasks?limit=5").headers["Server-Timing"]
+    names = [entry.split(";")[0] for entry in timing.split(", ")]
+    assert names[0] == "db" and "serialize" in names and names[-1] == "total"
+    assert "statements" in timing
+
+
+def test_profiler_samples_only_the_chosen_endpoint(app, client, seeded, tmp_path):
+    app.config.update(PROFILE_ENDPOINT="main.get_all_tasks", PROFILE_SAMPLE_RATE=1, PROFILE_DIR=str(tmp_path))
+    client.get("/api/users")
+    client.get("/api/tasks")
+
+    assert [name.split("-")[0] for name in os.listdir(tmp_path)] == ["main.get_all_tasks"]
+
+
+def test_update_task_logs_instead_of_printing(client, seeded, capsys, caplog):
+    with caplog.at_level(logging.DEBUG, logger="roomies_todo_list.views"):
+        client.patch("/api/tasks/1", json={"task": {"name": "Recycling"}})
+
+    assert capsys.readouterr().out == ""
+    record = next(record for record in caplog.records if record.name == "roomies_todo_list.views")
+    assert record.task_id == 1 and record.body == {"task": {"name": "Recycling"}}
+    assert '"task_id": 1' in JSONFormatter().format(record)
@@ -0,0 +1,87 @@
+import threading
+import time
+
+from roomies_todo_list import db, password_hasher, passwords
+from roomies_todo_list.models import User
+
+
+def login(client, password):
+    return client.post("/login", data={"username": "alice", "password": password})
+
+
+def test_login_upgrades_hash_when_cost_changes(app, client):
+    user = User(email="alice@example.com", username="alice")
+    password_hasher.method = "pbkdf2:sha256:500"
+    user.set_password("hunter2")
+    db.session.add(user)
+    db.session.commit()
+    password_hasher.init_app(app)
+
+    login(client, "wrong")
+    assert User.query.get(user.id).password_hash.startswith("pbkdf2:sha256:500$")
+
+    login(client, "hunter2")
+    upgraded = User.query.get(user.id).password_hash
+    assert upgraded.startswith(password_hasher.method + "$")
+    assert User.query.get(user.id).check_password("hunter2")
+
+
+def test_saturated_pool_sheds_with_retry_after(app, client):
+    user = User(email="alice@example.com", username="alice")
+    user.set_password("hunter2")
+    db.session.add(user)
+    db.session.commit()
+
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=1)
+    password_hasher.init_app(app)
+    password_hasher._pending.acquire()
+    try:
+        response = login(client, "hunter2")
+    finally:
+        password_hasher._pending.release()
+        app.config.update(PASSWORD_HASH_WORKERS=0)
+        password_hasher.init_app(app)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_sha512_hashes_fit_the_column(app):
+    app.config.update(PASSWORD_HASH_ALGORITHM="sha512")
+    password_hasher.init_app(app)
+    try:
+        pwhash = password_hasher.hash("hunter2")
+    finally:
+        app.config.update(PASSWORD_HASH_ALGORITHM="sha256")
+        password_hasher.init_app(app)
+
+    assert pwhash.startswith("pbkdf2:sha512:")
+    assert len(pwhash) <= User.__table__.c.password_hash.type.length
+
+
+def test_concurrent_first_hashes_share_one_pool(app, monkeypatch):
+    created = []
+    real = passwords.ProcessPoolExecutor
+
+    def slow_pool(max_workers):
+        created.append(max_workers)
+        time.sleep(0.05)
+        return real(max_workers=max_workers)
+
+    monkeypatch.setattr(passwords, "ProcessPoolExecutor", slow_pool)
+    app.config.update(PASSWORD_HASH_WORKERS=1)
+    password_hasher.init_app(app)
+    try:
+        pools = []
+        threads = [threading.Thread(target=lambda: pools.append(password_hasher._pool())) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+    finally:
+        app.config.update(PASSWORD_HASH_WORKERS=0)
+        password_hasher.init_app(app)
+
+    assert created == [1]
+    assert len(pools) == 4 and all(pool is pools[0] for pool in pools)
+    assert password_hasher._executor is None
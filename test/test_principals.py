@@ -0,0 +1,45 @@
+from roomies_todo_list import db, principals
+from roomies_todo_list.models import User
+from roomies_todo_list.principals import Principal
+
+
+def sign_in(app, client):
+    user = User(email="alice@example.com", username="alice")
+    user.set_password("hunter2")
+    db.session.add(user)
+    db.session.commit()
+    client.post("/login", data={"username": "alice", "password": "hunter2"})
+    return user.id
+
+
+def test_authenticated_request_skips_database_when_cached(app, client, max_queries):
+    sign_in(app, client)
+    assert client.get("/").status_code == 200
+
+    with max_queries(0):
+        assert client.get("/").status_code == 200
+
+
+def test_principal_loads_orm_user_on_demand(app, client):
+    user_id = sign_in(app, client)
+    client.get("/")
+
+    principal = principals.get(user_id, lambda _: None)
+    assert isinstance(principal, Principal)
+    assert principal.get_id() == str(user_id)
+    assert principal.load() is User.query.get(user_id)
+
+
+def test_update_and_delete_invalidate_principal(app, client):
+    user_id = sign_in(app, client)
+    client.get("/")
+
+    client.patch(f"/api/users/{user_id}", json={"user": {"first_name": "Alice"}})
+    assert principals.get(user_id, lambda _: None) is None
+
+    client.get("/")
+    assert principals.get(user_id, lambda _: None).first_name == "Alice"
+
+    client.delete(f"/api/users/{user_id}")
+    assert principals.get(user_id, lambda _: None) is None
+    assert client.get("/").status_code == 302
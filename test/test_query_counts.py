@@ -0,0 +1,38 @@
+import pytest
+
+from conftest import NUM_TASKS, NUM_USERS
+
+
+@pytest.mark.parametrize(
+    "url, limit",
+    [
+        ("/api/tasks", 2),
+        ("/api/tasks?fields=id,name", 1),
+        ("/api/tasks/1", 2),
+        ("/api/users", 2),
+        ("/api/users/1", 2),
+    ],
+)
+def test_read_endpoints_issue_bounded_queries(client, seeded, max_queries, url, limit):
+    with max_queries(limit):
+        resp = client.get(url)
+    assert resp.status_code == 200
+
+
+def test_task_list_is_fully_serialized(client, seeded):
+    tasks = client.get("/api/tasks").get_json()["tasks"]
+
+    assert len(tasks) == NUM_TASKS
+    assert all(len(task["assignees"]) == 3 for task in tasks)
+    assert all(task["created_by"] for task in tasks)
+    assert sum(task["completed_by"] is not None for task in tasks) == NUM_TASKS // 2
+
+
+def test_reassigning_task_is_set_based(client, seeded, max_queries):
+    assignees = [{"id": user_id} for user_id in range(1, NUM_USERS + 1)]
+
+    with max_queries(10):
+        resp = client.patch("/api/tasks/1", json={"task": {"assignees": assignees}})
+
+    assert resp.status_code == 200
+    assert len(resp.get_json()["task"]["assignees"]) == NUM_USERS
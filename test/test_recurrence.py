@@ -0,0 +1,124 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from dateutil.rrule import rrulestr
+
+from roomies_todo_list import db
+from roomies_todo_list.models import Task, User
+from roomies_todo_list.recurrence import _Fallback, compile_rule
+from roomies_todo_list.rotation import scheduler
+
+SIMPLE_RULES = [
+    "FREQ=DAILY",
+    "FREQ=DAILY;INTERVAL=3",
+    "FREQ=DAILY;COUNT=10",
+    "FREQ=DAILY;UNTIL=20260301T090000",
+    "FREQ=WEEKLY;INTERVAL=2",
+    "FREQ=WEEKLY;COUNT=5;INTERVAL=2",
+    "FREQ=WEEKLY;BYDAY=TU",
+    "FREQ=WEEKLY;BYDAY=MO,TH;INTERVAL=2",
+    "FREQ=WEEKLY;BYDAY=SA,SU;INTERVAL=3;WKST=SU",
+    "RRULE:FREQ=WEEKLY;BYDAY=FR;UNTIL=20260315",
+]
+
+
+@pytest.mark.parametrize("rule", SIMPLE_RULES)
+def test_fast_expansion_matches_dateutil(rule):
+    rng = random.Random(rule)
+    for _ in range(100):
+        dtstart = datetime(2026, 1, 1) + timedelta(minutes=rng.randrange(60 * 24 * 60))
+        start = datetime(2025, 12, 1) + timedelta(minutes=rng.randrange(60 * 24 * 120))
+        end = start + timedelta(minutes=rng.randrange(1, 60 * 24 * 60))
+
+        expander = compile_rule(rule, dtstart)
+        expected = rrulestr(rule, dtstart=dtstart).between(start, end, inc=True)
+        assert not isinstance(expander, _Fallback)
+        assert expander.between(start, end) == [occurrence for occurrence in expected if occurrence < end]
+
+
+def test_occurrences_are_virtual_until_completed(client, seeded):
+    template = Task.query.first()
+    response = client.put(
+        f"/api/tasks/{template.id}/recurrence",
+        json={"recurrence": {"rule": "FREQ=DAILY", "dtstart": "2026-01-01T09:00:00"}},
+    )
+    assert response.status_code == 200
+    tasks_before = Task.query.count()
+
+    window = {"start": "2026-01-01T00:00:00", "end": "2027-01-01T00:00:00"}
+    occurrences = client.get("/api/occurrences", query_string=window).get_json()["occurrences"]
+    assert len(occurrences) == 365
+    assert Task.query.count() == tasks_before
+
+    tuesday = {"template_id": template.id, "occurrence_at": "2026-01-06T09:00:00"}
+    for _ in range(2):
+        response = client.patch(
+            "/api/occurrences",
+            json={"occurrences": [dict(tuesday, task={"is_completed": True})]},
+        )
+        assert response.get_json()["results"][0]["status"] == 200
+    assert Task.query.count() == tasks_before + 1
+
+    occurrence = client.get("/api/occurrences", query_string=window).get_json()["occurrences"][5]
+    assert occurrence["occurrence_at"] == tuesday["occurrence_at"]
+    assert occurrence["is_completed"] is True
+    assert occurrence["task_id"] is not None
+
+    response = client.patch(
+        "/api/occurrences",
+        json={"occurrences": [{"template_id": template.id, "occurrence_at": "2026-01-06T10:00:00"}]},
+    )
+    assert response.get_json()["results"][0]["status"] == 404
+
+
+def test_invalid_rule_is_rejected(client, seeded):
+    response = client.put("/api/tasks/1/recurrence", json={"recurrence": {"rule": "FREQ=SOMETIMES"}})
+    assert response.status_code == 400
+
+
+def test_aware_times_are_read_as_utc(client, seeded):
+    template = Task.query.first()
+    client.put(
+        f"/api/tasks/{template.id}/recurrence",
+        json={"recurrence": {"rule": "FREQ=DAILY", "dtstart": "2026-01-01T11:00:00+02:00"}},
+    )
+    assert client.get(f"/api/tasks/{template.id}/recurrence").get_json()["recurrence"]["dtstart"].startswith(
+        "2026-01-01T09:00:00"
+    )
+
+    window = {"start": "2026-01-01T00:00:00Z", "end": "2026-01-05T02:00:00+02:00"}
+    response = client.get("/api/occurrences", query_string=window)
+    assert response.status_code == 200
+    assert [o["occurrence_at"] for o in response.get_json()["occurrences"]] == [
+        f"2026-01-0{day}T09:00:00" for day in range(1, 5)
+    ]
+
+    response = client.patch(
+        "/api/occurrences",
+        json={"occurrences": [{"template_id": template.id, "occurrence_at": "2026-01-02T09:00:00Z"}]},
+    )
+    assert response.get_json()["results"][0]["status"] == 200
+
+
+def test_occurrences_rotate_between_roommates(client, app):
+    scheduler.reset()
+    users = [User(email=f"{name}@example.com", username=name) for name in ("ann", "bob", "cat")]
+    template = Task(name="Take out bins", created_by=users[0], assignees=[users[0]])
+    db.session.add_all(users + [template])
+    db.session.commit()
+    client.put(
+        f"/api/tasks/{template.id}/recurrence",
+        json={"recurrence": {"rule": "FREQ=DAILY", "dtstart": "2026-01-01T19:00:00"}},
+    )
+
+    assignees = []
+    for day in range(1, 7):
+        occurrence = {"template_id": template.id, "occurrence_at": f"2026-01-0{day}T19:00:00", "task": {}}
+        result = client.patch("/api/occurrences", json={"occurrences": [occurrence]}).get_json()["results"][0]
+        assert result["status"] == 200
+        assignees.append([user["id"] for user in result["task"]["assignees"]])
+
+    assert all(len(ids) == 1 for ids in assignees)
+    assert all(previous != current for previous, current in zip(assignees, assignees[1:]))
+    assert sorted(ids[0] for ids in assignees) == sorted([user.id for user in users] * 2)
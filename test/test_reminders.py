@@ -0,0 +1,86 @@
+import random
+from datetime import datetime
+
+import pytest
+from conftest import NUM_TASKS
+
+from roomies_todo_list import db
+from roomies_todo_list.reminders import ReminderSink, TimingWheel, scheduler
+
+
+class ListSink(ReminderSink):
+    def __init__(self):
+        self.batches = []
+
+    def send(self, reminders):
+        self.batches.append(reminders)
+
+    def sent(self):
+        return [reminder["id"] for batch in self.batches for reminder in batch]
+
+
+def test_timing_wheel_fires_every_key_on_time_across_levels():
+    wheel = TimingWheel(now=1000.0, resolution=0.1, slots=4, levels=4)
+    rng = random.Random(0)
+    deadlines = {key: 1000.0 + rng.uniform(-1, wheel.span) for key in range(500)}
+    for key, when in deadlines.items():
+        wheel.add(key, when)
+    for key in range(0, 500, 7):
+        wheel.remove(key)
+        del deadlines[key]
+    wheel.add(1, 1000.05)
+    deadlines[1] = 1000.05
+
+    # Advance by uneven strides, so empty turns are skipped over
+    fired, tick = {}, 0
+    while tick < wheel.span / 0.1 + 10:
+        previous, tick = tick, tick + rng.choice([1, 1, 3, 17, 90])
+        for key in wheel.advance(1000.0 + tick * 0.1):
+            fired[key] = previous, tick
+    assert fired.keys() == deadlines.keys()
+    # Never early, and otherwise within the stride it came due in
+    for key, (previous, current) in fired.items():
+        assert 1000.0 + (previous - 1) * 0.1 < max(deadlines[key], 1000.0) <= 1000.0 + current * 0.1 + 1e-6
+    assert len(wheel) == 0
+
+    with pytest.raises(ValueError):
+        wheel.add(0, 1000.0 + tick * 0.1 + wheel.span + 1)
+
+
+@pytest.fixture
+def reminders(app, seeded):
+    scheduler.sink = ListSink()
+    yield scheduler
+    db.session.remove()
+    scheduler.init_app(app)
+
+
+def test_reminders_follow_task_writes(client, reminders):
+    now = datetime(2026, 1, 10).timestamp()
+    reminders.start(now)
+    # Seeded tasks are due a day apart from Jan 1st and every other one is open
+    assert sorted(reminders.wheel) == [11]
+    assert reminders.step(now + 86400 - 901) == 0
+    assert reminders.step(now + 86400 - 899) == 1
+    assert reminders.sink.batches[0][0]["assignee_ids"] == [1, 2, 3]
+
+    client.patch("/api/tasks/13", json={"task": {"due_date": "2026-01-11T06:00:00"}})
+    for name, due_date in (("Bins", "2026-01-11T12:00:00"), ("Plants", "2026-01-11T09:00:00")):
+        client.post("/api/tasks", json={"task": {"name": name, "created_by": {"id": 1}, "due_date": due_date}})
+    client.patch(f"/api/tasks/{NUM_TASKS + 2}", json={"task": {"is_completed": True}})
+    assert reminders.step(now + 86400) == 0
+    assert sorted(reminders.wheel) == [13, NUM_TASKS + 1]
+    reminders.step(now + 2 * 86400)
+    assert reminders.sink.sent() == [11, 13, NUM_TASKS + 1]
+
+
+def test_reminders_stay_within_max_pending(reminders):
+    reminders.max_pending = 2
+    reminders.window_seconds = 10 * 86400
+    reminders.start(datetime(2026, 1, 1).timestamp())
+    assert len(reminders.wheel) == 2
+
+    sent = [reminders.step(datetime(2026, 1, day).timestamp()) for day in range(2, 12)]
+    assert sum(sent) == 5
+    assert reminders.sink.sent() == [3, 5, 7, 9, 11]
+    assert len(reminders.wheel) <= 2
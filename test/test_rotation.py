@@ -0,0 +1,87 @@
+from collections import Counter
+
+import pytest
+from conftest import NUM_TASKS, NUM_USERS
+
+from roomies_todo_list import db
+from roomies_todo_list.models import BadRequest, Task, TaskAssignee, User
+from roomies_todo_list.rotation import LoadIndex, assign_unassigned, scheduler
+
+
+def test_load_index_takes_turns_between_equal_loads():
+    index = LoadIndex({1: 0, 2: 0, 3: 5})
+    assert [index.pick(1)[0] for _ in range(4)] == [1, 2, 1, 2]
+    assert index.load(1) == 2
+
+    index.add(3, -5)
+    assert index.pick(2) == [3, 1]
+    assert index.pick(1, candidates=[2, 3]) == [3]
+
+
+def test_assign_picks_least_loaded_roommates(client, seeded):
+    scheduler.reset()
+    quiet = User(email="new@example.com", username="new")
+    db.session.add(quiet)
+    db.session.commit()
+
+    body = client.post("/api/tasks/2/assign", json={"count": 2}).get_json()
+    assert quiet.id in [user["id"] for user in body["task"]["assignees"]]
+
+    body = client.post("/api/tasks/2/assign", json={"user_ids": [1, 2]}).get_json()
+    assert [user["id"] for user in body["task"]["assignees"]] in ([1], [2])
+
+    response = client.post("/api/tasks/2/assign", json={"count": 0})
+    assert response.status_code == 400
+
+
+def test_assign_unassigned_balances_new_tasks(app, seeded):
+    scheduler.reset()
+    users = User.query.all()
+    db.session.add_all(Task(name=f"chore {i}", created_by=users[0]) for i in range(100))
+    db.session.commit()
+
+    assert assign_unassigned(batch_size=30) == 100
+    open_loads = Counter(
+        user_id
+        for (user_id,) in db.session.query(TaskAssignee.user_id)
+        .join(Task, Task.id == TaskAssignee.task_id)
+        .filter(db.not_(Task.is_completed))
+    )
+    # Recent completions are weighted in, so loads may differ by that much
+    assert max(open_loads.values()) - min(open_loads.values()) <= 3
+
+
+def test_refused_and_rolled_back_picks_leave_loads_alone(app, seeded):
+    scheduler.reset()
+    picked = scheduler.pick(1, 1)
+    db.session.commit()
+    index = scheduler._current(1)
+    loads = dict(index._loads)
+
+    with pytest.raises(BadRequest):
+        scheduler.pick(1, 3, candidates=[1, 2], release=picked)
+    assert index._loads == loads
+
+    scheduler.pick(1, 2, release=picked)
+    assert index._loads != loads
+    db.session.rollback()
+    assert index._loads == loads
+
+    scheduler.pick(1, 2)
+    db.session.close()
+    assert index._loads == loads
+
+    scheduler.pick(1, 2)
+    db.session.commit()
+    assert sum(index._loads.values()) == sum(loads.values()) + 2
+
+
+def test_assign_unassigned_skips_what_it_cannot_assign(app, seeded):
+    scheduler.reset()
+    db.session.add(Task(name="chore", created_by=User.query.first()))
+    db.session.commit()
+
+    skipped = []
+    assert assign_unassigned(count=NUM_USERS + 1, on_skip=lambda *args: skipped.append(args)) == 0
+    assert skipped == [(NUM_TASKS + 1, f"Only {NUM_USERS} users are available to assign.")]
+    assert assign_unassigned(count=2) == 1
@@ -0,0 +1,49 @@
+from roomies_todo_list import db
+from roomies_todo_list.models import Task, User
+from roomies_todo_list.search import InvertedIndex
+
+
+def ids(response):
+    return [task["id"] for task in response.get_json()["tasks"]]
+
+
+def test_index_ranks_name_matches_first():
+    index = InvertedIndex()
+    index.build(
+        [
+            (1, "Take out trash", "Bins go out on Tuesday"),
+            (2, "Clean kitchen", "Wipe counters, take the trash out too"),
+            (3, "Water plants", None),
+        ]
+    )
+    assert [task_id for _, task_id in index.search("trash")] == [1, 2]
+    assert [task_id for _, task_id in index.search("TAKE trash!")] == [1, 2]
+    assert list(index.search("trash plants")) == []
+    assert list(index.search("   ")) == []
+
+
+def test_search_endpoint_filters_and_paginates(client, seeded):
+    user = User.query.first()
+    db.session.add_all(
+        Task(name=f"Vacuum room {i}", description="vacuum the rug", created_by=user, is_completed=bool(i % 2))
+        for i in range(5)
+    )
+    db.session.commit()
+    client.post("/api/tasks", json={"task": {"name": "Buy vacuum bags", "created_by": {"id": user.id}}})
+
+    everything = ids(client.get("/api/tasks/search", query_string={"q": "vacuum"}))
+    assert len(everything) == 6
+    # "Buy vacuum bags" only matches in its name, the rest in both fields
+    assert everything[-1] == Task.query.filter_by(name="Buy vacuum bags").one().id
+
+    open_only = ids(client.get("/api/tasks/search", query_string={"q": "vacuum", "is_completed": "false"}))
+    assert open_only == [task_id for task_id in everything if not Task.query.get(task_id).is_completed]
+
+    first = client.get("/api/tasks/search", query_string={"q": "vacuum", "limit": 4}).get_json()
+    second = client.get(
+        "/api/tasks/search", query_string={"q": "vacuum", "limit": 4, "cursor": first["next_cursor"]}
+    ).get_json()
+    assert [task["id"] for task in first["tasks"] + second["tasks"]] == everything
+    assert second["next_cursor"] is None
+
+    assert client.get("/api/tasks/search").status_code == 400
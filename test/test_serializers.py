@@ -0,0 +1,22 @@
+import pytest
+
+from roomies_todo_list import response_cache
+
+URLS = [
+    "/api/tasks",
+    "/api/tasks?fields=id,name,assignees",
+    "/api/tasks?is_completed=false&limit=7",
+    "/api/users",
+]
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_row_serialization_matches_schema_dump(app, client, seeded, url):
+    app.config["SERIALIZE_FROM_ROWS"] = False
+    expected = client.get(url).get_json()
+
+    response_cache.invalidate("tasks", "users")
+    app.config["SERIALIZE_FROM_ROWS"] = True
+    actual = client.get(url).get_json()
+
+    assert actual == expected
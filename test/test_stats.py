@@ -0,0 +1,95 @@
+from collections import Counter
+from datetime import date
+
+from roomies_todo_list import db
+from roomies_todo_list.models import Task, TaskAssignee, User
+from roomies_todo_list.stats import rebuild_completion_stats
+
+
+def completions(client, **params):
+    response = client.get("/api/stats/completions", query_string=params)
+    assert response.status_code == 200
+    return {(row["user_id"], row["period"]): row["count"] for row in response.get_json()["completions"]}
+
+
+def test_open_stats_match_group_by(client, seeded):
+    body = client.get("/api/stats/open").get_json()
+
+    open_tasks = Task.query.filter(db.not_(Task.is_completed)).all()
+    assert body["open"] == len(open_tasks)
+    assert body["overdue"] == len(open_tasks)  # every seeded due date is in the past
+    expected = Counter(
+        assignee.user_id
+        for assignee in TaskAssignee.query.filter(
+            TaskAssignee.task_id.in_([task.id for task in open_tasks])
+        )
+    )
+    assert {row["user_id"]: row["open"] for row in body["users"]} == dict(expected)
+
+
+def assert_matches_rebuild(client, window):
+    incremental = completions(client, bucket="day", **window)
+    rebuild_completion_stats()
+    db.session.commit()
+    assert completions(client, bucket="day", **window) == incremental
+    return incremental
+
+
+def test_completion_histogram_tracks_updates_and_deletes(client, seeded):
+    rebuild_completion_stats()
+    db.session.commit()
+    window = {"since": "2025-12-01T00:00:00", "until": "2026-03-01T00:00:00"}
+
+    # 2026-01-01 falls in the week starting Monday 2025-12-29
+    weekly = completions(client, **window)
+    assert sum(weekly.values()) == 25
+    assert {period for _, period in weekly} == {"2025-12-29"}
+    monthly = completions(client, bucket="month", **window)
+    assert {period for _, period in monthly} == {"2026-01-01"}
+
+    open_task = Task.query.filter(db.not_(Task.is_completed)).first()
+    done_task = Task.query.filter(Task.is_completed).first()
+    client.patch(
+        "/api/tasks:batch",
+        json={
+            "tasks": [
+                {
+                    "id": open_task.id,
+                    "is_completed": True,
+                    "completed_by": {"id": open_task.created_by_id},
+                    "completed_at": "2026-02-10T09:00:00",
+                },
+                {"id": done_task.id, "is_completed": False},
+            ]
+        },
+    )
+    daily = assert_matches_rebuild(client, window)
+    assert daily[open_task.created_by_id, "2026-02-10"] == 1
+    assert sum(daily.values()) == 25
+
+    assert client.delete(f"/api/tasks/{open_task.id}").status_code == 204
+    daily = assert_matches_rebuild(client, window)
+    assert sum(daily.values()) == 24
+
+
+def test_completing_a_task_counts_towards_its_completer(client, seeded):
+    user = User.query.get(2)
+    user.set_password("hunter2")
+    db.session.commit()
+    client.post("/login", data={"username": user.username, "password": "hunter2"})
+    open_tasks = [task.id for task in Task.query.filter(db.not_(Task.is_completed)).limit(2)]
+    today = date.today().isoformat()
+    window = {"since": today, "until": today}
+
+    response = client.patch(f"/api/tasks/{open_tasks[0]}", json={"task": {"is_completed": True}})
+    assert response.status_code == 200
+    assert response.get_json()["task"]["completed_by"]["id"] == 2
+    assert completions(client, bucket="day", **window) == {(2, today): 1}
+
+    response = client.patch(
+        f"/api/tasks/{open_tasks[1]}", json={"task": {"is_completed": True, "completed_by": {"id": 3}}}
+    )
+    assert response.status_code == 200
+    assert response.get_json()["task"]["completed_by"]["id"] == 3
+    assert completions(client, bucket="day", **window) == {(2, today): 1, (3, today): 1}
+    assert client.patch(f"/api/tasks/{open_tasks[1]}", json={"task": {"completed_by": {"id": 999}}}).status_code == 404
@@ -0,0 +1,55 @@
+from conftest import NUM_TASKS, NUM_USERS
+
+from roomies_todo_list.sync import encode_token
+
+
+def sync(client, **params):
+    response = client.get("/api/sync", query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_first_sync_sends_everything_in_pages(client, seeded):
+    tasks, users, params = [], [], {"limit": 25}
+    while True:
+        body = sync(client, **params)
+        tasks += body["tasks"]
+        users += body["users"]
+        params["since"] = body["next_token"]
+        if not body["has_more"]:
+            break
+
+    assert sorted(task["id"] for task in tasks) == list(range(1, NUM_TASKS + 1))
+    assert sorted(user["id"] for user in users) == list(range(1, NUM_USERS + 1))
+    assert "tasks" not in users[0]
+    assert sync(client, since=params["since"])["tasks"] == []
+
+
+def test_sync_sends_only_the_delta_with_tombstones(client, seeded):
+    token = sync(client)["next_token"]
+
+    client.patch("/api/tasks/1", json={"task": {"name": "Recycling"}})
+    client.patch("/api/tasks/1", json={"task": {"is_completed": True}})
+    client.delete("/api/tasks/2")
+    client.delete("/api/tasks:batch", json={"ids": [3]})
+    client.post("/api/users", json={"user": {"email": "new@example.com", "username": "new"}})
+    # Refused writes leave no trace
+    client.patch("/api/tasks/4", json={"task": {"name": "Trash"}}, headers={"If-Match": '"7"'})
+
+    body = sync(client, since=token)
+    assert [(task["id"], task["name"], task["is_completed"]) for task in body["tasks"]] == [
+        (1, "Recycling", True)
+    ]
+    assert [user["username"] for user in body["users"]] == ["new"]
+    assert body["deleted"] == {"tasks": [2, 3], "users": []}
+    assert not body["has_more"]
+
+    client.delete(f"/api/users/{body['users'][0]['id']}")
+    body = sync(client, since=body["next_token"])
+    assert body["tasks"] == body["users"] == []
+    assert body["deleted"]["users"] == [NUM_USERS + 1]
+
+
+def test_sync_rejects_bad_tokens(client, seeded):
+    assert client.get("/api/sync?since=nonsense").status_code == 400
+    assert client.get("/api/sync", query_string={"since": encode_token(1000)}).status_code == 410
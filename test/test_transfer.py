@@ -0,0 +1,94 @@
+import json
+import os
+
+import pytest
+
+from roomies_todo_list import db
+from roomies_todo_list.models import Task, TaskAssignee, TaskCompletionStat, User
+
+# Enough rows that buffering the export would grow RSS several times
+# past the ceiling; the slow run checks the full million.
+EXPORT_ROWS = 50000
+SLOW_EXPORT_ROWS = int(os.getenv("EXPORT_TEST_ROWS", 1000000))
+RSS_CEILING = 16 * 1024 * 1024
+
+
+def export(client, kind, fmt):
+    response = client.get(f"/api/export/{kind}", query_string={"format": fmt})
+    assert response.status_code == 200
+    return response.data
+
+
+def import_(client, kind, fmt, body):
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    response = client.post(f"/api/import/{kind}", data=body, content_type=content_type)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def snapshot(client):
+    tasks = client.get("/api/tasks", query_string={"limit": 500}).get_json()["tasks"]
+    users = client.get("/api/users").get_json()["users"]
+    return sorted(tasks, key=lambda task: task["id"]), users
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_export_import_round_trip(client, seeded, fmt):
+    before = snapshot(client)
+    users, tasks = export(client, "users", fmt), export(client, "tasks", fmt)
+
+    for model in (TaskCompletionStat, TaskAssignee, Task, User):
+        model.query.delete()
+    db.session.commit()
+
+    assert import_(client, "users", fmt, users) == {"imported": 10, "failed": 0, "errors": []}
+    assert import_(client, "tasks", fmt, tasks) == {"imported": 50, "failed": 0, "errors": []}
+    assert snapshot(client) == before
+
+
+def test_import_reports_invalid_records(client, seeded):
+    body = "\n".join(
+        [
+            json.dumps({"id": 1000, "name": "ok", "created_by": {"id": 1}}),
+            "not json",
+            json.dumps({"id": 1001, "created_by": {"id": 1}}),
+            json.dumps({"id": 1002, "name": "ghost", "created_by": {"id": 999}}),
+            json.dumps({"id": 1, "name": "dupe", "created_by": {"id": 1}}),
+        ]
+    )
+    result = import_(client, "tasks", "ndjson", body)
+
+    assert result["imported"] == 1
+    assert [error["line"] for error in result["errors"]] == [2, 3, 4, 5]
+    assert result["errors"][2]["error"]["message"] == "User not found."
+
+
+def rss():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc")
+@pytest.mark.parametrize("rows", [EXPORT_ROWS, pytest.param(SLOW_EXPORT_ROWS, marks=pytest.mark.slow)])
+def test_export_memory_is_flat(client, rows):
+    chunk = 10000
+    for start in range(0, rows, chunk):
+        db.session.execute(
+            User.__table__.insert(),
+            [
+                {"email": f"user{i}@example.com", "username": f"user{i}"}
+                for i in range(start, min(start + chunk, rows))
+            ],
+        )
+    db.session.commit()
+
+    response = client.get("/api/export/users", buffered=False)
+    baseline = peak = rss()
+    lines = 0
+    for i, piece in enumerate(response.response):
+        lines += piece.count(b"\n")
+        if i % 100 == 0:
+            peak = max(peak, rss())
+
+    assert lines == rows
+    assert peak - baseline < RSS_CEILING